@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 import httpx
 from app.core.config import settings
+from app.core.ml_client import get_ml_client
+from app.core.transport import (
+    binary_headers, decode_observation, encode_trajectory,
+    read_observation, request_body_docs, validate_trajectory
+)
 
 router = APIRouter()
 
@@ -29,39 +34,68 @@ class CompareResponse(BaseModel):
     total_steps: int
     differences: List[dict]
 
-@router.post("/suggest-action", response_model=AIActionResponse)
-async def suggest_action(request: AIActionRequest):
+def _observation_payload(observation: bytes, simulation_id: Optional[str]) -> dict:
+    """Request arguments sending one float32 observation to the ML Engine"""
+    if settings.ML_ENGINE_BINARY_TRANSPORT:
+        return {"content": observation, "headers": binary_headers(simulation_id)}
+    return {
+        "json": {
+            "observation": decode_observation(observation).tolist(),
+            "simulation_id": simulation_id
+        }
+    }
+
+def _trajectory_payload(observations: List[List[float]], actions: List[List[int]]) -> dict:
+    """Request arguments sending a trajectory to the ML Engine"""
+    try:
+        validate_trajectory(observations, actions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if settings.ML_ENGINE_BINARY_TRANSPORT:
+        body, headers = encode_trajectory(observations, actions)
+        return {"content": body, "headers": headers}
+    return {"json": {"observations": observations, "actions": actions}}
+
+@router.post(
+    "/suggest-action",
+    response_model=AIActionResponse,
+    openapi_extra=request_body_docs(AIActionRequest)
+)
+async def suggest_action(
+    request: Request,
+    client: httpx.AsyncClient = Depends(get_ml_client)
+):
     """
     Get AI recommendation for the next action
     
     This endpoint communicates with the ML Engine to get the optimal
-    action based on the current state observation.
+    action based on the current state observation. The observation can be
+    sent as AIActionRequest JSON or as raw float32 (application/octet-stream).
     """
     
+    observation, simulation_id = await read_observation(request, AIActionRequest)
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.ML_ENGINE_URL}/predict",
-                json={
-                    "observation": request.observation,
-                    "simulation_id": request.simulation_id
-                },
-                timeout=5.0
+        response = await client.post(
+            "/predict",
+            **_observation_payload(observation, simulation_id),
+            timeout=settings.ML_ENGINE_PREDICT_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            return AIActionResponse(
+                action=data["action"],
+                confidence=data["confidence"],
+                explanation=data["explanation"]
+            )
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="ML Engine error"
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                return AIActionResponse(
-                    action=data["action"],
-                    confidence=data["confidence"],
-                    explanation=data["explanation"]
-                )
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="ML Engine error"
-                )
-                
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=503,
@@ -69,7 +103,10 @@ async def suggest_action(request: AIActionRequest):
         )
 
 @router.post("/compare", response_model=CompareResponse)
-async def compare_strategies(request: CompareRequest):
+async def compare_strategies(
+    request: CompareRequest,
+    client: httpx.AsyncClient = Depends(get_ml_client)
+):
     """
     Compare human strategy against AI recommendations
     
@@ -78,75 +115,73 @@ async def compare_strategies(request: CompareRequest):
     """
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.ML_ENGINE_URL}/evaluate",
-                json={
-                    "observations": request.observations,
-                    "actions": request.human_actions
-                },
-                timeout=10.0
+        response = await client.post(
+            "/evaluate",
+            **_trajectory_payload(request.observations, request.human_actions),
+            timeout=settings.ML_ENGINE_EVALUATE_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Calculate differences
+            differences = []
+            for i, (human, ai) in enumerate(zip(request.human_actions, data["ai_actions"])):
+                if human[0] != ai[0]:  # Different action types
+                    differences.append({
+                        "timestep": i,
+                        "human_action": human,
+                        "ai_action": ai,
+                        "action_type_match": False
+                    })
+            
+            return CompareResponse(
+                agreement_rate=data["agreement_rate"],
+                ai_actions=data["ai_actions"],
+                total_steps=data["total_steps"],
+                differences=differences
+            )
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="ML Engine error"
             )
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Calculate differences
-                differences = []
-                for i, (human, ai) in enumerate(zip(request.human_actions, data["ai_actions"])):
-                    if human[0] != ai[0]:  # Different action types
-                        differences.append({
-                            "timestep": i,
-                            "human_action": human,
-                            "ai_action": ai,
-                            "action_type_match": False
-                        })
-                
-                return CompareResponse(
-                    agreement_rate=data["agreement_rate"],
-                    ai_actions=data["ai_actions"],
-                    total_steps=data["total_steps"],
-                    differences=differences
-                )
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="ML Engine error"
-                )
-                
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=503,
             detail=f"ML Engine unavailable: {str(e)}"
         )
 
-@router.post("/explanation")
-async def get_ai_explanation(request: AIActionRequest):
+@router.post("/explanation", openapi_extra=request_body_docs(AIActionRequest))
+async def get_ai_explanation(
+    request: Request,
+    client: httpx.AsyncClient = Depends(get_ml_client)
+):
     """
     Get detailed explanation for AI's recommended action
     
     Provides reasoning, alternative actions, and confidence scores.
+    Accepts the same JSON or raw float32 bodies as /suggest-action.
     """
     
+    observation, simulation_id = await read_observation(request, AIActionRequest)
+    
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.ML_ENGINE_URL}/explain",
-                json={
-                    "observation": request.observation,
-                    "simulation_id": request.simulation_id
-                },
-                timeout=5.0
+        response = await client.post(
+            "/explain",
+            **_observation_payload(observation, simulation_id),
+            timeout=settings.ML_ENGINE_EXPLAIN_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="ML Engine error"
             )
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="ML Engine error"
-                )
-                
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=503,
@@ -154,24 +189,23 @@ async def get_ai_explanation(request: AIActionRequest):
         )
 
 @router.get("/model/status")
-async def get_model_status():
+async def get_model_status(client: httpx.AsyncClient = Depends(get_ml_client)):
     """Get ML model status and information"""
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.ML_ENGINE_URL}/model/info",
-                timeout=3.0
+        response = await client.get(
+            "/model/info",
+            timeout=settings.ML_ENGINE_STATUS_TIMEOUT
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail="ML Engine error"
             )
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail="ML Engine error"
-                )
-                
     except httpx.RequestError as e:
         return {
             "model_loaded": False,
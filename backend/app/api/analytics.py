@@ -1,67 +1,46 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+from app.models.analytics import LeaderboardEntry, PerformanceStats
+from app.core.config import settings
+from app.core.database import Database, get_database
+from app.core.rollups import ALL_KEY, ROLLUP_DIMENSIONS, bucket_rollups, total_rollup
 
 router = APIRouter()
 
-class LeaderboardEntry(BaseModel):
-    """Leaderboard entry"""
-    rank: int
-    user_id: str
-    username: str
-    scenario_id: str
-    score: float
-    casualties: float
-    evacuated: float
-    evacuation_rate: float
-    completed_at: datetime
-
-class PerformanceStats(BaseModel):
-    """User performance statistics"""
-    total_simulations: int
-    avg_score: float
-    avg_casualties: float
-    avg_evacuation_rate: float
-    best_score: float
-    scenarios_completed: int
-
-# Mock leaderboard data
-leaderboard_data = []
-
 @router.get("/leaderboard", response_model=List[LeaderboardEntry])
 async def get_leaderboard(
     scenario_id: Optional[str] = None,
-    limit: int = 10
+    limit: int = 10,
+    db: Database = Depends(get_database)
 ):
     """
     Get leaderboard rankings
     
     Can be filtered by scenario_id, or show global rankings
     """
-    
-    # Filter by scenario if specified
-    if scenario_id:
-        entries = [e for e in leaderboard_data if e.scenario_id == scenario_id]
-    else:
-        entries = leaderboard_data
-    
-    # Sort by score (descending)
-    entries = sorted(entries, key=lambda x: x.score, reverse=True)
-    
-    # Add ranks
-    for i, entry in enumerate(entries):
-        entry.rank = i + 1
-    
-    return entries[:limit]
+    return await db.top_leaderboard_entries(scenario_id, limit)
+
+@router.get("/leaderboard/rank")
+async def get_leaderboard_rank(
+    score: float,
+    scenario_id: Optional[str] = None,
+    db: Database = Depends(get_database)
+):
+    """Rank a run with the given score would take, globally or for one scenario"""
+    return {
+        "scenario_id": scenario_id,
+        "score": score,
+        "rank": await db.leaderboard_rank(score, scenario_id)
+    }
 
 @router.get("/user/{user_id}/stats", response_model=PerformanceStats)
-async def get_user_stats(user_id: str):
+async def get_user_stats(user_id: str, db: Database = Depends(get_database)):
     """Get performance statistics for a specific user"""
     
-    user_entries = [e for e in leaderboard_data if e.user_id == user_id]
+    stats = await db.user_stats(user_id)
     
-    if not user_entries:
+    if not stats:
         return PerformanceStats(
             total_simulations=0,
             avg_score=0,
@@ -71,41 +50,55 @@ async def get_user_stats(user_id: str):
             scenarios_completed=0
         )
     
+    count = stats["count"]
     return PerformanceStats(
-        total_simulations=len(user_entries),
-        avg_score=sum(e.score for e in user_entries) / len(user_entries),
-        avg_casualties=sum(e.casualties for e in user_entries) / len(user_entries),
-        avg_evacuation_rate=sum(e.evacuation_rate for e in user_entries) / len(user_entries),
-        best_score=max(e.score for e in user_entries),
-        scenarios_completed=len(set(e.scenario_id for e in user_entries))
+        total_simulations=count,
+        avg_score=stats["score_sum"] / count,
+        avg_casualties=stats["casualties_sum"] / count,
+        avg_evacuation_rate=stats["evacuation_rate_sum"] / count,
+        best_score=stats["best_score"],
+        scenarios_completed=stats["scenarios_completed"]
     )
 
 @router.get("/scenarios/{scenario_id}/analytics")
-async def get_scenario_analytics(scenario_id: str):
+async def get_scenario_analytics(
+    scenario_id: str,
+    bucket_days: Optional[int] = Query(None, ge=1, description="Days per completion_timeline bucket"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Database = Depends(get_database)
+):
     """Get analytics for a specific scenario"""
-    
-    scenario_entries = [e for e in leaderboard_data if e.scenario_id == scenario_id]
-    
-    if not scenario_entries:
-        return {
-            "scenario_id": scenario_id,
-            "total_attempts": 0,
-            "avg_score": 0,
-            "avg_casualties": 0,
-            "avg_evacuation_rate": 0
-        }
-    
-    return {
-        "scenario_id": scenario_id,
-        "total_attempts": len(scenario_entries),
-        "avg_score": sum(e.score for e in scenario_entries) / len(scenario_entries),
-        "avg_casualties": sum(e.casualties for e in scenario_entries) / len(scenario_entries),
-        "avg_evacuation_rate": sum(e.evacuation_rate for e in scenario_entries) / len(scenario_entries),
-        "best_score": max(e.score for e in scenario_entries),
-        "completion_timeline": [
-            {
-                "date": e.completed_at.date().isoformat(),
-                "attempts": 1
-            } for e in scenario_entries
-        ]
-    }
+    return await _rollup_response(db, "scenario", scenario_id, bucket_days, start, end)
+
+@router.get("/rollups/{dimension}")
+async def get_rollups(
+    dimension: str,
+    key: str = ALL_KEY,
+    bucket_days: Optional[int] = Query(None, ge=1, description="Days per completion_timeline bucket"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Database = Depends(get_database)
+):
+    """
+    Get aggregated completions of all runs ("all"), a scenario ("scenario",
+    key = scenario id) or a difficulty ("difficulty", key = level)
+    """
+    if dimension not in ROLLUP_DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown rollup dimension: {dimension}")
+    return await _rollup_response(db, dimension, key, bucket_days, start, end)
+
+async def _rollup_response(
+    db: Database,
+    dimension: str,
+    key: str,
+    bucket_days: Optional[int],
+    start: Optional[date],
+    end: Optional[date]
+) -> dict:
+    """Totals and timeline of one rollup series, computed from its daily buckets"""
+    daily = await db.daily_rollups(dimension, key, start, end)
+    response = {"scenario_id": key} if dimension == "scenario" else {"dimension": dimension, "key": key}
+    response.update(total_rollup(daily).summary())
+    response["completion_timeline"] = bucket_rollups(daily, bucket_days or settings.ANALYTICS_BUCKET_DAYS)
+    return response
@@ -1,63 +1,118 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models.scenario import ScenarioConfig, DisasterType, DifficultyLevel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Literal, Optional
+from app.models.scenario import ScenarioConfig, ScenarioSummary, SpatialMatch, DisasterType, DifficultyLevel
+from app.core.database import Database, get_database
+from app.core.spatial import ScenarioSpatialIndex, spatial_indexes
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
-# In-memory storage (replace with MongoDB in production)
-scenarios_db = {}
-
 @router.post("/", response_model=ScenarioConfig)
-async def create_scenario(scenario: ScenarioConfig):
+async def create_scenario(scenario: ScenarioConfig, db: Database = Depends(get_database)):
     """Create a new disaster scenario"""
     scenario.id = str(uuid.uuid4())
     scenario.created_at = datetime.utcnow()
-    scenarios_db[scenario.id] = scenario
+    scenario.version = 1
+    await db.save_scenario(scenario)
+    spatial_indexes.build(scenario)
     return scenario
 
 @router.get("/", response_model=List[ScenarioConfig])
 async def list_scenarios(
     disaster_type: DisasterType = None,
-    difficulty: DifficultyLevel = None
+    difficulty: DifficultyLevel = None,
+    db: Database = Depends(get_database)
 ):
     """List all scenarios with optional filtering"""
-    scenarios = list(scenarios_db.values())
-    
-    if disaster_type:
-        scenarios = [s for s in scenarios if s.disaster_type == disaster_type]
-    if difficulty:
-        scenarios = [s for s in scenarios if s.difficulty == difficulty]
-    
-    return scenarios
+    return await db.list_scenarios(disaster_type, difficulty)
+
+@router.get("/summaries", response_model=List[ScenarioSummary])
+async def list_scenario_summaries(
+    disaster_type: DisasterType = None,
+    difficulty: DifficultyLevel = None,
+    db: Database = Depends(get_database)
+):
+    """List scenarios without their zones, shelters, roads and resources"""
+    return await db.list_scenario_summaries(disaster_type, difficulty)
 
 @router.get("/{scenario_id}", response_model=ScenarioConfig)
-async def get_scenario(scenario_id: str):
+async def get_scenario(scenario_id: str, db: Database = Depends(get_database)):
     """Get a specific scenario by ID"""
-    if scenario_id not in scenarios_db:
+    scenario = await db.get_scenario(scenario_id)
+    if scenario is None:
         raise HTTPException(status_code=404, detail="Scenario not found")
-    return scenarios_db[scenario_id]
+    return scenario
 
 @router.put("/{scenario_id}", response_model=ScenarioConfig)
-async def update_scenario(scenario_id: str, scenario: ScenarioConfig):
+async def update_scenario(scenario_id: str, scenario: ScenarioConfig, db: Database = Depends(get_database)):
     """Update an existing scenario"""
-    if scenario_id not in scenarios_db:
+    existing = await db.get_scenario(scenario_id)
+    if existing is None:
         raise HTTPException(status_code=404, detail="Scenario not found")
     
     scenario.id = scenario_id
-    scenarios_db[scenario_id] = scenario
+    scenario.version = existing.version + 1
+    await db.save_scenario(scenario)
+    spatial_indexes.build(scenario)
     return scenario
 
 @router.delete("/{scenario_id}")
-async def delete_scenario(scenario_id: str):
+async def delete_scenario(scenario_id: str, db: Database = Depends(get_database)):
     """Delete a scenario"""
-    if scenario_id not in scenarios_db:
+    if not await db.delete_scenario(scenario_id):
         raise HTTPException(status_code=404, detail="Scenario not found")
+    spatial_indexes.remove(scenario_id)
     
-    del scenarios_db[scenario_id]
     return {"message": "Scenario deleted successfully"}
 
+SpatialKind = Optional[Literal["zone", "shelter", "resource"]]
+
+async def _spatial_index(scenario_id: str, db: Database) -> ScenarioSpatialIndex:
+    scenario = await db.get_scenario(scenario_id)
+    if scenario is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return spatial_indexes.get(scenario)
+
+@router.get("/{scenario_id}/spatial/nearest", response_model=List[SpatialMatch])
+async def nearest_elements(
+    scenario_id: str,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(1, ge=1, le=1000),
+    kind: SpatialKind = None,
+    db: Database = Depends(get_database)
+):
+    """The k zones, shelters or resources nearest to a point (all kinds if none given)"""
+    return (await _spatial_index(scenario_id, db)).nearest(lat, lon, k, kind)
+
+@router.get("/{scenario_id}/spatial/radius", response_model=List[SpatialMatch])
+async def elements_within_radius(
+    scenario_id: str,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0),
+    kind: SpatialKind = None,
+    db: Database = Depends(get_database)
+):
+    """Zones, shelters or resources within radius_km of a point, nearest first"""
+    return (await _spatial_index(scenario_id, db)).within_radius(lat, lon, radius_km, kind)
+
+@router.get("/{scenario_id}/spatial/bbox", response_model=List[SpatialMatch])
+async def elements_in_bbox(
+    scenario_id: str,
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    kind: SpatialKind = None,
+    db: Database = Depends(get_database)
+):
+    """Zones, shelters or resources inside a latitude/longitude box"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=422, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+    return (await _spatial_index(scenario_id, db)).in_bbox(min_lat, min_lon, max_lat, max_lon, kind)
+
 @router.get("/templates/list")
 async def list_templates():
     """Get pre-built scenario templates"""
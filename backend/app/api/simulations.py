@@ -1,173 +1,446 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional
 from app.models.simulation import (
     Simulation, SimulationConfig, SimulationStatus, 
-    SimulationMode, Action, SimulationState, SimulationMetrics
+    SimulationMode, Action, BatchStepInput, SimulationState, SimulationMetrics
 )
+from app.models.analytics import CompletionRecord, LeaderboardEntry
+from app.models.scenario import ScenarioConfig
+from app.core.database import Database, get_database
+from app.core.broadcast import hub, QUEUE_POLICIES
+from app.core.config import settings
+from app.core.ml_client import get_ml_client
+from app.core import replay, session_engine
 from datetime import datetime
+import asyncio
+import secrets
 import uuid
 import json
 import httpx
 
 router = APIRouter()
 
-# In-memory storage (replace with MongoDB in production)
-simulations_db = {}
+def final_score(total_casualties: float) -> float:
+    """Score of a simulation from its casualties"""
+    return 1000 - (total_casualties * 10)
 
-# Active WebSocket connections
-active_connections: Dict[str, WebSocket] = {}
+def performance_vs_ai(casualties: float, ai_casualties: float) -> float:
+    """Percentage fewer casualties than the AI policy had (negative if more)"""
+    if ai_casualties > 0:
+        return (ai_casualties - casualties) / ai_casualties * 100
+    return 0.0 if casualties <= 0 else -100.0
+
+def evacuation_rate(state: SimulationState) -> float:
+    total_population = sum(state.zone_populations)
+    return state.total_evacuated / total_population if total_population > 0 else 0
+
+async def _record_completion(
+    client: httpx.AsyncClient,
+    db: Database,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig],
+    state: SimulationState
+):
+    """Mark a simulation completed and feed its outcome into the leaderboard and analytics"""
+    simulation.status = SimulationStatus.COMPLETED
+    simulation.completed_at = datetime.utcnow()
+    simulation.final_casualties = state.total_casualties
+    simulation.final_evacuated = state.total_evacuated
+    simulation.final_score = final_score(state.total_casualties)
+    
+    if simulation.mode == SimulationMode.COMPARISON:
+        # What the AI would have achieved from the same seed (best effort)
+        try:
+            rollouts = await session_engine.run_counterfactual(
+                client, simulation, scenario, settings.COMPARISON_SAMPLES
+            )
+            simulation.ai_casualties = rollouts["policy"]["total_casualties"]
+            simulation.ai_evacuated = rollouts["policy"]["total_evacuated"]
+            simulation.ai_sample_casualties = [s["total_casualties"] for s in rollouts["samples"]]
+        except HTTPException:
+            pass
+    
+    await db.save_simulation_progress(simulation, force=True)
+    
+    record = CompletionRecord(
+        scenario_id=simulation.scenario_id,
+        difficulty=scenario.difficulty.value if scenario else None,
+        user_id=simulation.user_id,
+        score=simulation.final_score,
+        casualties=state.total_casualties,
+        evacuated=state.total_evacuated,
+        evacuation_rate=evacuation_rate(state),
+        completed_at=simulation.completed_at
+    )
+    await db.record_completion(record)
+    if simulation.user_id:
+        await db.add_leaderboard_entries([LeaderboardEntry(
+            username=simulation.user_id,
+            **record.model_dump(exclude={"difficulty"})
+        )])
+
+def _record_step(simulation: Simulation, action: Action, state: SimulationState, action_success: bool):
+    """Record an executed action and the state it led to"""
+    action.timestep = simulation.current_timestep
+    action.success = action_success
+    simulation.actions.append(action)
+    simulation.record_state(state)
+    simulation.current_timestep = state.timestep
+
+def _step_message(simulation: Simulation, action: Action) -> dict:
+    return {
+        "type": "step_completed",
+        "simulation_id": simulation.id,
+        "timestep": simulation.current_timestep,
+        "status": simulation.status,
+        "action": action.dict()
+    }
+
+async def _get_simulation(db: Database, simulation_id: str) -> Simulation:
+    simulation = await db.get_simulation(simulation_id)
+    if simulation is None:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return simulation
 
 @router.post("/start", response_model=Simulation)
-async def start_simulation(config: SimulationConfig):
-    """Initialize a new simulation"""
+async def start_simulation(
+    config: SimulationConfig,
+    client: httpx.AsyncClient = Depends(get_ml_client),
+    db: Database = Depends(get_database)
+):
+    """
+    Initialize a new simulation
+    
+    A live environment is created in the ML Engine, seeded from the
+    scenario configuration, and its initial state recorded.
+    """
+    scenario = await db.get_scenario(config.scenario_id)
+    
     simulation = Simulation(
         id=str(uuid.uuid4()),
         scenario_id=config.scenario_id,
         mode=config.mode,
         status=SimulationStatus.RUNNING,
+        max_timesteps=scenario.max_timesteps if scenario else 100,
+        seed=config.seed if config.seed is not None else secrets.randbelow(2**31),
         created_at=datetime.utcnow(),
         user_id=config.user_id
     )
     
-    simulations_db[simulation.id] = simulation
-    return simulation
+    initial_state = await session_engine.create_session(client, simulation, scenario)
+    simulation.record_state(initial_state)
+    
+    await db.save_simulation(simulation)
+    return simulation.with_states()
 
 @router.get("/{simulation_id}", response_model=Simulation)
-async def get_simulation(simulation_id: str):
+async def get_simulation(simulation_id: str, db: Database = Depends(get_database)):
     """Get simulation details"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    return simulations_db[simulation_id]
+    simulation = await _get_simulation(db, simulation_id)
+    return simulation.with_states()
 
 @router.post("/{simulation_id}/step")
-async def execute_step(simulation_id: str, action: Action):
+async def execute_step(
+    simulation_id: str,
+    action: Action,
+    client: httpx.AsyncClient = Depends(get_ml_client),
+    db: Database = Depends(get_database)
+):
     """Execute a single timestep with the given action"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    
-    simulation = simulations_db[simulation_id]
-    
-    if simulation.status != SimulationStatus.RUNNING:
-        raise HTTPException(status_code=400, detail="Simulation is not running")
-    
-    # Record action
-    action.timestep = simulation.current_timestep
-    simulation.actions.append(action)
-    
-    # Update timestep
-    simulation.current_timestep += 1
-    
-    # Check if completed
-    if simulation.current_timestep >= simulation.max_timesteps:
-        simulation.status = SimulationStatus.COMPLETED
-        simulation.completed_at = datetime.utcnow()
-    
-    # Notify via WebSocket if connected
-    if simulation_id in active_connections:
-        await active_connections[simulation_id].send_json({
-            "type": "step_completed",
+    async with session_engine.simulation_lock(simulation_id):
+        simulation = await _get_simulation(db, simulation_id)
+        
+        if simulation.status != SimulationStatus.RUNNING:
+            raise HTTPException(status_code=400, detail="Simulation is not running")
+        
+        # Simulate the action server-side
+        scenario = await db.get_scenario(simulation.scenario_id)
+        state, action_success, terminated = await session_engine.step_session(
+            client, simulation, scenario, action
+        )
+        
+        # Record action and resulting state
+        _record_step(simulation, action, state, action_success)
+        
+        # Check if completed
+        if terminated or simulation.current_timestep >= simulation.max_timesteps:
+            await session_engine.delete_session(client, simulation_id)
+            await _record_completion(client, db, simulation, scenario, state)
+        else:
+            await db.save_simulation_progress(simulation)
+        
+        # Notify WebSocket subscribers (queued; never waits on the sockets)
+        hub.publish(simulation_id, _step_message(simulation, action), coalesce_key="step")
+        
+        return {
+            "simulation_id": simulation_id,
             "timestep": simulation.current_timestep,
-            "action": action.dict()
-        })
-    
-    return {
-        "simulation_id": simulation_id,
-        "timestep": simulation.current_timestep,
-        "status": simulation.status
-    }
+            "status": simulation.status,
+            "action_success": action_success,
+            "state": state
+        }
 
 @router.post("/{simulation_id}/actions")
-async def submit_action(simulation_id: str, action: Action):
+async def submit_action(
+    simulation_id: str,
+    action: Action,
+    client: httpx.AsyncClient = Depends(get_ml_client),
+    db: Database = Depends(get_database)
+):
     """Submit an action for the current timestep"""
-    return await execute_step(simulation_id, action)
+    return await execute_step(simulation_id, action, client, db)
+
+@router.post("/{simulation_id}/steps")
+async def execute_steps(
+    simulation_id: str,
+    batch: BatchStepInput,
+    client: httpx.AsyncClient = Depends(get_ml_client),
+    db: Database = Depends(get_database)
+):
+    """
+    Execute several timesteps in one call
+    
+    The given actions are applied in order, followed by ai_steps actions
+    chosen by the AI policy, all within one ML Engine request (one per
+    STREAM_PROGRESS_CHUNK_STEPS steps with stream_progress). Execution
+    stops early when the simulation completes, or with truncated set (and
+    a reason) when the AI policy became unavailable part way; the steps
+    already executed are recorded either way.
+    """
+    async with session_engine.simulation_lock(simulation_id):
+        simulation = await _get_simulation(db, simulation_id)
+        
+        if simulation.status != SimulationStatus.RUNNING:
+            raise HTTPException(status_code=400, detail="Simulation is not running")
+        
+        # Never run past the simulation's last timestep
+        remaining = simulation.max_timesteps - simulation.current_timestep
+        actions = batch.actions[:remaining]
+        ai_steps = min(batch.ai_steps, remaining - len(actions))
+        
+        scenario = await db.get_scenario(simulation.scenario_id)
+        total_steps = len(actions) + ai_steps
+        # When streaming, run the steps in chunks so each chunk is published as it completes
+        chunk_size = max(1, settings.STREAM_PROGRESS_CHUNK_STEPS) if batch.stream_progress else total_steps
+        
+        steps = []
+        results = []
+        terminated = False
+        truncated_reason = None
+        while len(steps) < total_steps:
+            chunk_actions = actions[len(steps):len(steps) + chunk_size]
+            chunk_ai_steps = min(chunk_size - len(chunk_actions), total_steps - len(steps) - len(chunk_actions))
+            chunk, truncated_reason = await session_engine.run_session_steps(
+                client, simulation, scenario, chunk_actions, chunk_ai_steps, batch.deterministic
+            )
+            
+            for step in chunk:
+                if len(steps) < len(actions):
+                    action = actions[len(steps)]
+                else:
+                    action_type, resource_id, target_zone_id = step["action"]
+                    action = Action(
+                        timestep=simulation.current_timestep,
+                        action_type=action_type,
+                        resource_id=resource_id,
+                        target_zone_id=target_zone_id,
+                        success=False,
+                        source="ai"
+                    )
+                _record_step(simulation, action, step["state"], step["action_success"])
+                terminated = step["terminated"]
+                steps.append(step)
+                results.append({"action": action, "action_success": step["action_success"], "reward": step["reward"]})
+                
+                if batch.stream_progress:
+                    hub.publish(simulation_id, _step_message(simulation, action), coalesce_key="step")
+            
+            # The episode ended or the AI policy became unavailable
+            if len(chunk) < len(chunk_actions) + chunk_ai_steps or truncated_reason is not None:
+                break
+            if batch.stream_progress:
+                await asyncio.sleep(0)  # Let the sender tasks deliver this chunk before the next one
+        
+        if steps and (terminated or simulation.current_timestep >= simulation.max_timesteps):
+            await session_engine.delete_session(client, simulation_id)
+            await _record_completion(client, db, simulation, scenario, steps[-1]["state"])
+        else:
+            await db.save_simulation_progress(simulation, force=True)
+        
+        if steps and not batch.stream_progress:
+            hub.publish(simulation_id, {
+                "type": "steps_completed",
+                "simulation_id": simulation_id,
+                "timestep": simulation.current_timestep,
+                "status": simulation.status,
+                "steps_executed": len(steps)
+            }, coalesce_key="step")
+        
+        return {
+            "simulation_id": simulation_id,
+            "timestep": simulation.current_timestep,
+            "status": simulation.status,
+            "steps_executed": len(steps),
+            "truncated": truncated_reason is not None,  # Stopped early for a reason other than completion
+            "reason": truncated_reason,
+            "total_reward": sum(result["reward"] for result in results),
+            "results": results,
+            "states": [step["state"] for step in steps] if batch.include_states else None,
+            "state": steps[-1]["state"] if steps else simulation.latest_state()
+        }
 
 @router.get("/{simulation_id}/state", response_model=SimulationState)
-async def get_current_state(simulation_id: str):
+async def get_current_state(simulation_id: str, db: Database = Depends(get_database)):
     """Get current simulation state"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    
-    simulation = simulations_db[simulation_id]
+    simulation = await _get_simulation(db, simulation_id)
     
-    if not simulation.states:
+    state = simulation.latest_state()
+    if state is None:
         raise HTTPException(status_code=404, detail="No state data available")
     
-    return simulation.states[-1]  # Return most recent state
+    return state
 
 @router.post("/{simulation_id}/reset")
-async def reset_simulation(simulation_id: str):
+async def reset_simulation(
+    simulation_id: str,
+    client: httpx.AsyncClient = Depends(get_ml_client),
+    db: Database = Depends(get_database)
+):
     """Reset simulation to initial state"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    
-    simulation = simulations_db[simulation_id]
-    simulation.current_timestep = 0
-    simulation.actions = []
-    simulation.states = []
-    simulation.status = SimulationStatus.RUNNING
-    
-    return {"message": "Simulation reset successfully"}
+    async with session_engine.simulation_lock(simulation_id):
+        simulation = await _get_simulation(db, simulation_id)
+        initial_state = await session_engine.reset_session(
+            client, simulation, await db.get_scenario(simulation.scenario_id)
+        )
+        
+        simulation.current_timestep = 0
+        simulation.actions = []
+        simulation.clear_states()
+        simulation.record_state(initial_state)
+        simulation.status = SimulationStatus.RUNNING
+        simulation.completed_at = None
+        simulation.final_casualties = None
+        simulation.final_evacuated = None
+        simulation.final_score = None
+        simulation.ai_casualties = None
+        simulation.ai_evacuated = None
+        simulation.ai_sample_casualties = None
+        await db.save_simulation(simulation)
+        
+        return {"message": "Simulation reset successfully"}
 
 @router.get("/{simulation_id}/metrics", response_model=SimulationMetrics)
-async def get_simulation_metrics(simulation_id: str):
+async def get_simulation_metrics(simulation_id: str, db: Database = Depends(get_database)):
     """Get performance metrics for a simulation"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
-    
-    simulation = simulations_db[simulation_id]
+    simulation = await _get_simulation(db, simulation_id)
     
     if simulation.status != SimulationStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Simulation not completed yet")
     
     # Calculate metrics from final state
-    if simulation.states:
-        final_state = simulation.states[-1]
-        total_population = sum(final_state.zone_populations)
-        
+    final_state = simulation.latest_state()
+    if final_state is not None:
         metrics = SimulationMetrics(
             total_casualties=final_state.total_casualties,
             total_evacuated=final_state.total_evacuated,
-            evacuation_rate=final_state.total_evacuated / total_population if total_population > 0 else 0,
+            evacuation_rate=evacuation_rate(final_state),
             avg_response_time=simulation.current_timestep / len(simulation.actions) if simulation.actions else 0,
             resources_efficiency=0.85,  # Placeholder
-            overall_score=1000 - (final_state.total_casualties * 10)
+            overall_score=final_score(final_state.total_casualties)
         )
         
+        if simulation.ai_casualties is not None:
+            metrics.ai_casualties = simulation.ai_casualties
+            metrics.ai_evacuated = simulation.ai_evacuated
+            metrics.ai_sample_casualties = simulation.ai_sample_casualties
+            metrics.performance_vs_ai = performance_vs_ai(final_state.total_casualties, simulation.ai_casualties)
+        
         return metrics
     
     raise HTTPException(status_code=404, detail="No metrics available")
 
 @router.get("/{simulation_id}/replay")
-async def get_simulation_replay(simulation_id: str):
-    """Get full simulation replay data"""
-    if simulation_id not in simulations_db:
-        raise HTTPException(status_code=404, detail="Simulation not found")
+async def get_simulation_replay(
+    simulation_id: str,
+    start: int = Query(0, ge=0, description="First timestep to include"),
+    end: Optional[int] = Query(None, ge=0, description="Timestep to stop before (default: end of simulation)"),
+    fields: Optional[str] = Query(None, description="Comma separated state fields (default: all)"),
+    format: str = Query("json", description="json, ndjson (streamed) or binary (streamed)"),
+    db: Database = Depends(get_database)
+):
+    """
+    Get simulation replay data
     
-    simulation = simulations_db[simulation_id]
+    States are rebuilt from the compact history as they are sent; the
+    ndjson and binary formats stream the requested timestep range in chunks
+    instead of building the whole response first.
+    """
+    simulation = await _get_simulation(db, simulation_id)
+    if format not in replay.REPLAY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown replay format: {format}")
     
-    return {
-        "simulation_id": simulation_id,
-        "scenario_id": simulation.scenario_id,
-        "mode": simulation.mode,
-        "total_timesteps": simulation.current_timestep,
-        "actions": [action.dict() for action in simulation.actions],
-        "states": [state.dict() for state in simulation.states]
-    }
+    try:
+        selected = replay.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    steps = replay.step_range(simulation, start, end)
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            replay.stream_ndjson(simulation, steps, selected),
+            media_type=replay.NDJSON_CONTENT_TYPE
+        )
+    if format == "binary":
+        return StreamingResponse(
+            replay.stream_binary(simulation, steps, selected),
+            media_type=replay.BINARY_REPLAY_CONTENT_TYPE
+        )
+    return replay.replay_document(simulation, steps, selected)
 
-@router.websocket("/ws/{simulation_id}")
-async def websocket_endpoint(websocket: WebSocket, simulation_id: str):
-    """WebSocket endpoint for real-time simulation updates"""
+async def _serve_updates(websocket: WebSocket, simulation_id: Optional[str] = None):
+    """
+    Relay simulation updates to a connection until it disconnects
+    
+    Clients can (un)subscribe to further simulations with
+    {"type": "subscribe" | "unsubscribe", "simulation_id": ...}.
+    """
+    policy = websocket.query_params.get("policy")
+    if policy is not None and policy not in QUEUE_POLICIES:
+        await websocket.close(code=1008, reason=f"Unknown queue policy: {policy}")
+        return
+    
     await websocket.accept()
-    active_connections[simulation_id] = websocket
+    subscriber = hub.connect(websocket, policy)
+    if simulation_id is not None:
+        hub.subscribe(subscriber, simulation_id)
     
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            # Handle different message types
+            # Handle different message types; replies go through the send queue
             if message.get("type") == "ping":
-                await websocket.send_json({"type": "pong"})
+                subscriber.offer({"type": "pong"})
+            elif message.get("type") == "subscribe" and message.get("simulation_id"):
+                hub.subscribe(subscriber, message["simulation_id"])
+                subscriber.offer({"type": "subscribed", "simulation_id": message["simulation_id"]})
+            elif message.get("type") == "unsubscribe" and message.get("simulation_id"):
+                hub.unsubscribe(subscriber, message["simulation_id"])
+                subscriber.offer({"type": "unsubscribed", "simulation_id": message["simulation_id"]})
             
     except WebSocketDisconnect:
-        del active_connections[simulation_id]
+        pass
+    finally:
+        hub.disconnect(subscriber)
+
+@router.websocket("/ws")
+async def websocket_multi_endpoint(websocket: WebSocket):
+    """WebSocket endpoint following any number of simulations (e.g. instructor dashboards)"""
+    await _serve_updates(websocket)
+
+@router.websocket("/ws/{simulation_id}")
+async def websocket_endpoint(websocket: WebSocket, simulation_id: str):
+    """WebSocket endpoint for real-time simulation updates"""
+    await _serve_updates(websocket, simulation_id)
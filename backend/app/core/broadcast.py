@@ -0,0 +1,124 @@
+"""
+WebSocket broadcast hub
+Simulation updates are published to any number of subscribed connections,
+and one connection can follow many simulations. Publishing never waits on a
+socket: each connection has a bounded queue drained by its own sender task,
+and a slow client only loses (or coalesces) its own messages.
+
+Queue policies:
+    coalesce: a message with a coalesce key replaces any queued message with
+        the same simulation and key, whether or not the queue is full (e.g. a
+        newer step supersedes an older one); other messages evict the oldest
+        queued message when the queue is full
+    drop_oldest: when the queue is full, evict the oldest queued message
+    drop_newest: when the queue is full, discard the incoming message
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, Hashable, Optional, Set
+from fastapi import WebSocket
+from app.core.config import settings
+
+QUEUE_POLICIES = ("coalesce", "drop_oldest", "drop_newest")
+
+logger = logging.getLogger(__name__)
+
+class Subscriber:
+    """One WebSocket connection and its bounded send queue"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, policy: str):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.simulation_ids: Set[str] = set()
+        self.dropped = 0
+        self._pending: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._sequence = count()
+        self._ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, message: Dict[str, Any], simulation_id: Optional[str] = None, coalesce_key: Optional[str] = None):
+        """Queue a message without waiting, applying the queue policy"""
+        if self.policy == "coalesce" and coalesce_key is not None:
+            key = (simulation_id, coalesce_key)
+            if key in self._pending:
+                self._pending[key] = message
+                self.dropped += 1
+                return
+        else:
+            key = next(self._sequence)
+
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            if self.policy == "drop_newest":
+                return
+            self._pending.popitem(last=False)
+
+        self._pending[key] = message
+        self._ready.set()
+
+    async def run(self):
+        """Send queued messages until the connection fails or is closed"""
+        while True:
+            await self._ready.wait()
+            while self._pending:
+                _, message = self._pending.popitem(last=False)
+                await self.websocket.send_json(message)
+            self._ready.clear()
+
+class BroadcastHub:
+    """Subscriptions of WebSocket connections to simulations"""
+
+    def __init__(self, max_queue: int = 64, policy: str = "coalesce"):
+        self.max_queue = max_queue
+        self.policy = policy
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+
+    def connect(self, websocket: WebSocket, policy: Optional[str] = None) -> Subscriber:
+        """Register an accepted connection and start its sender task"""
+        subscriber = Subscriber(websocket, self.max_queue, policy or self.policy)
+        subscriber.task = asyncio.get_running_loop().create_task(subscriber.run())
+        subscriber.task.add_done_callback(lambda task: self._sender_done(subscriber, task))
+        return subscriber
+
+    def _sender_done(self, subscriber: Subscriber, task: asyncio.Task):
+        """Unsubscribe a connection whose sender task ended, logging why it failed"""
+        self._unsubscribe_all(subscriber)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("WebSocket sender stopped", exc_info=task.exception())
+
+    def disconnect(self, subscriber: Subscriber):
+        self._unsubscribe_all(subscriber)
+        if subscriber.task is not None and not subscriber.task.done():
+            subscriber.task.cancel()
+
+    def subscribe(self, subscriber: Subscriber, simulation_id: str):
+        self._subscribers.setdefault(simulation_id, set()).add(subscriber)
+        subscriber.simulation_ids.add(simulation_id)
+
+    def unsubscribe(self, subscriber: Subscriber, simulation_id: str):
+        subscribers = self._subscribers.get(simulation_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[simulation_id]
+        subscriber.simulation_ids.discard(simulation_id)
+
+    def _unsubscribe_all(self, subscriber: Subscriber):
+        for simulation_id in list(subscriber.simulation_ids):
+            self.unsubscribe(subscriber, simulation_id)
+
+    def subscriber_count(self, simulation_id: str) -> int:
+        return len(self._subscribers.get(simulation_id, ()))
+
+    def publish(self, simulation_id: str, message: Dict[str, Any], coalesce_key: Optional[str] = None):
+        """Queue a message for every subscriber of a simulation (never blocks)"""
+        for subscriber in self._subscribers.get(simulation_id, ()):
+            subscriber.offer(message, simulation_id, coalesce_key)
+
+hub = BroadcastHub(settings.WS_QUEUE_SIZE, settings.WS_QUEUE_POLICY)
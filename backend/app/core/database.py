@@ -0,0 +1,453 @@
+"""
+Persistence layer
+Scenarios, simulations and leaderboard entries are stored through an async
+Database interface with two backends, selected by PERSISTENCE_BACKEND:
+
+    memory: process-local dictionaries (development, tests, single worker)
+    mongo: MongoDB via motor, shared by every backend worker
+
+Simulations are appended to rather than rewritten: each flush pushes the
+actions and delta-encoded history records recorded since the previous one
+in a single update.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.leaderboard import LeaderboardIndex
+from app.core.rollups import AnalyticsRollups, Rollup, rollup_keys
+from app.core.state_history import StateHistory
+from app.models.analytics import CompletionRecord, LeaderboardEntry
+from app.models.scenario import ScenarioConfig, ScenarioSummary, DisasterType, DifficultyLevel
+from app.models.simulation import Simulation
+
+SUMMARY_FIELDS = tuple(ScenarioSummary.model_fields)
+
+class Database(ABC):
+    """Async storage for scenarios, simulations and the leaderboard"""
+
+    async def connect(self):
+        """Open connections and make sure indexes exist"""
+
+    async def close(self):
+        """Release connections"""
+
+    # Scenarios
+
+    @abstractmethod
+    async def get_scenario(self, scenario_id: str) -> Optional[ScenarioConfig]:
+        ...
+
+    @abstractmethod
+    async def save_scenario(self, scenario: ScenarioConfig):
+        """Insert or replace a scenario"""
+
+    @abstractmethod
+    async def delete_scenario(self, scenario_id: str) -> bool:
+        """Delete a scenario, returning whether it existed"""
+
+    @abstractmethod
+    async def list_scenarios(
+        self,
+        disaster_type: Optional[DisasterType] = None,
+        difficulty: Optional[DifficultyLevel] = None
+    ) -> List[ScenarioConfig]:
+        ...
+
+    @abstractmethod
+    async def list_scenario_summaries(
+        self,
+        disaster_type: Optional[DisasterType] = None,
+        difficulty: Optional[DifficultyLevel] = None
+    ) -> List[ScenarioSummary]:
+        """Like list_scenarios, without fetching the spatial configuration"""
+
+    # Simulations
+
+    @abstractmethod
+    async def get_simulation(self, simulation_id: str) -> Optional[Simulation]:
+        ...
+
+    @abstractmethod
+    async def save_simulation(self, simulation: Simulation):
+        """Insert or fully replace a simulation (on start and reset)"""
+
+    @abstractmethod
+    async def save_simulation_progress(self, simulation: Simulation, force: bool = False):
+        """
+        Persist the steps recorded since the last save; writes may be batched
+        across PERSIST_FLUSH_STEPS steps unless force is set
+        """
+
+    # Leaderboard
+
+    @abstractmethod
+    async def add_leaderboard_entries(self, entries: Sequence[LeaderboardEntry]):
+        ...
+
+    @abstractmethod
+    async def top_leaderboard_entries(
+        self,
+        scenario_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[LeaderboardEntry]:
+        """Highest scoring entries, globally or for one scenario"""
+
+    @abstractmethod
+    async def leaderboard_rank(self, score: float, scenario_id: Optional[str] = None) -> int:
+        """Rank a run with this score would get, globally or for one scenario"""
+
+    @abstractmethod
+    async def user_stats(self, user_id: str) -> Optional[Dict[str, float]]:
+        """
+        Running aggregates of a user's runs: count, score_sum, casualties_sum,
+        evacuation_rate_sum, best_score and scenarios_completed
+        """
+
+    # Analytics
+
+    @abstractmethod
+    async def record_completion(self, record: CompletionRecord):
+        """Add a completed simulation to its daily rollups"""
+
+    @abstractmethod
+    async def daily_rollups(
+        self,
+        dimension: str,
+        key: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[Tuple[date, Rollup]]:
+        """Day-ordered rollups of one (dimension, key) series"""
+
+class MemoryDatabase(Database):
+    """Process-local storage; data is lost on restart"""
+
+    def __init__(self):
+        self.scenarios: Dict[str, ScenarioConfig] = {}
+        self.simulations: Dict[str, Simulation] = {}
+        self.leaderboard = LeaderboardIndex()
+        self.rollups = AnalyticsRollups()
+
+    async def get_scenario(self, scenario_id: str) -> Optional[ScenarioConfig]:
+        return self.scenarios.get(scenario_id)
+
+    async def save_scenario(self, scenario: ScenarioConfig):
+        self.scenarios[scenario.id] = scenario
+
+    async def delete_scenario(self, scenario_id: str) -> bool:
+        return self.scenarios.pop(scenario_id, None) is not None
+
+    async def list_scenarios(self, disaster_type=None, difficulty=None) -> List[ScenarioConfig]:
+        scenarios = list(self.scenarios.values())
+        if disaster_type:
+            scenarios = [s for s in scenarios if s.disaster_type == disaster_type]
+        if difficulty:
+            scenarios = [s for s in scenarios if s.difficulty == difficulty]
+        return scenarios
+
+    async def list_scenario_summaries(self, disaster_type=None, difficulty=None) -> List[ScenarioSummary]:
+        return [
+            ScenarioSummary(**{field: getattr(s, field) for field in SUMMARY_FIELDS})
+            for s in await self.list_scenarios(disaster_type, difficulty)
+        ]
+
+    async def get_simulation(self, simulation_id: str) -> Optional[Simulation]:
+        return self.simulations.get(simulation_id)
+
+    async def save_simulation(self, simulation: Simulation):
+        self.simulations[simulation.id] = simulation
+
+    async def save_simulation_progress(self, simulation: Simulation, force: bool = False):
+        # Simulations are stored by reference
+        pass
+
+    async def add_leaderboard_entries(self, entries: Sequence[LeaderboardEntry]):
+        for entry in entries:
+            self.leaderboard.add(entry)
+
+    async def top_leaderboard_entries(self, scenario_id=None, limit=10) -> List[LeaderboardEntry]:
+        return self.leaderboard.top(limit, scenario_id)
+
+    async def leaderboard_rank(self, score: float, scenario_id=None) -> int:
+        return self.leaderboard.rank(score, scenario_id)
+
+    async def user_stats(self, user_id: str) -> Optional[Dict[str, float]]:
+        return self.leaderboard.user_stats(user_id)
+
+    async def record_completion(self, record: CompletionRecord):
+        self.rollups.add(record)
+
+    async def daily_rollups(self, dimension, key, start=None, end=None) -> List[Tuple[date, Rollup]]:
+        return self.rollups.daily(dimension, key, start, end)
+
+class MongoDatabase(Database):
+    """
+    MongoDB storage shared across backend workers
+
+    Simulations being stepped are cached in the worker that last loaded
+    them; before a cached copy is used its stored history length is checked
+    (a single indexed, projected read) and it is reloaded if another worker
+    has advanced it. With PERSIST_FLUSH_STEPS > 1 unflushed steps are only
+    visible to the worker holding them, so requests for one simulation
+    should then be routed to the same worker.
+    """
+
+    def __init__(self, url: str, db_name: str, flush_steps: int = 1):
+        self.url = url
+        self.db_name = db_name
+        self.flush_steps = max(1, flush_steps)
+        self.client = None
+        self.db = None
+        self._simulations: Dict[str, Simulation] = {}
+        # Number of (actions, states) of each cached simulation already stored
+        self._persisted: Dict[str, tuple] = {}
+
+    async def connect(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo import ASCENDING, DESCENDING
+
+        self.client = AsyncIOMotorClient(self.url)
+        self.db = self.client[self.db_name]
+        await self.db.scenarios.create_index([("disaster_type", ASCENDING), ("difficulty", ASCENDING)])
+        await self.db.simulations.create_index([("scenario_id", ASCENDING), ("final_score", DESCENDING)])
+        await self.db.simulations.create_index([("user_id", ASCENDING)])
+        await self.db.leaderboard.create_index([("scenario_id", ASCENDING), ("score", DESCENDING)])
+        await self.db.leaderboard.create_index([("score", DESCENDING)])
+        await self.db.leaderboard.create_index([("user_id", ASCENDING)])
+        await self.db.rollups.create_index([("dimension", ASCENDING), ("key", ASCENDING), ("day", ASCENDING)])
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    # Scenarios
+
+    @staticmethod
+    def _scenario_filter(disaster_type, difficulty) -> Dict[str, Any]:
+        query = {}
+        if disaster_type:
+            query["disaster_type"] = disaster_type.value
+        if difficulty:
+            query["difficulty"] = difficulty.value
+        return query
+
+    @staticmethod
+    def _from_document(document: Dict[str, Any]) -> Dict[str, Any]:
+        document["id"] = document.pop("_id")
+        return document
+
+    async def get_scenario(self, scenario_id: str) -> Optional[ScenarioConfig]:
+        document = await self.db.scenarios.find_one({"_id": scenario_id})
+        return ScenarioConfig(**self._from_document(document)) if document else None
+
+    async def save_scenario(self, scenario: ScenarioConfig):
+        document = scenario.model_dump(exclude={"id"})
+        await self.db.scenarios.replace_one({"_id": scenario.id}, document, upsert=True)
+
+    async def delete_scenario(self, scenario_id: str) -> bool:
+        result = await self.db.scenarios.delete_one({"_id": scenario_id})
+        return result.deleted_count > 0
+
+    async def list_scenarios(self, disaster_type=None, difficulty=None) -> List[ScenarioConfig]:
+        cursor = self.db.scenarios.find(self._scenario_filter(disaster_type, difficulty))
+        return [ScenarioConfig(**self._from_document(d)) async for d in cursor]
+
+    async def list_scenario_summaries(self, disaster_type=None, difficulty=None) -> List[ScenarioSummary]:
+        projection = {field: 1 for field in SUMMARY_FIELDS if field != "id"}
+        cursor = self.db.scenarios.find(self._scenario_filter(disaster_type, difficulty), projection)
+        return [ScenarioSummary(**self._from_document(d)) async for d in cursor]
+
+    # Simulations
+
+    async def get_simulation(self, simulation_id: str) -> Optional[Simulation]:
+        cached = self._simulations.get(simulation_id)
+        if cached is not None:
+            stored = await self.db.simulations.find_one({"_id": simulation_id}, {"history_length": 1})
+            if stored is None:
+                self._forget(simulation_id)
+                return None
+            if stored["history_length"] == self._persisted[simulation_id][1]:
+                return cached
+
+        document = await self.db.simulations.find_one({"_id": simulation_id})
+        if document is None:
+            return None
+        history = StateHistory.from_document(document.pop("history"))
+        document.pop("history_length", None)
+        simulation = Simulation(**self._from_document(document))
+        simulation.load_history(history)
+        self._cache(simulation)
+        return simulation
+
+    def _cache(self, simulation: Simulation):
+        self._simulations[simulation.id] = simulation
+        self._persisted[simulation.id] = (len(simulation.actions), simulation.num_states)
+
+    def _forget(self, simulation_id: str):
+        self._simulations.pop(simulation_id, None)
+        self._persisted.pop(simulation_id, None)
+
+    @staticmethod
+    def _simulation_fields(simulation: Simulation) -> Dict[str, Any]:
+        return simulation.model_dump(exclude={"id", "actions", "states"})
+
+    async def save_simulation(self, simulation: Simulation):
+        document = self._simulation_fields(simulation)
+        document["actions"] = [action.model_dump() for action in simulation.actions]
+        document["history"] = simulation.history.to_document()
+        document["history_length"] = simulation.num_states
+        await self.db.simulations.replace_one({"_id": simulation.id}, document, upsert=True)
+        self._cache(simulation)
+
+    async def save_simulation_progress(self, simulation: Simulation, force: bool = False):
+        if simulation.id not in self._persisted:
+            await self.save_simulation(simulation)
+            return
+
+        stored_actions, stored_states = self._persisted[simulation.id]
+        pending = simulation.num_states - stored_states
+        if pending <= 0 or (pending < self.flush_steps and not force):
+            return
+
+        history = simulation.history.to_document(stored_states)
+        push = {
+            "actions": {"$each": [a.model_dump() for a in simulation.actions[stored_actions:]]},
+            "history.records": {"$each": history.pop("records")},
+            "history.timesteps": {"$each": history.pop("timesteps")}
+        }
+        for field in ("total_casualties", "total_evacuated"):
+            push[f"history.{field}"] = {"$each": history.pop(field)}
+
+        update_fields = self._simulation_fields(simulation)
+        update_fields["history.sizes"] = history["sizes"]
+        update_fields["history_length"] = simulation.num_states
+        await self.db.simulations.update_one(
+            {"_id": simulation.id},
+            {"$set": update_fields, "$push": push}
+        )
+        self._cache(simulation)
+        if force:
+            # Finished simulations no longer need to stay in memory
+            self._forget(simulation.id)
+
+    # Leaderboard
+
+    async def add_leaderboard_entries(self, entries: Sequence[LeaderboardEntry]):
+        if not entries:
+            return
+        from pymongo import UpdateOne
+
+        await self.db.leaderboard.insert_many([e.model_dump(exclude={"rank"}) for e in entries])
+
+        # Running aggregates per user, updated in place instead of recomputed from the entries
+        await self.db.user_stats.bulk_write([
+            UpdateOne(
+                {"_id": e.user_id},
+                {
+                    "$inc": {
+                        "count": 1,
+                        "score_sum": e.score,
+                        "casualties_sum": e.casualties,
+                        "evacuation_rate_sum": e.evacuation_rate
+                    },
+                    "$max": {"best_score": e.score},
+                    "$addToSet": {"scenario_ids": e.scenario_id}
+                },
+                upsert=True
+            )
+            for e in entries
+        ], ordered=False)
+
+    async def top_leaderboard_entries(self, scenario_id=None, limit=10) -> List[LeaderboardEntry]:
+        query = {"scenario_id": scenario_id} if scenario_id else {}
+        cursor = self.db.leaderboard.find(query, {"_id": 0}).sort("score", -1).limit(limit)
+        return [LeaderboardEntry(rank=i + 1, **d) for i, d in enumerate(await cursor.to_list(length=limit))]
+
+    async def leaderboard_rank(self, score: float, scenario_id=None) -> int:
+        # Counted on the (scenario_id, score) / (score) indexes
+        query = {"score": {"$gte": score}}
+        if scenario_id:
+            query["scenario_id"] = scenario_id
+        return await self.db.leaderboard.count_documents(query) + 1
+
+    async def user_stats(self, user_id: str) -> Optional[Dict[str, float]]:
+        stats = await self.db.user_stats.find_one({"_id": user_id}, {"_id": 0})
+        if stats is None:
+            return None
+        stats["scenarios_completed"] = len(stats.pop("scenario_ids", []))
+        return stats
+
+    # Analytics
+
+    async def record_completion(self, record: CompletionRecord):
+        from pymongo import UpdateOne
+
+        day = datetime.combine(record.completed_at.date(), time())
+        updates = [
+            UpdateOne(
+                {"_id": f"{dimension}:{key}:{day.date().isoformat()}"},
+                {
+                    "$setOnInsert": {"dimension": dimension, "key": key, "day": day},
+                    "$inc": {
+                        "count": 1,
+                        "score_sum": record.score,
+                        "casualties_sum": record.casualties,
+                        "evacuated_sum": record.evacuated,
+                        "evacuation_rate_sum": record.evacuation_rate
+                    },
+                    "$max": {"best_score": record.score}
+                },
+                upsert=True
+            )
+            for dimension, key in rollup_keys(record)
+        ]
+        await self.db.rollups.bulk_write(updates, ordered=False)
+
+    async def daily_rollups(self, dimension, key, start=None, end=None) -> List[Tuple[date, Rollup]]:
+        query: Dict[str, Any] = {"dimension": dimension, "key": key}
+        if start is not None or end is not None:
+            query["day"] = {}
+            if start is not None:
+                query["day"]["$gte"] = datetime.combine(start, time())
+            if end is not None:
+                query["day"]["$lte"] = datetime.combine(end, time())
+        projection = {field: 1 for field in Rollup.FIELDS}
+        projection.update({"_id": 0, "day": 1})
+        cursor = self.db.rollups.find(query, projection).sort("day", 1)
+        return [
+            (d["day"].date(), Rollup(**{field: d[field] for field in Rollup.FIELDS}))
+            async for d in cursor
+        ]
+
+_database: Optional[Database] = None
+
+def create_database() -> Database:
+    """Create the configured persistence backend"""
+    if settings.PERSISTENCE_BACKEND == "mongo":
+        return MongoDatabase(settings.MONGODB_URL, settings.MONGODB_DB_NAME, settings.PERSIST_FLUSH_STEPS)
+    if settings.PERSISTENCE_BACKEND == "memory":
+        return MemoryDatabase()
+    raise ValueError(f"Unknown persistence backend: {settings.PERSISTENCE_BACKEND}")
+
+async def start_database():
+    """Connect the shared database (called from the app lifespan)"""
+    global _database
+    if _database is None:
+        _database = create_database()
+    await _database.connect()
+
+async def close_database():
+    global _database
+    if _database is not None:
+        await _database.close()
+        _database = None
+
+def get_database() -> Database:
+    """Dependency returning the shared database"""
+    global _database
+    if _database is None:
+        _database = create_database()
+    return _database
@@ -0,0 +1,88 @@
+"""
+Incrementally maintained leaderboard
+Entries are kept in score order, globally and per scenario, as they are
+inserted, together with running aggregates per user, so serving the
+leaderboard or a rank never needs a sort or a full scan.
+"""
+
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+from sortedcontainers import SortedList
+from app.models.analytics import LeaderboardEntry
+
+class RunningStats:
+    """Count, sums and best score of a group of leaderboard entries"""
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.casualties_sum = 0.0
+        self.evacuation_rate_sum = 0.0
+        self.best_score = float("-inf")
+        self.scenario_ids = set()
+
+    def add(self, entry: LeaderboardEntry):
+        self.count += 1
+        self.score_sum += entry.score
+        self.casualties_sum += entry.casualties
+        self.evacuation_rate_sum += entry.evacuation_rate
+        self.best_score = max(self.best_score, entry.score)
+        self.scenario_ids.add(entry.scenario_id)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "score_sum": self.score_sum,
+            "casualties_sum": self.casualties_sum,
+            "evacuation_rate_sum": self.evacuation_rate_sum,
+            "best_score": self.best_score,
+            "scenarios_completed": len(self.scenario_ids)
+        }
+
+class LeaderboardIndex:
+    """
+    Score-ordered leaderboard with per-user aggregates
+
+    Entries are ordered by descending score, earlier entries first on ties.
+    Inserts and rank lookups are O(log n); reading the top K is O(log n + K).
+    """
+
+    def __init__(self, entries: Iterable[LeaderboardEntry] = ()):
+        self._entries: List[LeaderboardEntry] = []
+        # (-score, insertion order) keys into _entries
+        self._global = SortedList()
+        self._by_scenario: Dict[str, SortedList] = {}
+        self._user_stats: Dict[str, RunningStats] = {}
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: LeaderboardEntry):
+        key = (-entry.score, len(self._entries))
+        self._entries.append(entry)
+        self._global.add(key)
+        self._by_scenario.setdefault(entry.scenario_id, SortedList()).add(key)
+        self._user_stats.setdefault(entry.user_id, RunningStats()).add(entry)
+
+    def _ordering(self, scenario_id: Optional[str]) -> SortedList:
+        if scenario_id:
+            return self._by_scenario.get(scenario_id, SortedList())
+        return self._global
+
+    def top(self, limit: int = 10, scenario_id: Optional[str] = None) -> List[LeaderboardEntry]:
+        """Highest scoring entries as ranked copies"""
+        keys = islice(self._ordering(scenario_id), max(0, limit))
+        return [
+            self._entries[index].model_copy(update={"rank": rank})
+            for rank, (_, index) in enumerate(keys, 1)
+        ]
+
+    def rank(self, score: float, scenario_id: Optional[str] = None) -> int:
+        """Rank a new entry with this score would get (1 = best)"""
+        return self._ordering(scenario_id).bisect_left((-score, len(self._entries))) + 1
+
+    def user_stats(self, user_id: str) -> Optional[Dict[str, float]]:
+        stats = self._user_stats.get(user_id)
+        return stats.to_dict() if stats else None
@@ -0,0 +1,47 @@
+"""
+Shared HTTP client for ML Engine communication
+One long-lived connection pool is opened with the application and reused by
+every request handler, instead of paying connection setup on each call.
+"""
+
+from typing import Optional
+import httpx
+from app.core.config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+def create_ml_client() -> httpx.AsyncClient:
+    """Create a pooled client for the ML Engine from the settings"""
+    return httpx.AsyncClient(
+        base_url=settings.ML_ENGINE_URL,
+        http2=settings.ML_ENGINE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.ML_ENGINE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ML_ENGINE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.ML_ENGINE_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            settings.ML_ENGINE_DEFAULT_TIMEOUT,
+            connect=settings.ML_ENGINE_CONNECT_TIMEOUT
+        )
+    )
+
+async def start_ml_client():
+    """Open the shared client (called from the app lifespan)"""
+    global _client
+    if _client is None:
+        _client = create_ml_client()
+
+async def close_ml_client():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def get_ml_client() -> httpx.AsyncClient:
+    """Dependency returning the shared ML Engine client"""
+    global _client
+    if _client is None:
+        _client = create_ml_client()
+    return _client
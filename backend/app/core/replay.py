@@ -0,0 +1,134 @@
+"""
+Streaming simulation replays
+Replays are produced step by step from the delta-encoded state history, so
+neither the backend nor the client has to hold the whole simulation at once.
+
+Formats:
+    json: a single document (for short ranges and backwards compatibility)
+    ndjson: a header line, then one line per step
+    binary: a JSON header line, then one fixed-size little-endian record per
+        step: int32 timestep, action_type, resource_id, target_zone_id and
+        success (-1 where no action was taken yet), followed by the selected
+        fields as float32 in header order
+"""
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+from app.models.simulation import Simulation, SimulationState
+
+REPLAY_FORMATS = ("json", "ndjson", "binary")
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+BINARY_REPLAY_CONTENT_TYPE = "application/octet-stream"
+
+STATE_FIELDS = tuple(SimulationState.model_fields)
+SCALAR_FIELDS = ("timestep", "total_casualties", "total_evacuated")
+ACTION_COLUMNS = ("timestep", "action_type", "resource_id", "target_zone_id", "success")
+
+FLOAT32 = np.dtype("<f4")
+INT32 = np.dtype("<i4")
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma separated field selection (all state fields if empty)"""
+    if not fields:
+        return list(STATE_FIELDS)
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in STATE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown state fields: {', '.join(unknown)}")
+    return selected
+
+def step_range(simulation: Simulation, start: int, end: Optional[int]) -> range:
+    """Recorded steps with timestep in [start, end)"""
+    stop = simulation.num_states if end is None else min(end, simulation.num_states)
+    return range(min(start, stop), stop)
+
+def header(simulation: Simulation, steps: range, fields: Sequence[str]) -> Dict[str, Any]:
+    return {
+        "type": "header",
+        "simulation_id": simulation.id,
+        "scenario_id": simulation.scenario_id,
+        "mode": simulation.mode.value,
+        "total_timesteps": simulation.current_timestep,
+        "start": steps.start,
+        "end": steps.stop,
+        "fields": list(fields)
+    }
+
+def iter_steps(simulation: Simulation, steps: range, fields: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """Yield each step's selected state fields and the action taken from it"""
+    actions = simulation.actions
+    for index, state in enumerate(simulation.history.iter_states(steps.start, steps.stop), steps.start):
+        yield {
+            "timestep": state["timestep"],
+            "action": actions[index].dict() if index < len(actions) else None,
+            "state": {field: state[field] for field in fields}
+        }
+
+def replay_document(simulation: Simulation, steps: range, fields: Sequence[str]) -> Dict[str, Any]:
+    """The whole range as one JSON document"""
+    document = header(simulation, steps, fields)
+    del document["type"]
+    records = list(iter_steps(simulation, steps, fields))
+    document["actions"] = [record["action"] for record in records if record["action"] is not None]
+    document["states"] = [record["state"] for record in records]
+    return document
+
+def _batches(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def stream_ndjson(simulation: Simulation, steps: range, fields: Sequence[str]) -> Iterator[bytes]:
+    """Header line followed by one line per step, flushed in chunks"""
+    yield (json.dumps(header(simulation, steps, fields)) + "\n").encode()
+    records = iter_steps(simulation, steps, fields)
+    for batch in _batches(records, max(1, settings.REPLAY_CHUNK_SIZE)):
+        yield "".join(json.dumps({"type": "step", **record}) + "\n" for record in batch).encode()
+
+def _field_lengths(simulation: Simulation, fields: Sequence[str]) -> Dict[str, int]:
+    if not simulation.num_states:
+        return {field: 1 if field in SCALAR_FIELDS else 0 for field in fields}
+    first = simulation.history.get(0)
+    return {field: 1 if field in SCALAR_FIELDS else len(first[field]) for field in fields}
+
+def stream_binary(simulation: Simulation, steps: range, fields: Sequence[str]) -> Iterator[bytes]:
+    """JSON header line followed by fixed-size float32 step records"""
+    lengths = _field_lengths(simulation, fields)
+    width = sum(lengths.values())
+
+    binary_header = header(simulation, steps, fields)
+    binary_header.update({
+        "steps": len(steps),
+        "action_columns": list(ACTION_COLUMNS),
+        "field_lengths": lengths,
+        "record_bytes": len(ACTION_COLUMNS) * INT32.itemsize + width * FLOAT32.itemsize
+    })
+    yield (json.dumps(binary_header) + "\n").encode()
+
+    actions = simulation.actions
+    states = enumerate(simulation.history.iter_states(steps.start, steps.stop), steps.start)
+    for batch in _batches(states, max(1, settings.REPLAY_CHUNK_SIZE)):
+        action_block = np.full((len(batch), len(ACTION_COLUMNS)), -1, dtype=INT32)
+        value_block = np.empty((len(batch), width), dtype=FLOAT32)
+        for row, (index, state) in enumerate(batch):
+            action_block[row, 0] = state["timestep"]
+            if index < len(actions):
+                action = actions[index]
+                action_block[row, 1:] = (
+                    action.action_type, action.resource_id, action.target_zone_id, int(action.success)
+                )
+            if width:
+                value_block[row] = np.concatenate([
+                    np.atleast_1d(np.asarray(state[field], dtype=FLOAT32)) for field in fields
+                ])
+        yield np.concatenate(
+            [action_block.view(np.uint8), value_block.view(np.uint8)], axis=1
+        ).tobytes()
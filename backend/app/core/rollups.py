@@ -0,0 +1,128 @@
+"""
+Incremental analytics rollups
+Every completed simulation is added to one daily rollup per dimension (all
+runs, its scenario and its difficulty). Dashboards merge the daily rollups
+into buckets of any number of days, so their cost depends on the number of
+days covered, not on the number of attempts.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.models.analytics import CompletionRecord, RollupBucket
+
+ROLLUP_DIMENSIONS = ("all", "scenario", "difficulty")
+ALL_KEY = "all"
+
+class Rollup:
+    """Count, sums and best score of a set of completions"""
+
+    FIELDS = ("count", "score_sum", "casualties_sum", "evacuated_sum", "evacuation_rate_sum", "best_score")
+
+    def __init__(
+        self,
+        count: int = 0,
+        score_sum: float = 0.0,
+        casualties_sum: float = 0.0,
+        evacuated_sum: float = 0.0,
+        evacuation_rate_sum: float = 0.0,
+        best_score: float = float("-inf")
+    ):
+        self.count = count
+        self.score_sum = score_sum
+        self.casualties_sum = casualties_sum
+        self.evacuated_sum = evacuated_sum
+        self.evacuation_rate_sum = evacuation_rate_sum
+        self.best_score = best_score
+
+    def add(self, record: CompletionRecord):
+        self.count += 1
+        self.score_sum += record.score
+        self.casualties_sum += record.casualties
+        self.evacuated_sum += record.evacuated
+        self.evacuation_rate_sum += record.evacuation_rate
+        self.best_score = max(self.best_score, record.score)
+
+    def merge(self, other: "Rollup"):
+        self.count += other.count
+        self.score_sum += other.score_sum
+        self.casualties_sum += other.casualties_sum
+        self.evacuated_sum += other.evacuated_sum
+        self.evacuation_rate_sum += other.evacuation_rate_sum
+        self.best_score = max(self.best_score, other.best_score)
+
+    def summary(self) -> Dict[str, float]:
+        """Attempts and averages as served by the analytics endpoints"""
+        if not self.count:
+            return {"total_attempts": 0, "avg_score": 0, "avg_casualties": 0, "avg_evacuation_rate": 0}
+        return {
+            "total_attempts": self.count,
+            "avg_score": self.score_sum / self.count,
+            "avg_casualties": self.casualties_sum / self.count,
+            "avg_evacuation_rate": self.evacuation_rate_sum / self.count,
+            "best_score": self.best_score
+        }
+
+def rollup_keys(record: CompletionRecord) -> List[Tuple[str, str]]:
+    """(dimension, key) pairs a completion is counted under"""
+    keys = [("all", ALL_KEY), ("scenario", record.scenario_id)]
+    if record.difficulty:
+        keys.append(("difficulty", record.difficulty))
+    return keys
+
+def bucket_start(day: date, bucket_days: int) -> date:
+    """First day of the bucket holding day; buckets are aligned on the proleptic ordinal"""
+    ordinal = day.toordinal()
+    return date.fromordinal(ordinal - (ordinal - 1) % bucket_days)
+
+def bucket_rollups(daily: Iterable[Tuple[date, Rollup]], bucket_days: int = 1) -> List[RollupBucket]:
+    """Merge day-ordered daily rollups into buckets of bucket_days days"""
+    buckets: List[Tuple[date, Rollup]] = []
+    for day, rollup in daily:
+        start = bucket_start(day, bucket_days)
+        if not buckets or buckets[-1][0] != start:
+            buckets.append((start, Rollup()))
+        buckets[-1][1].merge(rollup)
+
+    return [
+        RollupBucket(
+            date=start,
+            attempts=rollup.count,
+            avg_score=rollup.score_sum / rollup.count,
+            avg_casualties=rollup.casualties_sum / rollup.count,
+            avg_evacuation_rate=rollup.evacuation_rate_sum / rollup.count,
+            best_score=rollup.best_score
+        )
+        for start, rollup in buckets
+    ]
+
+def total_rollup(daily: Iterable[Tuple[date, Rollup]]) -> Rollup:
+    total = Rollup()
+    for _, rollup in daily:
+        total.merge(rollup)
+    return total
+
+class AnalyticsRollups:
+    """Daily rollups per (dimension, key), kept in memory"""
+
+    def __init__(self):
+        self._daily: Dict[Tuple[str, str], Dict[date, Rollup]] = {}
+
+    def add(self, record: CompletionRecord):
+        day = record.completed_at.date()
+        for key in rollup_keys(record):
+            self._daily.setdefault(key, {}).setdefault(day, Rollup()).add(record)
+
+    def daily(
+        self,
+        dimension: str,
+        key: str = ALL_KEY,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[Tuple[date, Rollup]]:
+        """Day-ordered rollups of one series, optionally limited to [start, end]"""
+        days = self._daily.get((dimension, key), {})
+        return sorted(
+            ((day, rollup) for day, rollup in days.items()
+             if (start is None or day >= start) and (end is None or day <= end)),
+            key=lambda item: item[0]
+        )
@@ -0,0 +1,220 @@
+"""
+Client for the ML Engine's simulation sessions
+The ML Engine keeps a live DisasterEnv per simulation (seeded from the
+scenario); the backend only sends actions and records the states it gets
+back, so observations never have to round-trip through the client.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import httpx
+from fastapi import HTTPException
+from app.core.config import settings
+from app.models.scenario import ScenarioConfig
+from app.models.simulation import Simulation, SimulationState, Action
+
+# Per-simulation locks with the number of requests holding or awaiting each
+_simulation_locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+@asynccontextmanager
+async def simulation_lock(simulation_id: str) -> AsyncIterator[None]:
+    """
+    Serialize the requests that advance or reset one simulation (within this
+    process), so each one loads the history the previous one saved
+    """
+    lock, users = _simulation_locks.get(simulation_id, (asyncio.Lock(), 0))
+    _simulation_locks[simulation_id] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _simulation_locks[simulation_id]
+        if users > 1:
+            _simulation_locks[simulation_id] = (lock, users - 1)
+        else:
+            del _simulation_locks[simulation_id]
+
+def environment_config(scenario: Optional[ScenarioConfig]) -> dict:
+    """DisasterEnv parameters for a scenario (environment defaults if unknown)"""
+    if scenario is None:
+        return {}
+    
+    config = {
+        "max_timesteps": scenario.max_timesteps,
+        "disaster_intensity": scenario.disaster_intensity,
+        "dispatch_model": settings.DISPATCH_MODEL,
+        "timestep_minutes": scenario.timestep_minutes
+    }
+    if scenario.zones:
+        config["num_zones"] = len(scenario.zones)
+    if scenario.shelters:
+        config["num_shelters"] = len(scenario.shelters)
+    if scenario.resources:
+        config["num_resources"] = len(scenario.resources)
+    return config
+
+def scenario_reference(scenario: Optional[ScenarioConfig]) -> Optional[dict]:
+    """Compiled layout the ML Engine should build the environment from, if any"""
+    if scenario is None or not scenario.id or not (scenario.zones and scenario.shelters and scenario.resources):
+        return None
+    return {"id": scenario.id, "version": scenario.version}
+
+def _action_vector(action: Action) -> List[int]:
+    return [action.action_type, action.resource_id, action.target_zone_id]
+
+async def _request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+    kwargs.setdefault("timeout", settings.ML_ENGINE_SESSION_TIMEOUT)
+    try:
+        return await client.request(method, url, **kwargs)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"ML Engine unavailable: {str(e)}")
+
+def _check(response: httpx.Response):
+    if response.status_code != 200:
+        try:
+            detail = f"ML Engine error: {response.json()['detail']}"
+        except (ValueError, KeyError, TypeError):
+            detail = "ML Engine error"
+        raise HTTPException(status_code=response.status_code, detail=detail)
+
+async def compile_scenario(client: httpx.AsyncClient, scenario: ScenarioConfig) -> dict:
+    """Upload a scenario's layout to the ML Engine, which compiles each version once"""
+    response = await _request(client, "PUT", f"/scenarios/{scenario.id}", json=scenario.model_dump(
+        mode="json", include={"version", "zones", "shelters", "roads", "resources"}
+    ))
+    _check(response)
+    return response.json()
+
+async def _request_with_scenario(
+    client: httpx.AsyncClient,
+    scenario: Optional[ScenarioConfig],
+    method: str,
+    url: str,
+    **kwargs
+) -> httpx.Response:
+    """Request that references the scenario, compiling it first if the ML Engine does not have it"""
+    response = await _request(client, method, url, **kwargs)
+    if response.status_code == 409 and scenario_reference(scenario) is not None:
+        await compile_scenario(client, scenario)
+        response = await _request(client, method, url, **kwargs)
+    return response
+
+async def create_session(
+    client: httpx.AsyncClient,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig],
+    replay_actions: Optional[List[Action]] = None
+) -> SimulationState:
+    """Create the simulation's environment, replaying any recorded actions"""
+    response = await _request_with_scenario(client, scenario, "POST", "/sessions", json={
+        "simulation_id": simulation.id,
+        "seed": simulation.seed,
+        "environment": environment_config(scenario),
+        "scenario": scenario_reference(scenario),
+        "replay_actions": [_action_vector(a) for a in replay_actions or []]
+    })
+    _check(response)
+    return SimulationState(**response.json())
+
+async def step_session(
+    client: httpx.AsyncClient,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig],
+    action: Action
+) -> Tuple[SimulationState, bool, bool]:
+    """
+    Apply an action to the simulation's environment
+    
+    Sessions evicted by the ML Engine are rebuilt from the seed and the
+    actions recorded so far before stepping.
+    
+    Returns:
+        (new state, whether the action succeeded, whether the episode ended)
+    """
+    url = f"/sessions/{simulation.id}/step"
+    payload = {"action": _action_vector(action)}
+    
+    response = await _request(client, "POST", url, json=payload)
+    if response.status_code == 404:
+        await create_session(client, simulation, scenario, replay_actions=simulation.actions)
+        response = await _request(client, "POST", url, json=payload)
+    _check(response)
+    
+    data = response.json()
+    return SimulationState(**data["state"]), data["action_success"], data["terminated"]
+
+async def run_session_steps(
+    client: httpx.AsyncClient,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig],
+    actions: List[Action],
+    policy_steps: int = 0,
+    deterministic: bool = True
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Apply several actions, then policy_steps actions chosen by the AI
+    policy, in a single ML Engine call
+    
+    Returns:
+        (one dict per executed step (state, action, action_success,
+        terminated, reward), reason the run stopped early or None); fewer
+        steps than requested also come back when the episode ended
+    """
+    url = f"/sessions/{simulation.id}/steps"
+    payload = {
+        "actions": [_action_vector(a) for a in actions],
+        "policy_steps": policy_steps,
+        "deterministic": deterministic
+    }
+    timeout = settings.ML_ENGINE_SESSION_TIMEOUT * max(1, (len(actions) + policy_steps) / 100)
+    
+    response = await _request(client, "POST", url, json=payload, timeout=timeout)
+    if response.status_code == 404:
+        await create_session(client, simulation, scenario, replay_actions=simulation.actions)
+        response = await _request(client, "POST", url, json=payload, timeout=timeout)
+    _check(response)
+    
+    data = response.json()
+    steps = data["steps"]
+    for step in steps:
+        step["state"] = SimulationState(**step["state"])
+    return steps, data.get("reason") if data.get("truncated") else None
+
+async def run_counterfactual(
+    client: httpx.AsyncClient,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig],
+    samples: int = 0
+) -> dict:
+    """
+    Play the simulation's seeded episode with the AI policy in control
+    
+    Returns:
+        {"policy": outcome, "samples": [outcome, ...]} where each outcome
+        has total_casualties, total_evacuated, total_reward, steps and decisions
+    """
+    response = await _request_with_scenario(client, scenario, "POST", "/rollouts", json={
+        "seed": simulation.seed,
+        "environment": environment_config(scenario),
+        "scenario": scenario_reference(scenario),
+        "samples": samples,
+        "fast_forward": settings.COMPARISON_FAST_FORWARD
+    }, timeout=settings.ML_ENGINE_ROLLOUT_TIMEOUT)
+    _check(response)
+    return response.json()
+
+async def reset_session(
+    client: httpx.AsyncClient,
+    simulation: Simulation,
+    scenario: Optional[ScenarioConfig]
+) -> SimulationState:
+    """Reset the simulation's environment to its seeded initial state"""
+    return await create_session(client, simulation, scenario)
+
+async def delete_session(client: httpx.AsyncClient, simulation_id: str):
+    """Release the simulation's environment (best effort)"""
+    try:
+        await client.delete(f"/sessions/{simulation_id}", timeout=settings.ML_ENGINE_SESSION_TIMEOUT)
+    except httpx.RequestError:
+        pass
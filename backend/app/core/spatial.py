@@ -0,0 +1,211 @@
+"""
+Spatial index for scenario zones, shelters and resources
+Points are projected to kilometres around the scenario's mean latitude and
+bucketed into a uniform grid stored in CSR form, so nearest-K, radius and
+bounding box queries only look at the cells around the query instead of
+scanning every point. Reported distances are great-circle distances.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.config import settings
+from app.models.scenario import Location, ScenarioConfig, SpatialMatch
+
+EARTH_RADIUS_KM = 6371.0
+SPATIAL_KINDS = ("zone", "shelter", "resource")
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km between points given in degrees (broadcasts)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+class GridIndex:
+    """
+    Uniform grid over one set of points
+
+    The cell size is chosen so that cells hold about two points on average.
+    Points in a cell are contiguous in _order, and cells of one grid column
+    are contiguous too, so a rectangle of cells is one slice per column.
+    """
+
+    def __init__(self, lats: Sequence[float], lons: Sequence[float], origin_lat: Optional[float] = None):
+        self.lat = np.asarray(lats, dtype=np.float64)
+        self.lon = np.asarray(lons, dtype=np.float64)
+        if origin_lat is None:
+            origin_lat = float(self.lat.mean()) if len(self.lat) else 0.0
+        self._x_scale = np.radians(1.0) * EARTH_RADIUS_KM * np.cos(np.radians(origin_lat))
+        self._y_scale = np.radians(1.0) * EARTH_RADIUS_KM
+        x, y = self._project(self.lat, self.lon)
+
+        if len(x):
+            self._x0, self._y0 = float(x.min()), float(y.min())
+            width, height = float(x.max()) - self._x0, float(y.max()) - self._y0
+        else:
+            self._x0 = self._y0 = width = height = 0.0
+        self.cell_km = max(np.sqrt(max(width * height, 1e-6) * 2 / max(len(x), 1)), 0.01)
+        self._nx = int(width // self.cell_km) + 1
+        self._ny = int(height // self.cell_km) + 1
+
+        ix, iy = self._cell(x, y)
+        cells = ix * self._ny + iy
+        self._order = np.argsort(cells, kind="stable")
+        self._ptr = np.zeros(self._nx * self._ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self._nx * self._ny), out=self._ptr[1:])
+        self._x, self._y = x, y
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _project(self, lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        return np.asarray(lon) * self._x_scale, np.asarray(lat) * self._y_scale
+
+    def _cell(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        ix = np.clip(((x - self._x0) // self.cell_km).astype(np.int64), 0, self._nx - 1)
+        iy = np.clip(((y - self._y0) // self.cell_km).astype(np.int64), 0, self._ny - 1)
+        return ix, iy
+
+    def _in_rect(self, x_lo: float, x_hi: float, y_lo: float, y_hi: float) -> np.ndarray:
+        """Indices of the points in the cells overlapping a projected rectangle"""
+        if not len(self) or x_hi < self._x0 or y_hi < self._y0:
+            return np.zeros(0, dtype=np.int64)
+        (ix_lo, ix_hi), (iy_lo, iy_hi) = self._cell(np.array([x_lo, x_hi]), np.array([y_lo, y_hi]))
+        if x_lo > self._x0 + self._nx * self.cell_km or y_lo > self._y0 + self._ny * self.cell_km:
+            return np.zeros(0, dtype=np.int64)
+        slices = [
+            self._order[self._ptr[ix * self._ny + iy_lo]:self._ptr[ix * self._ny + iy_hi + 1]]
+            for ix in range(ix_lo, ix_hi + 1)
+        ]
+        return np.concatenate(slices)
+
+    def _covers_all(self, x_lo: float, x_hi: float, y_lo: float, y_hi: float) -> bool:
+        return (x_lo <= self._x0 and y_lo <= self._y0
+                and x_hi >= self._x0 + self._nx * self.cell_km and y_hi >= self._y0 + self._ny * self.cell_km)
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances in km) of the k nearest points, nearest first"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        x, y = self._project(lat, lon)
+        half = self.cell_km * max(1.0, np.sqrt(k / 2))
+        while True:
+            # Every point within `half` of the query lies in this rectangle
+            rect = (x - half, x + half, y - half, y + half)
+            candidates = self._in_rect(*rect)
+            if len(candidates) >= k:
+                projected = np.hypot(self._x[candidates] - x, self._y[candidates] - y)
+                kth = np.partition(projected, k - 1)[k - 1]
+                if kth <= half or self._covers_all(*rect):
+                    break
+            elif self._covers_all(*rect):
+                break
+            half *= 2
+
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        best = np.argsort(distances, kind="stable")[:k]
+        return candidates[best], distances[best]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices, distances in km) of the points within radius_km, nearest first"""
+        x, y = self._project(lat, lon)
+        half = radius_km * 1.01 + 1e-9  # Margin for the projection error
+        candidates = self._in_rect(x - half, x + half, y - half, y + half)
+        distances = haversine_km(lat, lon, self.lat[candidates], self.lon[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Indices of the points inside a latitude/longitude box"""
+        (x_lo, x_hi), (y_lo, y_hi) = self._project(np.array([min_lat, max_lat]), np.array([min_lon, max_lon]))
+        candidates = self._in_rect(x_lo, x_hi, y_lo, y_hi)
+        inside = (
+            (self.lat[candidates] >= min_lat) & (self.lat[candidates] <= max_lat)
+            & (self.lon[candidates] >= min_lon) & (self.lon[candidates] <= max_lon)
+        )
+        return np.sort(candidates[inside])
+
+class ScenarioSpatialIndex:
+    """One grid per kind of scenario element, sharing a projection"""
+
+    def __init__(self, scenario: ScenarioConfig):
+        self.scenario_id = scenario.id
+        self.version = scenario.version
+        points = {
+            "zone": (scenario.zones, [z.center for z in scenario.zones]),
+            "shelter": (scenario.shelters, [s.location for s in scenario.shelters]),
+            "resource": (scenario.resources, [r.location for r in scenario.resources])
+        }
+        all_lats = [loc.lat for _, locations in points.values() for loc in locations]
+        origin_lat = float(np.mean(all_lats)) if all_lats else 0.0
+
+        self._ids: Dict[str, List[str]] = {}
+        self._grids: Dict[str, GridIndex] = {}
+        for kind, (items, locations) in points.items():
+            self._ids[kind] = [item.id for item in items]
+            self._grids[kind] = GridIndex([l.lat for l in locations], [l.lon for l in locations], origin_lat)
+
+    def _matches(self, kind: str, indices: np.ndarray, distances: Optional[np.ndarray]) -> List[SpatialMatch]:
+        grid = self._grids[kind]
+        return [
+            SpatialMatch(
+                kind=kind,
+                id=self._ids[kind][i],
+                index=int(i),
+                location=Location(lat=float(grid.lat[i]), lon=float(grid.lon[i])),
+                distance_km=float(distances[n]) if distances is not None else None
+            )
+            for n, i in enumerate(indices)
+        ]
+
+    def _kinds(self, kind: Optional[str]) -> Sequence[str]:
+        return SPATIAL_KINDS if kind is None else (kind,)
+
+    def nearest(self, lat: float, lon: float, k: int = 1, kind: Optional[str] = None) -> List[SpatialMatch]:
+        matches = []
+        for name in self._kinds(kind):
+            matches += self._matches(name, *self._grids[name].nearest(lat, lon, k))
+        return sorted(matches, key=lambda m: m.distance_km)[:k]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float, kind: Optional[str] = None) -> List[SpatialMatch]:
+        matches = []
+        for name in self._kinds(kind):
+            matches += self._matches(name, *self._grids[name].within_radius(lat, lon, radius_km))
+        return sorted(matches, key=lambda m: m.distance_km)
+
+    def in_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float, kind: Optional[str] = None) -> List[SpatialMatch]:
+        matches = []
+        for name in self._kinds(kind):
+            matches += self._matches(name, self._grids[name].in_bbox(min_lat, min_lon, max_lat, max_lon), None)
+        return matches
+
+class SpatialIndexCache:
+    """Spatial indexes by scenario id, rebuilt when the scenario version changes"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._indexes: "OrderedDict[str, ScenarioSpatialIndex]" = OrderedDict()
+
+    def build(self, scenario: ScenarioConfig) -> ScenarioSpatialIndex:
+        index = ScenarioSpatialIndex(scenario)
+        self._indexes[scenario.id] = index
+        self._indexes.move_to_end(scenario.id)
+        while len(self._indexes) > self.max_entries:
+            self._indexes.popitem(last=False)
+        return index
+
+    def get(self, scenario: ScenarioConfig) -> ScenarioSpatialIndex:
+        """Index of a scenario, building it if missing or outdated"""
+        index = self._indexes.get(scenario.id)
+        if index is None or index.version != scenario.version:
+            return self.build(scenario)
+        self._indexes.move_to_end(scenario.id)
+        return index
+
+    def remove(self, scenario_id: str):
+        self._indexes.pop(scenario_id, None)
+
+spatial_indexes = SpatialIndexCache(settings.SPATIAL_INDEX_CACHE_SIZE)
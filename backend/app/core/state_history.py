@@ -0,0 +1,203 @@
+"""
+Compact simulation state history
+Stores the per-step SimulationState snapshots of a simulation as float32
+columns with delta encoding: every keyframe_interval steps a full keyframe is
+stored, and in between only the elements that changed since the previous
+step. Any step can be reconstructed on demand from its keyframe.
+"""
+
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+import numpy as np
+from app.core.config import settings
+
+# Per-zone/per-shelter arrays and the observation, delta-encoded as float32
+ARRAY_FIELDS = (
+    "zone_populations",
+    "zone_evacuated",
+    "zone_casualties",
+    "shelter_occupancy",
+    "observation"
+)
+# Episode totals, stored as float64 columns
+SCALAR_FIELDS = ("total_casualties", "total_evacuated")
+
+_KEYFRAME = b"K"
+_DELTA = b"D"
+FLOAT32 = np.dtype("<f4")
+UINT32 = np.dtype("<u4")
+
+class StateHistory:
+    """
+    Delta-encoded history of simulation states
+
+    Args:
+        keyframe_interval: Steps between full keyframes; bounds the number of
+            deltas applied to reconstruct a step
+        compress: zlib-compress every stored record
+    """
+
+    def __init__(
+        self,
+        keyframe_interval: Optional[int] = None,
+        compress: Optional[bool] = None
+    ):
+        if keyframe_interval is None:
+            keyframe_interval = settings.STATE_HISTORY_KEYFRAME_INTERVAL
+        if compress is None:
+            compress = settings.STATE_HISTORY_COMPRESS
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.compress = compress
+        self.clear()
+
+    def clear(self):
+        """Remove every stored state"""
+        self._timesteps = array("q")
+        self._scalars = {field: array("d") for field in SCALAR_FIELDS}
+        self._records: List[bytes] = []
+        self._sizes: Optional[List[int]] = None
+        self._latest: Optional[List[np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the stored history"""
+        return (
+            sum(len(record) for record in self._records)
+            + self._timesteps.itemsize * len(self._timesteps)
+            + sum(column.itemsize * len(column) for column in self._scalars.values())
+        )
+
+    def append(self, state: Mapping[str, Any]):
+        """Record the next state (a SimulationState dump or equivalent mapping)"""
+        arrays = [np.asarray(state[field], dtype=FLOAT32) for field in ARRAY_FIELDS]
+        sizes = [len(values) for values in arrays]
+
+        if self._latest is None or sizes != self._sizes or len(self._records) % self.keyframe_interval == 0:
+            if self._latest is not None and sizes != self._sizes:
+                raise ValueError("State dimensions changed within a simulation")
+            record = _KEYFRAME + b"".join(values.tobytes() for values in arrays)
+        else:
+            changed = [np.flatnonzero(new != old).astype(UINT32) for new, old in zip(arrays, self._latest)]
+            record = (
+                _DELTA
+                + np.array([len(indices) for indices in changed], dtype=UINT32).tobytes()
+                + b"".join(indices.tobytes() for indices in changed)
+                + b"".join(new[indices].tobytes() for new, indices in zip(arrays, changed))
+            )
+
+        if self.compress:
+            record = zlib.compress(record, 1)
+
+        self._records.append(record)
+        self._sizes = sizes
+        self._latest = arrays
+        self._timesteps.append(int(state["timestep"]))
+        for field in SCALAR_FIELDS:
+            self._scalars[field].append(float(state[field]))
+
+    def to_document(self, start: int = 0) -> Dict[str, Any]:
+        """
+        Serializable form of the history (steps from start on), used by the
+        persistence layer to store or append to a simulation's history
+        """
+        document = {
+            "keyframe_interval": self.keyframe_interval,
+            "compress": self.compress,
+            "sizes": self._sizes,
+            "records": self._records[start:],
+            "timesteps": self._timesteps[start:].tolist()
+        }
+        for field in SCALAR_FIELDS:
+            document[field] = self._scalars[field][start:].tolist()
+        return document
+
+    @classmethod
+    def from_document(cls, document: Mapping[str, Any]) -> "StateHistory":
+        """Rebuild a history stored with to_document"""
+        history = cls(document["keyframe_interval"], document["compress"])
+        history._records = [bytes(record) for record in document["records"]]
+        history._sizes = document["sizes"]
+        history._timesteps = array("q", document["timesteps"])
+        for field in SCALAR_FIELDS:
+            history._scalars[field] = array("d", document[field])
+
+        if history._records:
+            last = len(history._records) - 1
+            for position in range(last - last % history.keyframe_interval, last + 1):
+                history._latest = history._decode(position, history._latest)
+        return history
+
+    def _decode(self, index: int, arrays: Optional[List[np.ndarray]]) -> List[np.ndarray]:
+        """Apply record index on top of the arrays of the previous step"""
+        record = self._records[index]
+        if self.compress:
+            record = zlib.decompress(record)
+
+        if record[:1] == _KEYFRAME:
+            values = np.frombuffer(record, dtype=FLOAT32, offset=1)
+            return np.split(values.copy(), np.cumsum(self._sizes)[:-1])
+
+        counts = np.frombuffer(record, dtype=UINT32, count=len(ARRAY_FIELDS), offset=1)
+        offset = 1 + counts.nbytes
+        indices = np.split(
+            np.frombuffer(record, dtype=UINT32, count=int(counts.sum()), offset=offset),
+            np.cumsum(counts)[:-1]
+        )
+        offset += int(counts.sum()) * UINT32.itemsize
+        values = np.split(
+            np.frombuffer(record, dtype=FLOAT32, count=int(counts.sum()), offset=offset),
+            np.cumsum(counts)[:-1]
+        )
+
+        arrays = [previous.copy() for previous in arrays]
+        for target, changed, new in zip(arrays, indices, values):
+            target[changed] = new
+        return arrays
+
+    def _state(self, index: int, arrays: List[np.ndarray]) -> Dict[str, Any]:
+        state: Dict[str, Any] = {"timestep": self._timesteps[index]}
+        for field, values in zip(ARRAY_FIELDS, arrays):
+            state[field] = values.tolist()
+        for field in SCALAR_FIELDS:
+            state[field] = self._scalars[field][index]
+        return state
+
+    def get(self, index: int) -> Dict[str, Any]:
+        """Reconstruct the state recorded at position index (negative counts from the end)"""
+        if index < 0:
+            index += len(self._records)
+        if not 0 <= index < len(self._records):
+            raise IndexError("State history index out of range")
+
+        if index == len(self._records) - 1:
+            return self._state(index, self._latest)
+
+        keyframe = index - index % self.keyframe_interval
+        arrays = None
+        for position in range(keyframe, index + 1):
+            arrays = self._decode(position, arrays)
+        return self._state(index, arrays)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent state, or None if nothing was recorded"""
+        if not self._records:
+            return None
+        return self._state(len(self._records) - 1, self._latest)
+
+    def iter_states(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Reconstruct states start..stop-1 in order, decoding each record once"""
+        stop = len(self._records) if stop is None else min(stop, len(self._records))
+        start = max(0, start)
+        if start >= stop:
+            return
+
+        arrays = None
+        for position in range(start - start % self.keyframe_interval, stop):
+            arrays = self._decode(position, arrays)
+            if position >= start:
+                yield self._state(position, arrays)
@@ -0,0 +1,92 @@
+"""
+Binary observation transport
+Observations can travel as raw little-endian float32 (Content-Type:
+application/octet-stream) instead of JSON lists, both from clients to the
+backend and from the backend to the ML Engine. Binary bodies are forwarded
+as-is, without validating or boxing every float.
+
+Layouts (shared with the ML Engine):
+    single observation: obs_dim float32 values
+    trajectory: steps * obs_dim float32 observations followed by steps * 3
+        int32 actions, with the number of steps in the X-Steps header
+"""
+
+from typing import Dict, List, Optional, Tuple, Type
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+SIMULATION_ID_HEADER = "X-Simulation-Id"
+STEPS_HEADER = "X-Steps"
+ACTION_DIM = 3
+
+FLOAT32 = np.dtype("<f4")
+INT32 = np.dtype("<i4")
+
+def is_binary(request: Request) -> bool:
+    """Check whether the request body uses the binary layout"""
+    return request.headers.get("content-type", "").split(";")[0].strip() == BINARY_CONTENT_TYPE
+
+def encode_observation(observation: List[float]) -> bytes:
+    """Encode one observation as raw float32"""
+    return np.asarray(observation, dtype=FLOAT32).tobytes()
+
+def decode_observation(payload: bytes) -> np.ndarray:
+    """Decode one raw float32 observation"""
+    return np.frombuffer(payload, dtype=FLOAT32)
+
+def validate_trajectory(observations: List[List[float]], actions: List[List[int]]):
+    """Raise ValueError unless the trajectory fits the rectangular layout"""
+    if len(observations) != len(actions):
+        raise ValueError("Trajectory needs one action per observation")
+    if len({len(observation) for observation in observations}) > 1:
+        raise ValueError("Observations must all have the same length")
+    if any(len(action) != ACTION_DIM for action in actions):
+        raise ValueError(f"Actions must have {ACTION_DIM} components")
+
+def encode_trajectory(observations: List[List[float]], actions: List[List[int]]) -> Tuple[bytes, Dict[str, str]]:
+    """Encode observations and actions, returning the body and its headers"""
+    validate_trajectory(observations, actions)
+    body = np.asarray(observations, dtype=FLOAT32).tobytes() + np.asarray(actions, dtype=INT32).tobytes()
+    return body, {"Content-Type": BINARY_CONTENT_TYPE, STEPS_HEADER: str(len(observations))}
+
+def binary_headers(simulation_id: Optional[str] = None) -> Dict[str, str]:
+    """Headers for a binary single-observation body"""
+    headers = {"Content-Type": BINARY_CONTENT_TYPE}
+    if simulation_id:
+        headers[SIMULATION_ID_HEADER] = simulation_id
+    return headers
+
+async def read_observation(request: Request, model_cls: Type[BaseModel]) -> Tuple[bytes, Optional[str]]:
+    """
+    Read an observation from either a JSON body (validated with model_cls)
+    or a binary body
+
+    Returns:
+        (raw float32 observation bytes, simulation id or None)
+    """
+    body = await request.body()
+    if is_binary(request):
+        if not body or len(body) % FLOAT32.itemsize:
+            raise HTTPException(status_code=400, detail="Observation must be a non-empty sequence of float32 values")
+        return body, request.headers.get(SIMULATION_ID_HEADER)
+
+    try:
+        parsed = model_cls.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    return encode_observation(parsed.observation), parsed.simulation_id
+
+def request_body_docs(model_cls: Type[BaseModel]) -> dict:
+    """OpenAPI request body listing both the JSON and the binary content types"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": model_cls.model_json_schema()},
+                BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
@@ -1,12 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.database import start_database, close_database
+from app.core.ml_client import start_ml_client, close_ml_client
 from app.api import scenarios, simulations, ai, analytics
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown"""
+    await start_database()
+    await start_ml_client()
+    yield
+    await close_ml_client()
+    await close_database()
+
 app = FastAPI(
     title="Disaster Preparedness Simulator API",
     description="Backend API for disaster response training and simulation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
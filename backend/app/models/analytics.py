@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date, datetime
+
+class LeaderboardEntry(BaseModel):
+    """Leaderboard entry"""
+    rank: int = 0  # Assigned when the leaderboard is read
+    user_id: str
+    username: str
+    scenario_id: str
+    score: float
+    casualties: float
+    evacuated: float
+    evacuation_rate: float
+    completed_at: datetime
+
+class PerformanceStats(BaseModel):
+    """User performance statistics"""
+    total_simulations: int
+    avg_score: float
+    avg_casualties: float
+    avg_evacuation_rate: float
+    best_score: float
+    scenarios_completed: int
+
+class CompletionRecord(BaseModel):
+    """Outcome of a completed simulation, fed into the analytics rollups"""
+    scenario_id: str
+    difficulty: Optional[str] = None
+    user_id: Optional[str] = None
+    score: float
+    casualties: float
+    evacuated: float
+    evacuation_rate: float
+    completed_at: datetime
+
+class RollupBucket(BaseModel):
+    """Aggregated completions of one time bucket"""
+    date: date  # First day of the bucket
+    attempts: int
+    avg_score: float
+    avg_casualties: float
+    avg_evacuation_rate: float
+    best_score: float
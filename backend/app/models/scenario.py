@@ -72,6 +72,7 @@ class ScenarioConfig(BaseModel):
     # Metadata
     created_at: Optional[datetime] = None
     created_by: Optional[str] = None
+    version: int = 1  # Bumped on every update; keys the ML Engine's compiled layout
     
     class Config:
         json_schema_extra = {
@@ -88,3 +89,23 @@ class ScenarioConfig(BaseModel):
                 "disaster_intensity": 0.7
             }
         }
+
+class ScenarioSummary(BaseModel):
+    """Scenario listing entry without the spatial configuration"""
+    id: str
+    name: str
+    description: str
+    disaster_type: DisasterType
+    difficulty: DifficultyLevel
+    max_timesteps: int = 100
+    disaster_intensity: float
+    created_at: Optional[datetime] = None
+    created_by: Optional[str] = None
+
+class SpatialMatch(BaseModel):
+    """Scenario element found by a spatial query"""
+    kind: str  # zone, shelter or resource
+    id: str
+    index: int  # Position in the scenario's list of that kind
+    location: Location
+    distance_km: Optional[float] = None  # From the query point (nearest and radius queries)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Iterator, List, Dict, Optional
+from app.core.state_history import StateHistory
 from datetime import datetime
 from enum import Enum
 
@@ -36,11 +37,20 @@ class SimulationState(BaseModel):
     total_evacuated: float
     observation: List[float]
 
+class BatchStepInput(BaseModel):
+    """Several steps to execute in one call"""
+    actions: List[Action] = []  # Executed in order
+    ai_steps: int = Field(0, ge=0)  # Then this many steps chosen by the AI policy
+    deterministic: bool = True  # Use the policy's most likely actions
+    stream_progress: bool = False  # Publish every step to WebSocket subscribers
+    include_states: bool = True  # Return the state after every step
+
 class SimulationConfig(BaseModel):
     """Configuration for starting a simulation"""
     scenario_id: str
     mode: SimulationMode = SimulationMode.MANUAL
     user_id: Optional[str] = None
+    seed: Optional[int] = None  # Random if not given
 
 class Simulation(BaseModel):
     """Complete simulation record"""
@@ -52,19 +62,63 @@ class Simulation(BaseModel):
     # Simulation data
     current_timestep: int = 0
     max_timesteps: int = 100
+    seed: Optional[int] = None
     
     actions: List[Action] = []
-    states: List[SimulationState] = []
+    states: List[SimulationState] = []  # Filled from the history in API responses only
     
     # Final metrics
     final_casualties: Optional[float] = None
     final_evacuated: Optional[float] = None
     final_score: Optional[float] = None
     
+    # AI outcome on the same seed (COMPARISON mode)
+    ai_casualties: Optional[float] = None
+    ai_evacuated: Optional[float] = None
+    ai_sample_casualties: Optional[List[float]] = None
+    
     # Metadata
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     user_id: Optional[str] = None
+    
+    # Per-step states, stored delta-encoded instead of as a list of models
+    _history: StateHistory = PrivateAttr(default_factory=StateHistory)
+    
+    def record_state(self, state: SimulationState):
+        """Append the state reached at the current step"""
+        self._history.append(state.model_dump())
+    
+    def load_history(self, history: StateHistory):
+        """Replace the recorded states (when loading a stored simulation)"""
+        self._history = history
+    
+    def clear_states(self):
+        self._history.clear()
+    
+    @property
+    def history(self) -> StateHistory:
+        return self._history
+    
+    @property
+    def num_states(self) -> int:
+        return len(self._history)
+    
+    def state_at(self, index: int) -> SimulationState:
+        """Reconstruct a recorded state (negative indices count from the end)"""
+        return SimulationState(**self._history.get(index))
+    
+    def latest_state(self) -> Optional[SimulationState]:
+        state = self._history.latest()
+        return SimulationState(**state) if state is not None else None
+    
+    def iter_states(self, start: int = 0, stop: Optional[int] = None) -> Iterator[SimulationState]:
+        for state in self._history.iter_states(start, stop):
+            yield SimulationState(**state)
+    
+    def with_states(self) -> "Simulation":
+        """Copy with the full state list materialized, for API responses"""
+        return self.model_copy(update={"states": list(self.iter_states())})
 
 class SimulationMetrics(BaseModel):
     """Performance metrics for a completed simulation"""
@@ -79,3 +133,4 @@ class SimulationMetrics(BaseModel):
     ai_casualties: Optional[float] = None
     ai_evacuated: Optional[float] = None
     performance_vs_ai: Optional[float] = None  # percentage difference
+    ai_sample_casualties: Optional[List[float]] = None  # Stochastic AI rollouts
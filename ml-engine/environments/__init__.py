@@ -1,4 +1,6 @@
 # Environments Package
 from environments.disaster_env import DisasterEnv
+from environments.vec_disaster_env import VecDisasterEnv
+from environments.shmem_vec_env import ShmemVecEnv
 
-__all__ = ['DisasterEnv']
+__all__ = ['DisasterEnv', 'VecDisasterEnv', 'ShmemVecEnv']
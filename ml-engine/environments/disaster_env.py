@@ -7,10 +7,19 @@ resources, evacuate populations, and minimize casualties.
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 from enum import IntEnum
+import copy
+import heapq
 import json
 
+from environments.kernels import (
+    CASUALTY_RATE, MAX_EVACUEES_PER_ACTION, RISK_GROWTH, accumulate_casualties, accumulate_casualties_over,
+    evacuate, steps_until_risk
+)
+from environments.road_network import RoadNetwork
+from environments.scenario_compiler import CompiledScenario
+
 class ActionType(IntEnum):
     """Types of actions the agent can take"""
     SEND_AMBULANCE = 0
@@ -19,6 +28,63 @@ class ActionType(IntEnum):
     EVACUATE_ZONE = 3
     OPEN_SHELTER = 4
 
+def observation_slices(
+    num_zones: int,
+    num_shelters: int,
+    num_resources: int,
+    num_road_features: Optional[int] = None
+) -> Dict[str, slice]:
+    """
+    Offsets of each state component within the flat observation vector
+
+    Shared by every environment implementation so that observations (and
+    therefore trained policies) stay interchangeable between them.
+    num_road_features defaults to the dense num_zones x num_zones road matrix.
+    """
+    if num_road_features is None:
+        num_road_features = num_zones * num_zones
+    sizes = [
+        ('zone_populations', num_zones),
+        ('zone_evacuated', num_zones),
+        ('zone_casualties', num_zones),
+        ('shelter_capacity', num_shelters),
+        ('shelter_occupancy', num_shelters),
+        ('resource_positions', num_resources * 2),
+        ('resource_available', num_resources),
+        ('road_network', num_road_features),
+        ('timestep', 1),
+    ]
+    slices = {}
+    offset = 0
+    for name, size in sizes:
+        slices[name] = slice(offset, offset + size)
+        offset += size
+    return slices
+
+# Per-episode arrays captured by DisasterEnv.get_state() (plus the road status)
+STATE_ARRAYS = (
+    'zone_populations',
+    'zone_evacuated',
+    'zone_casualties',
+    'zone_risk',
+    'shelter_capacity',
+    'shelter_occupancy',
+    'resource_positions',
+    'resource_home',
+    'resource_available',
+    'resource_busy_until',
+)
+
+# Travel dispatch model: resources drive to the zone and back at this speed
+DISPATCH_SPEED_KMH = 40.0
+DISPATCH_SERVICE_MINUTES = 15.0  # Time spent at the zone
+
+def grid_zone_positions(num_zones: int) -> np.ndarray:
+    """Zone centers in [0, 1]^2 for the row-by-row square lattice of RoadNetwork.grid"""
+    side = int(np.ceil(np.sqrt(num_zones)))
+    zones = np.arange(num_zones)
+    return (np.stack([zones % side, zones // side], axis=1) + 0.5).astype(np.float32) / side
+
 class DisasterEnv(gym.Env):
     """
     Disaster Response Environment
@@ -53,10 +119,67 @@ class DisasterEnv(gym.Env):
         num_resources: int = 10,
         max_timesteps: int = 100,
         disaster_intensity: float = 0.5,
-        render_mode: Optional[str] = None
+        render_mode: Optional[str] = None,
+        return_obs_view: bool = False,
+        road_model: str = "dense",
+        road_graph: Optional[RoadNetwork] = None,
+        scenario: Optional[CompiledScenario] = None,
+        dispatch_model: str = "instant",
+        timestep_minutes: float = 15.0,
+        fast_forward: bool = False,
+        risk_event_threshold: float = 0.8,
+        max_skip_steps: Optional[int] = None
     ):
+        """
+        Args:
+            road_model: "dense" tracks a status for every pair of zones;
+                "sparse" only tracks the roads of road_graph, so step cost and
+                observation size grow with the number of roads instead of
+                num_zones squared.
+            road_graph: Road topology for the sparse model. Defaults to a
+                lattice connecting each zone to its grid neighbours.
+            scenario: Compiled scenario to reset to instead of a random
+                layout. It sets num_zones, num_shelters and num_resources;
+                only the zone risk is still drawn from the seed. Its roads
+                become the road graph of the sparse model, which has to be
+                requested explicitly because it changes the observation size
+                (trained policies expect the dense layout); with the dense
+                model they are the matrix entries of the zones they connect.
+                Evacuees go to the nearest reachable shelter with capacity
+                over the roads instead of the first shelter with capacity.
+            dispatch_model: "instant" leaves resources available all
+                episode; "travel" sends a resource to the target zone and
+                back, keeping it unavailable until its scheduled return
+                (round trip at DISPATCH_SPEED_KMH plus
+                DISPATCH_SERVICE_MINUTES, in steps of timestep_minutes).
+                Returns are kept in a heap, so a step only handles the
+                resources due back, whatever the fleet size.
+            timestep_minutes: Simulated time per step, for travel dispatch
+            fast_forward: If True, each step() applies the action's timestep
+                and then skips, without actions, to the next decision point:
+                a resource returning, a zone's risk reaching
+                risk_event_threshold, the episode end or max_skip_steps.
+                Risk growth and casualties over the skipped steps are
+                applied in closed form, and road degradation as one draw
+                of the summed wear, so trajectories are not step-for-step
+                identical to the regular mode. Steps where the action fills
+                a shelter are never skipped. info['skipped_steps'] reports
+                the jump and the reward covers the whole interval.
+            return_obs_view: If True, observations are returned as a read-only
+                view of the environment's internal buffer instead of a copy.
+                The view is overwritten in place by the next reset()/step(),
+                so callers must copy it if they need to keep it.
+        """
         super().__init__()
         
+        if scenario is not None:
+            num_zones = scenario.num_zones
+            num_shelters = scenario.num_shelters
+            num_resources = scenario.num_resources
+            if road_model == "sparse" and scenario.road_graph is not None:
+                road_graph = scenario.road_graph
+        self.scenario = scenario
+        
         self.grid_size = grid_size
         self.num_zones = num_zones
         self.num_shelters = num_shelters
@@ -64,10 +187,40 @@ class DisasterEnv(gym.Env):
         self.max_timesteps = max_timesteps
         self.disaster_intensity = disaster_intensity
         self.render_mode = render_mode
+        self.return_obs_view = return_obs_view
+        
+        # Dispatch model
+        if dispatch_model not in ("instant", "travel"):
+            raise ValueError(f"Unknown dispatch model: {dispatch_model}")
+        self.dispatch_model = dispatch_model
+        self.timestep_minutes = timestep_minutes
+        self.fast_forward = fast_forward
+        self.risk_event_threshold = risk_event_threshold
+        self.max_skip_steps = max_skip_steps
+        if scenario is not None:
+            self.zone_positions = scenario.zone_positions
+            self.map_km = scenario.map_km
+        else:
+            self.zone_positions = grid_zone_positions(num_zones)
+            self.map_km = np.full(2, grid_size, dtype=np.float32)
+        
+        # Road model
+        if road_model not in ("dense", "sparse"):
+            raise ValueError(f"Unknown road model: {road_model}")
+        self.road_model = road_model
+        if road_model == "sparse":
+            self.road_graph = road_graph if road_graph is not None else RoadNetwork.grid(num_zones)
+            self.num_road_features = self.road_graph.num_edges
+        else:
+            self.road_graph = None
+            self.num_road_features = num_zones * num_zones
         
         # Initialize state dimensions
         self.state_dim = self._calculate_state_dim()
         
+        # Preallocate the observation buffer with fixed views per component
+        self._allocate_observation()
+        
         # Define action space
         # Actions: [action_type (5 types), resource_id, target_zone_id]
         self.action_space = spaces.MultiDiscrete([
@@ -93,34 +246,77 @@ class DisasterEnv(gym.Env):
         dim += self.num_zones * 3  # population, evacuated, casualties per zone
         dim += self.num_shelters * 2  # capacity, occupancy per shelter
         dim += self.num_resources * 3  # location (x,y), availability
-        dim += self.num_zones * self.num_zones  # road network status matrix
+        dim += self.num_road_features  # road status (matrix or per road)
         dim += 1  # current timestep
         return dim
     
+    def _allocate_observation(self):
+        """Allocate the observation buffer and the views that are written in place"""
+        slices = observation_slices(
+            self.num_zones, self.num_shelters, self.num_resources, self.num_road_features
+        )
+        self._obs_buffer = np.zeros(self.state_dim, dtype=np.float32)
+        
+        self._obs_zone_populations = self._obs_buffer[slices['zone_populations']]
+        self._obs_zone_evacuated = self._obs_buffer[slices['zone_evacuated']]
+        self._obs_zone_casualties = self._obs_buffer[slices['zone_casualties']]
+        self._obs_shelter_capacity = self._obs_buffer[slices['shelter_capacity']]
+        self._obs_shelter_occupancy = self._obs_buffer[slices['shelter_occupancy']]
+        self._obs_resource_positions = self._obs_buffer[slices['resource_positions']].reshape(self.num_resources, 2)
+        self._obs_resource_available = self._obs_buffer[slices['resource_available']]
+        self._obs_road_network = self._obs_buffer[slices['road_network']]
+        if self.road_model == "dense":
+            self._obs_road_network = self._obs_road_network.reshape(self.num_zones, self.num_zones)
+        self._obs_timestep = self._obs_buffer[slices['timestep']]
+        
+        self._obs_readonly = self._obs_buffer.view()
+        self._obs_readonly.flags.writeable = False
+    
     def reset(self, seed: Optional[int] = None, options: Optional[dict] = None) -> Tuple[np.ndarray, dict]:
         """Reset the environment to initial state"""
         super().reset(seed=seed)
         
         self.current_step = 0
         
-        # Initialize zones with populations
-        self.zone_populations = self.np_random.integers(100, 1000, size=self.num_zones).astype(np.float32)
+        if self.scenario is not None:
+            # Compiled scenario: copy the precomputed layout, draw only the risk
+            self.zone_populations = self.scenario.zone_populations.copy()
+            self.zone_risk = self.np_random.random(self.num_zones).astype(np.float32) * self.disaster_intensity
+            self.shelter_capacity = self.scenario.shelter_capacity.copy()
+            self.shelter_occupancy = self.scenario.shelter_occupancy.copy()
+            self.resource_positions = self.scenario.resource_positions.copy()
+            self.router = self.scenario.router.copy()
+        else:
+            # Initialize zones with populations
+            self.zone_populations = self.np_random.integers(100, 1000, size=self.num_zones).astype(np.float32)
+            
+            # Initialize zone risk levels (affected by disaster)
+            self.zone_risk = self.np_random.random(self.num_zones).astype(np.float32) * self.disaster_intensity
+            
+            # Initialize shelters
+            self.shelter_capacity = self.np_random.integers(200, 500, size=self.num_shelters).astype(np.float32)
+            self.shelter_occupancy = np.zeros(self.num_shelters, dtype=np.float32)
+            
+            # Initialize resources (x, y)
+            self.resource_positions = self.np_random.random((self.num_resources, 2)).astype(np.float32)
+        
         self.zone_evacuated = np.zeros(self.num_zones, dtype=np.float32)
         self.zone_casualties = np.zeros(self.num_zones, dtype=np.float32)
-        
-        # Initialize zone risk levels (affected by disaster)
-        self.zone_risk = self.np_random.random(self.num_zones).astype(np.float32) * self.disaster_intensity
-        
-        # Initialize shelters
-        self.shelter_capacity = self.np_random.integers(200, 500, size=self.num_shelters).astype(np.float32)
-        self.shelter_occupancy = np.zeros(self.num_shelters, dtype=np.float32)
-        
-        # Initialize resources (x, y, available)
-        self.resource_positions = self.np_random.random((self.num_resources, 2)).astype(np.float32)
+        self.resource_home = self.resource_positions.copy()
         self.resource_available = np.ones(self.num_resources, dtype=np.float32)
+        self.resource_busy_until = np.zeros(self.num_resources, dtype=np.int64)
+        self._dispatch_events: List[Tuple[int, int]] = []  # Heap of (return step, resource id)
         
         # Initialize road network (fully operational at start)
-        self.road_network = np.ones((self.num_zones, self.num_zones), dtype=np.float32)
+        if self.road_model == "sparse":
+            self.road_status = self.road_graph.initial_status.copy()
+        else:
+            self.road_network = np.ones((self.num_zones, self.num_zones), dtype=np.float32)
+            if self.scenario is not None and self.scenario.road_graph is not None:
+                # Scenario roads start at their own status (0 = destroyed); other pairs stay open
+                graph = self.scenario.road_graph
+                self.road_network[graph.edges[:, 0], graph.edges[:, 1]] = graph.initial_status
+                self.road_network[graph.edges[:, 1], graph.edges[:, 0]] = graph.initial_status
         
         # Metrics
         self.total_casualties = 0
@@ -132,6 +328,75 @@ class DisasterEnv(gym.Env):
         
         return observation, info
     
+    def _state_arrays(self) -> Tuple[str, ...]:
+        return STATE_ARRAYS + (('road_status',) if self.road_model == "sparse" else ('road_network',))
+    
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Snapshot of the current episode, including the random number
+        generator, that set_state() restores exactly
+        
+        The snapshot holds copies, so it stays valid while the environment
+        keeps stepping.
+        """
+        state = {name: getattr(self, name).copy() for name in self._state_arrays()}
+        state['current_step'] = self.current_step
+        state['total_casualties'] = self.total_casualties
+        state['total_evacuated'] = self.total_evacuated
+        state['resources_used'] = self.resources_used
+        state['dispatch_events'] = list(self._dispatch_events)
+        state['rng_state'] = copy.deepcopy(self.np_random.bit_generator.state)
+        return state
+    
+    def set_state(self, state: Dict[str, Any]) -> np.ndarray:
+        """
+        Restore a snapshot taken with get_state() by this or an identically
+        configured environment
+        
+        Returns:
+            Observation of the restored state
+        """
+        for name in self._state_arrays():
+            if np.shape(state[name]) != np.shape(getattr(self, name)):
+                raise ValueError(f"State component '{name}' does not match the environment configuration")
+        
+        for name in self._state_arrays():
+            setattr(self, name, state[name].copy())
+        self.current_step = state['current_step']
+        self.total_casualties = state['total_casualties']
+        self.total_evacuated = state['total_evacuated']
+        self.resources_used = state['resources_used']
+        self._dispatch_events = list(state['dispatch_events'])
+        self.np_random.bit_generator.state = copy.deepcopy(state['rng_state'])
+        if self.scenario is not None:
+            # Routes follow from the road status
+            self.router = self.scenario.router.copy()
+            self.router.update(self._scenario_road_status())
+        
+        return self._get_observation()
+    
+    def fork(self, n: int) -> List["DisasterEnv"]:
+        """
+        Create n independent copies of the environment at its current state
+        
+        Copies share the immutable configuration (spaces, road graph) but
+        have their own state arrays, observation buffer and generator. The
+        generators start from the same state, so forks given the same
+        actions stay identical; reseed a fork's np_random to branch the
+        disaster as well.
+        """
+        state = self.get_state()
+        bit_generator_cls = type(self.np_random.bit_generator)
+        forks = []
+        for _ in range(n):
+            env = copy.copy(self)
+            env.action_space = copy.deepcopy(self.action_space)
+            env._allocate_observation()
+            env.np_random = np.random.Generator(bit_generator_cls())
+            env.set_state(state)
+            forks.append(env)
+        return forks
+    
     def step(self, action: np.ndarray) -> Tuple[np.ndarray, float, bool, bool, dict]:
         """
         Execute one timestep of the environment
@@ -143,6 +408,7 @@ class DisasterEnv(gym.Env):
             observation, reward, terminated, truncated, info
         """
         action_type, resource_id, target_zone = action
+        full_shelters = int((self.shelter_occupancy >= self.shelter_capacity).sum())
         
         # Execute action
         action_success = self._execute_action(action_type, resource_id, target_zone)
@@ -159,6 +425,15 @@ class DisasterEnv(gym.Env):
         
         # Increment timestep
         self.current_step += 1
+        self._complete_dispatches()
+        
+        # Skip to the next event
+        skipped = 0
+        if self.fast_forward and self.current_step < self.max_timesteps:
+            if (self.shelter_occupancy >= self.shelter_capacity).sum() == full_shelters:
+                skipped = self._steps_to_next_event()
+            if skipped > 0:
+                reward += self._skip(skipped)
         
         # Check termination conditions
         terminated = self.current_step >= self.max_timesteps
@@ -166,6 +441,9 @@ class DisasterEnv(gym.Env):
         
         observation = self._get_observation()
         info = self._get_info()
+        info['action_success'] = bool(action_success)
+        if self.fast_forward:
+            info['skipped_steps'] = skipped
         
         return observation, reward, terminated, truncated, info
     
@@ -175,53 +453,161 @@ class DisasterEnv(gym.Env):
             return False
         
         if action_type == ActionType.EVACUATE_ZONE:
-            # Evacuate population from zone to nearest shelter
-            evacuees = min(
-                self.zone_populations[target_zone] - self.zone_evacuated[target_zone],
-                50  # Max 50 people per action
-            )
+            if self.scenario is not None:
+                evacuees = self._evacuate_nearest(target_zone)
+            else:
+                # Evacuate up to 50 people from zone to the first shelter with capacity
+                evacuees = evacuate(
+                    self.zone_populations,
+                    self.zone_evacuated,
+                    self.shelter_capacity,
+                    self.shelter_occupancy,
+                    target_zone
+                )
             
             if evacuees > 0:
-                # Find shelter with capacity
-                for i in range(self.num_shelters):
-                    available_capacity = self.shelter_capacity[i] - self.shelter_occupancy[i]
-                    if available_capacity > 0:
-                        actual_evacuees = min(evacuees, available_capacity)
-                        self.zone_evacuated[target_zone] += actual_evacuees
-                        self.shelter_occupancy[i] += actual_evacuees
-                        self.total_evacuated += actual_evacuees
-                        self.resources_used += 1
-                        return True
+                self.total_evacuated += evacuees
+                self.resources_used += 1
+                self._dispatch(resource_id, target_zone)
+                return True
         
         elif action_type in [ActionType.SEND_AMBULANCE, ActionType.SEND_MEDICAL_TEAM, ActionType.SEND_SUPPLY_TRUCK]:
             # Send resource to zone (reduces risk temporarily)
             self.zone_risk[target_zone] *= 0.9  # 10% risk reduction
             self.resources_used += 1
+            self._dispatch(resource_id, target_zone)
             return True
         
         return False
     
+    def _dispatch(self, resource_id: int, target_zone: int):
+        """Send a resource to a zone until its scheduled return (travel dispatch model)"""
+        if self.dispatch_model != "travel":
+            return
+        
+        offset = (self.zone_positions[target_zone] - self.resource_home[resource_id]) * self.map_km
+        minutes = 2 * float(np.hypot(*offset)) / DISPATCH_SPEED_KMH * 60 + DISPATCH_SERVICE_MINUTES
+        due = self.current_step + 1 + int(np.ceil(minutes / self.timestep_minutes))
+        
+        self.resource_available[resource_id] = 0
+        self.resource_busy_until[resource_id] = due
+        self.resource_positions[resource_id] = self.zone_positions[target_zone]
+        heapq.heappush(self._dispatch_events, (due, int(resource_id)))
+    
+    def _complete_dispatches(self):
+        """Return the resources due back by the current step"""
+        events = self._dispatch_events
+        while events and events[0][0] <= self.current_step:
+            _, resource_id = heapq.heappop(events)
+            self.resource_available[resource_id] = 1
+            self.resource_positions[resource_id] = self.resource_home[resource_id]
+    
+    def _evacuate_nearest(self, target_zone: int) -> float:
+        """Evacuate up to 50 people from a zone to its nearest reachable shelter with capacity"""
+        free_capacity = self.shelter_capacity - self.shelter_occupancy
+        shelter, _ = self.router.nearest_shelter(target_zone, free_capacity)
+        if shelter < 0:
+            return 0.0
+        
+        evacuees = min(
+            self.zone_populations[target_zone] - self.zone_evacuated[target_zone],
+            MAX_EVACUEES_PER_ACTION,
+            free_capacity[shelter]
+        )
+        evacuees = max(float(evacuees), 0.0)
+        self.zone_evacuated[target_zone] += evacuees
+        self.shelter_occupancy[shelter] += evacuees
+        return evacuees
+    
+    def _steps_to_next_event(self) -> int:
+        """Steps without actions until the next decision point (fast-forward mode)"""
+        steps = self.max_timesteps - self.current_step
+        if self.max_skip_steps is not None:
+            steps = min(steps, self.max_skip_steps)
+        if self._dispatch_events:
+            steps = min(steps, self._dispatch_events[0][0] - self.current_step)
+        below = self.zone_risk < self.risk_event_threshold
+        if self.risk_event_threshold <= 1 and below.any():
+            steps = min(steps, int(steps_until_risk(self.zone_risk[below], self.risk_event_threshold).min()))
+        return max(steps, 0)
+    
+    def _skip(self, steps: int) -> float:
+        """
+        Advance `steps` timesteps without actions in closed form
+        
+        Returns:
+            Reward summed over the skipped steps
+        """
+        start_casualties = self.total_casualties
+        start_risk = self.zone_risk
+        self.zone_risk, new_casualties = accumulate_casualties_over(
+            self.zone_populations,
+            self.zone_evacuated,
+            self.zone_risk,
+            self.zone_casualties,
+            steps
+        )
+        self.total_casualties += new_casualties
+        
+        # Road wear summed over the interval (normal approximation of the sum of uniforms)
+        shape = self.road_status.shape if self.road_model == "sparse" else self.road_network.shape
+        wear = self.np_random.normal(steps / 2, np.sqrt(steps / 12), size=shape).clip(0, steps) * 0.01
+        if self.road_model == "sparse":
+            self.road_status = np.clip(self.road_status - wear, 0, 1).astype(np.float32)
+        else:
+            self.road_network = np.clip(self.road_network - wear, 0, 1).astype(np.float32)
+        if self.scenario is not None:
+            self.router.update(self._scenario_road_status())
+        
+        self.current_step += steps
+        self._complete_dispatches()
+        
+        # Per-step rewards without actions: casualty penalty plus terms that stay constant
+        evacuation_rate = self.total_evacuated / self.zone_populations.sum()
+        reward = -new_casualties * 100 + steps * (evacuation_rate * 50 - self.resources_used * 0.1)
+        if evacuation_rate > 0.8 and start_casualties < 10:
+            # Efficiency bonus for the steps ending with fewer than 10 casualties in total
+            risk = np.minimum(start_risk * RISK_GROWTH ** np.arange(1, steps + 1)[:, None], 1)
+            unprotected = self.zone_populations - self.zone_evacuated
+            step_casualties = (risk * unprotected * CASUALTY_RATE).sum(axis=1)
+            reward += 100 * int((start_casualties + np.cumsum(step_casualties) < 10).sum())
+        return float(reward)
+    
     def _update_disaster(self):
         """Update disaster progression (increase risk over time)"""
         # Disaster intensifies slightly each timestep
         self.zone_risk = np.clip(
-            self.zone_risk * 1.02,  # 2% increase per step
+            self.zone_risk * RISK_GROWTH,  # 2% increase per step
             0, 1
         )
         
         # Road network degradation
-        degradation = self.np_random.random((self.num_zones, self.num_zones)) * 0.01
-        self.road_network = np.clip(self.road_network - degradation, 0, 1)
+        if self.road_model == "sparse":
+            degradation = self.np_random.random(self.road_graph.num_edges) * 0.01
+            self.road_status = np.clip(self.road_status - degradation, 0, 1).astype(np.float32)
+        else:
+            degradation = self.np_random.random((self.num_zones, self.num_zones)) * 0.01
+            self.road_network = np.clip(self.road_network - degradation, 0, 1)
+        if self.scenario is not None:
+            self.router.update(self._scenario_road_status())
+    
+    def _scenario_road_status(self) -> Optional[np.ndarray]:
+        """Current status of the compiled scenario's roads, for routing"""
+        graph = self.scenario.road_graph
+        if graph is None:
+            return None
+        if self.road_model == "sparse":
+            return self.road_status
+        return self.road_network[graph.edges[:, 0], graph.edges[:, 1]]
     
     def _calculate_casualties(self) -> float:
         """Calculate casualties for this timestep"""
-        casualties = 0
-        for i in range(self.num_zones):
-            unprotected = self.zone_populations[i] - self.zone_evacuated[i]
-            zone_casualties = unprotected * self.zone_risk[i] * 0.01  # 1% casualty rate per risk unit
-            self.zone_casualties[i] += zone_casualties
-            casualties += zone_casualties
-        return casualties
+        return accumulate_casualties(
+            self.zone_populations,
+            self.zone_evacuated,
+            self.zone_risk,
+            self.zone_casualties
+        )
     
     def _calculate_reward(self, casualties: float, action_success: bool) -> float:
         """Calculate reward for this timestep"""
@@ -249,28 +635,31 @@ class DisasterEnv(gym.Env):
     
     def _get_observation(self) -> np.ndarray:
         """Get current observation (normalized state)"""
-        obs = []
-        
         # Zone information (normalized)
-        obs.extend(self.zone_populations / 1000.0)
-        obs.extend(self.zone_evacuated / 1000.0)
-        obs.extend(self.zone_casualties / 100.0)
+        np.divide(self.zone_populations, 1000.0, out=self._obs_zone_populations)
+        np.divide(self.zone_evacuated, 1000.0, out=self._obs_zone_evacuated)
+        np.divide(self.zone_casualties, 100.0, out=self._obs_zone_casualties)
         
         # Shelter information (normalized)
-        obs.extend(self.shelter_capacity / 500.0)
-        obs.extend(self.shelter_occupancy / 500.0)
+        np.divide(self.shelter_capacity, 500.0, out=self._obs_shelter_capacity)
+        np.divide(self.shelter_occupancy, 500.0, out=self._obs_shelter_occupancy)
         
         # Resource information
-        obs.extend(self.resource_positions.flatten())
-        obs.extend(self.resource_available)
+        self._obs_resource_positions[:] = self.resource_positions
+        self._obs_resource_available[:] = self.resource_available
         
-        # Road network (flattened)
-        obs.extend(self.road_network.flatten())
+        # Road network
+        if self.road_model == "sparse":
+            self._obs_road_network[:] = self.road_status
+        else:
+            self._obs_road_network[:] = self.road_network
         
         # Timestep (normalized)
-        obs.append(self.current_step / self.max_timesteps)
+        self._obs_timestep[0] = self.current_step / self.max_timesteps
         
-        return np.array(obs, dtype=np.float32)
+        if self.return_obs_view:
+            return self._obs_readonly
+        return self._obs_buffer.copy()
     
     def _get_info(self) -> dict:
         """Get additional information about current state"""
@@ -0,0 +1,151 @@
+"""
+Array kernels for the disaster dynamics
+Shared by DisasterEnv and VecDisasterEnv. Every kernel operates on the last
+axis (zones or shelters) and broadcasts over any leading axes, so the same
+code handles a single scenario of shape (zones,) and a batch of shape
+(num_envs, zones).
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+MAX_EVACUEES_PER_ACTION = 50
+CASUALTY_RATE = 0.01  # 1% casualty rate per risk unit
+RISK_GROWTH = 1.02  # Risk multiplier per timestep (capped at 1)
+
+
+def _take(array: np.ndarray, index: np.ndarray) -> np.ndarray:
+    """Select array[..., index] independently for every leading position"""
+    return np.take_along_axis(array, index[..., None], axis=-1)[..., 0]
+
+
+def _add(array: np.ndarray, index: np.ndarray, values: np.ndarray):
+    """In-place array[..., index] += values for every leading position"""
+    updated = _take(array, index) + values
+    np.put_along_axis(array, index[..., None], updated[..., None], axis=-1)
+
+
+def first_available_shelter(
+    shelter_capacity: np.ndarray,
+    shelter_occupancy: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the first shelter with free capacity
+
+    Returns:
+        (shelter index, free capacity of that shelter); the free capacity is 0
+        where every shelter is full
+    """
+    free_capacity = shelter_capacity - shelter_occupancy
+    has_capacity = free_capacity > 0
+    shelter = np.asarray(has_capacity.argmax(axis=-1))
+    capacity = np.where(has_capacity.any(axis=-1), _take(free_capacity, shelter), 0).astype(free_capacity.dtype)
+    return shelter, capacity
+
+
+def evacuate(
+    zone_populations: np.ndarray,
+    zone_evacuated: np.ndarray,
+    shelter_capacity: np.ndarray,
+    shelter_occupancy: np.ndarray,
+    target_zone: np.ndarray,
+    mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Move up to MAX_EVACUEES_PER_ACTION people from the target zone into the
+    first shelter with free capacity, updating zone_evacuated and
+    shelter_occupancy in place
+
+    Args:
+        target_zone: Zone index per leading position
+        mask: Optional boolean mask of leading positions that evacuate
+
+    Returns:
+        Number of people moved per leading position (0 where nothing moved)
+    """
+    target_zone = np.asarray(target_zone)
+    evacuees = np.minimum(
+        _take(zone_populations, target_zone) - _take(zone_evacuated, target_zone),
+        zone_populations.dtype.type(MAX_EVACUEES_PER_ACTION)
+    )
+    shelter, capacity = first_available_shelter(shelter_capacity, shelter_occupancy)
+
+    moved = np.minimum(np.maximum(evacuees, 0), capacity)
+    if mask is not None:
+        moved = np.where(mask, moved, 0).astype(zone_evacuated.dtype)
+
+    _add(zone_evacuated, target_zone, moved)
+    _add(shelter_occupancy, shelter, moved)
+    return moved
+
+
+def accumulate_casualties(
+    zone_populations: np.ndarray,
+    zone_evacuated: np.ndarray,
+    zone_risk: np.ndarray,
+    zone_casualties: np.ndarray
+) -> np.ndarray:
+    """
+    Add this timestep's casualties of the unprotected population to
+    zone_casualties in place
+
+    Returns:
+        New casualties summed over zones, per leading position
+    """
+    unprotected = zone_populations - zone_evacuated
+    new_casualties = unprotected * zone_risk * zone_casualties.dtype.type(CASUALTY_RATE)
+    zone_casualties += new_casualties
+    return new_casualties.sum(axis=-1, dtype=np.float64)
+
+
+def steps_until_risk(zone_risk: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Timesteps of risk growth until each zone's risk reaches threshold
+    (0 where it already has, a large sentinel where risk is 0)
+    """
+    risk = np.asarray(zone_risk, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        steps = np.ceil(np.log(threshold / risk) / np.log(RISK_GROWTH) - 1e-9)
+    steps = np.where(risk > 0, np.maximum(steps, 0), np.iinfo(np.int32).max)
+    return steps.astype(np.int64)
+
+
+def grow_risk(zone_risk: np.ndarray, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Closed form of `steps` timesteps of risk growth
+
+    Returns:
+        (risk after the last step, sum of the risk after each step), where
+        the risk after step j is min(zone_risk * RISK_GROWTH**j, 1)
+    """
+    risk = np.asarray(zone_risk, dtype=np.float64)
+    # Steps before the risk saturates at 1
+    growing = np.minimum(steps_until_risk(risk, 1.0) - 1, steps).clip(0)
+    risk_sum = (
+        risk * RISK_GROWTH * (RISK_GROWTH ** growing - 1) / (RISK_GROWTH - 1)
+        + (steps - growing) * (risk > 0)
+    )
+    final = np.minimum(risk * RISK_GROWTH ** steps, 1)
+    return final.astype(zone_risk.dtype), risk_sum
+
+
+def accumulate_casualties_over(
+    zone_populations: np.ndarray,
+    zone_evacuated: np.ndarray,
+    zone_risk: np.ndarray,
+    zone_casualties: np.ndarray,
+    steps: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Closed form of `steps` timesteps of risk growth followed by
+    accumulate_casualties, with no evacuations in between; zone_casualties
+    is updated in place
+
+    Returns:
+        (risk after the last step, new casualties summed over zones)
+    """
+    final_risk, risk_sum = grow_risk(zone_risk, steps)
+    unprotected = zone_populations - zone_evacuated
+    new_casualties = (unprotected * risk_sum * CASUALTY_RATE).astype(zone_casualties.dtype)
+    zone_casualties += new_casualties
+    return final_risk, new_casualties.sum(axis=-1, dtype=np.float64)
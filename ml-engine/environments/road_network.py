@@ -0,0 +1,97 @@
+"""
+Sparse road network between zones
+Stores only the roads that actually exist as an edge list with a CSR adjacency,
+so memory, degradation and observation size scale with the number of roads
+rather than with num_zones squared.
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+
+class RoadNetwork:
+    """
+    Immutable road topology
+
+    Each road is an undirected edge between two zones, mirroring the ``Road``
+    model of the backend scenario configuration (two endpoints, a length in km
+    and an initial operational status). Per-edge status changes during an
+    episode are held by the environment, so one topology can be shared by many
+    environment copies.
+
+    Attributes:
+        edges: (num_edges, 2) zone indices of each road's endpoints
+        length_km: (num_edges,) road lengths
+        initial_status: (num_edges,) status at reset, 1.0 = fully operational
+        indptr, indices, edge_ids: CSR adjacency; the neighbours of zone ``z``
+            are ``indices[indptr[z]:indptr[z + 1]]`` reached through roads
+            ``edge_ids[indptr[z]:indptr[z + 1]]``
+    """
+
+    def __init__(
+        self,
+        num_zones: int,
+        edges: np.ndarray,
+        length_km: Optional[np.ndarray] = None,
+        initial_status: Optional[np.ndarray] = None
+    ):
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if edges.size and (edges.min() < 0 or edges.max() >= num_zones):
+            raise ValueError("Road endpoints must be valid zone indices")
+
+        self.num_zones = num_zones
+        self.num_edges = len(edges)
+        self.edges = edges
+
+        if length_km is None:
+            length_km = np.ones(self.num_edges)
+        if initial_status is None:
+            initial_status = np.ones(self.num_edges)
+        self.length_km = np.asarray(length_km, dtype=np.float32).reshape(self.num_edges)
+        self.initial_status = np.clip(
+            np.asarray(initial_status, dtype=np.float32).reshape(self.num_edges), 0, 1
+        )
+
+        # Build the undirected CSR adjacency (each road is listed from both ends)
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+        edge_ids = np.concatenate([np.arange(self.num_edges)] * 2)
+        order = np.argsort(sources, kind='stable')
+        self.indices = targets[order]
+        self.edge_ids = edge_ids[order]
+        self.indptr = np.zeros(num_zones + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_zones), out=self.indptr[1:])
+
+        for array in (self.edges, self.length_km, self.initial_status,
+                      self.indices, self.edge_ids, self.indptr):
+            array.flags.writeable = False
+
+    @classmethod
+    def grid(cls, num_zones: int) -> "RoadNetwork":
+        """
+        Default topology: zones laid out row by row on a square lattice, with a
+        road to each horizontal and vertical neighbour
+        """
+        side = int(np.ceil(np.sqrt(num_zones)))
+        zones = np.arange(num_zones)
+        col = zones % side
+
+        horizontal = zones[(col < side - 1) & (zones + 1 < num_zones)]
+        vertical = zones[zones + side < num_zones]
+        edges = np.concatenate([
+            np.stack([horizontal, horizontal + 1], axis=1),
+            np.stack([vertical, vertical + side], axis=1)
+        ])
+        return cls(num_zones, edges)
+
+    def neighbors(self, zone: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (neighbouring zones, connecting road ids) of a zone"""
+        start, end = self.indptr[zone], self.indptr[zone + 1]
+        return self.indices[start:end], self.edge_ids[start:end]
+
+    def to_dense(self, status: np.ndarray) -> np.ndarray:
+        """Expand per-road status into a num_zones x num_zones matrix (0 = no road)"""
+        matrix = np.zeros((self.num_zones, self.num_zones), dtype=np.float32)
+        matrix[self.edges[:, 0], self.edges[:, 1]] = status
+        matrix[self.edges[:, 1], self.edges[:, 0]] = status
+        return matrix
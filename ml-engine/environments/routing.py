@@ -0,0 +1,181 @@
+"""
+Evacuation routing over the road network
+Shortest travel times from every zone to every shelter, kept current as roads
+degrade. Times are computed with one Dijkstra run per zone hosting a shelter.
+When roads get slower, only the runs whose shortest-path tree uses one of
+those roads are invalidated, and they are repeated only when travel times are
+next needed; each zone's shelters are likewise re-sorted by travel time only
+when that zone is next evacuated.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from environments.road_network import RoadNetwork
+
+ROAD_SPEED_KMH = 40.0  # On a fully operational road
+STATUS_BANDS = 10  # Road speed changes in steps of 1/STATUS_BANDS of road status
+MIN_ROAD_MINUTES = 1e-6  # Zero-weight edges would vanish from the sparse graph
+
+
+def status_bands(status: np.ndarray) -> np.ndarray:
+    """Quantized road status; 0 = impassable, STATUS_BANDS = full speed"""
+    return np.ceil(np.clip(status, 0, 1) * STATUS_BANDS - 1e-6).astype(np.int8)
+
+
+def road_minutes(length_km: np.ndarray, bands: np.ndarray) -> np.ndarray:
+    """Travel time of each road at its status band (inf when impassable)"""
+    with np.errstate(divide='ignore'):
+        speed = ROAD_SPEED_KMH * bands / STATUS_BANDS
+        minutes = np.where(bands > 0, length_km / speed * 60.0, np.inf)
+    return np.maximum(minutes, MIN_ROAD_MINUTES)
+
+
+class ShelterRouter:
+    """
+    Zone-to-shelter travel times and nearest-shelter lookup
+
+    Each shelter is reached through the zone nearest to it, plus a straight
+    line access leg. Without a road graph, travel times are straight-line
+    distances and never change.
+
+    Attributes:
+        recomputed_sources: Shortest-path runs repeated since construction
+    """
+
+    def __init__(
+        self,
+        road_graph: Optional[RoadNetwork],
+        zone_shelter_km: np.ndarray,
+        road_status: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            road_graph: Roads between zones, or None for straight-line routing
+            zone_shelter_km: (num_zones, num_shelters) straight-line distances
+            road_status: Status to compute the initial times with (defaults
+                to the graph's initial status)
+        """
+        self.road_graph = road_graph
+        self.num_zones, self.num_shelters = zone_shelter_km.shape
+
+        # Each shelter hangs off its nearest zone
+        shelter_zones = zone_shelter_km.argmin(axis=0)
+        self.sources, self.shelter_source = np.unique(shelter_zones, return_inverse=True)
+        self.access_minutes = zone_shelter_km[shelter_zones, np.arange(self.num_shelters)] / ROAD_SPEED_KMH * 60.0
+        self._stale = np.zeros(self.num_zones, dtype=bool)
+        self._dirty = np.zeros(len(self.sources), dtype=bool)
+
+        if road_graph is None:
+            self._travel_minutes = (zone_shelter_km / ROAD_SPEED_KMH * 60.0).astype(np.float64)
+        else:
+            # Parallel roads between the same zones collapse to the fastest one
+            pairs = np.sort(road_graph.edges, axis=1)
+            self._pairs, self._edge_pair = np.unique(pairs, axis=0, return_inverse=True)
+            self._edge_pair = self._edge_pair.reshape(-1)
+            self._bands = status_bands(road_graph.initial_status if road_status is None else road_status)
+            self._distances = np.empty((len(self.sources), self.num_zones))
+            self._predecessors = np.empty((len(self.sources), self.num_zones), dtype=np.int32)
+            self._travel_minutes = np.empty((self.num_zones, self.num_shelters))
+            self._route(np.arange(len(self.sources)))
+
+        self._order = np.argsort(self._travel_minutes, axis=1, kind='stable')
+        self._stale[:] = False
+        self.recomputed_sources = 0
+
+    def copy(self) -> "ShelterRouter":
+        """Independent router at the same state (the graph is shared)"""
+        router = object.__new__(ShelterRouter)
+        router.__dict__.update(self.__dict__)
+        for name in ('_travel_minutes', '_order', '_stale', '_dirty', '_bands', '_distances', '_predecessors'):
+            if name in self.__dict__:
+                setattr(router, name, getattr(self, name).copy())
+        return router
+
+    def _graph(self) -> csr_matrix:
+        minutes = road_minutes(self.road_graph.length_km, self._bands)
+        pair_minutes = np.full(len(self._pairs), np.inf)
+        np.minimum.at(pair_minutes, self._edge_pair, minutes)
+        passable = np.isfinite(pair_minutes)
+        return csr_matrix(
+            (pair_minutes[passable], (self._pairs[passable, 0], self._pairs[passable, 1])),
+            shape=(self.num_zones, self.num_zones)
+        )
+
+    def _route(self, source_ids: np.ndarray):
+        """Recompute the shortest paths from the given sources"""
+        distances, predecessors = dijkstra(
+            self._graph(), directed=False, indices=self.sources[source_ids], return_predecessors=True
+        )
+        self._distances[source_ids] = distances
+        self._predecessors[source_ids] = predecessors
+
+        shelters = np.flatnonzero(np.isin(self.shelter_source, source_ids))
+        travel = self._distances[self.shelter_source[shelters]].T + self.access_minutes[shelters]
+        self._stale |= (travel != self._travel_minutes[:, shelters]).any(axis=1)
+        self._travel_minutes[:, shelters] = travel
+        self._dirty[source_ids] = False
+
+    @property
+    def travel_minutes(self) -> np.ndarray:
+        """(num_zones, num_shelters) current shortest travel times"""
+        if self._dirty.any():
+            dirty = np.flatnonzero(self._dirty)
+            self._route(dirty)
+            self.recomputed_sources += len(dirty)
+        return self._travel_minutes
+
+    def update(self, road_status: np.ndarray) -> int:
+        """
+        Invalidate the routes affected by a new road status
+
+        Returns:
+            Number of shortest-path runs newly invalidated
+        """
+        if self.road_graph is None:
+            return 0
+        bands = status_bands(road_status)
+        changed = np.flatnonzero(bands != self._bands)
+        if not len(changed):
+            return 0
+
+        if (bands[changed] > self._bands[changed]).any():
+            # A faster road can shorten any route
+            affected = ~self._dirty
+        else:
+            # A slower road only matters to shortest-path trees that use it
+            u, v = self.road_graph.edges[changed, 0], self.road_graph.edges[changed, 1]
+            clean = np.flatnonzero(~self._dirty)
+            preds = self._predecessors[clean]
+            affected = np.zeros_like(self._dirty)
+            affected[clean] = ((preds[:, v] == u) | (preds[:, u] == v)).any(axis=1)
+
+        self._bands = bands
+        self._dirty |= affected
+        return int(affected.sum())
+
+    def candidates(self, zone: int) -> np.ndarray:
+        """Shelters ordered by travel time from a zone (nearest first)"""
+        travel_minutes = self.travel_minutes
+        if self._stale[zone]:
+            self._order[zone] = np.argsort(travel_minutes[zone], kind='stable')
+            self._stale[zone] = False
+        return self._order[zone]
+
+    def nearest_shelter(self, zone: int, free_capacity: np.ndarray) -> Tuple[int, float]:
+        """
+        Nearest reachable shelter with free capacity
+
+        Returns:
+            (shelter index, travel minutes), or (-1, inf) if none is feasible
+        """
+        order = self.candidates(zone)
+        minutes = self.travel_minutes[zone, order]
+        feasible = (free_capacity[order] > 0) & np.isfinite(minutes)
+        best = int(feasible.argmax())
+        if not feasible[best]:
+            return -1, float('inf')
+        return int(order[best]), float(minutes[best])
@@ -0,0 +1,258 @@
+"""
+Scenario compiler
+Turns a backend ScenarioConfig (zones, shelters, roads and resources placed by
+latitude/longitude) into the NumPy arrays DisasterEnv works with. Geometry is
+computed once per scenario version and cached, so resetting or creating an
+environment for a large city scenario only copies arrays.
+"""
+
+from collections import OrderedDict
+from typing import Any, Hashable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from environments.road_network import RoadNetwork
+from environments.routing import ShelterRouter
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(
+    lat1: np.ndarray,
+    lon1: np.ndarray,
+    lat2: np.ndarray,
+    lon2: np.ndarray
+) -> np.ndarray:
+    """Great-circle distance in km between points given in degrees (broadcasts)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _locations(items: Sequence[Mapping[str, Any]], key: str) -> np.ndarray:
+    """(n, 2) array of [lat, lon] of each item's location field"""
+    locations = np.zeros((len(items), 2), dtype=np.float64)
+    for i, item in enumerate(items):
+        locations[i] = item[key]["lat"], item[key]["lon"]
+    return locations
+
+
+def _pairwise_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) distances between two [lat, lon] arrays"""
+    return haversine_km(a[:, None, 0], a[:, None, 1], b[None, :, 0], b[None, :, 1])
+
+
+def _nearest(centers: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Index of the center nearest to each [lat, lon] point, found with a KD-tree
+    over an equirectangular projection around the centers' mean latitude
+    """
+    scale = np.array([1.0, np.cos(np.radians(centers[:, 0].mean()))])
+    _, nearest = cKDTree(np.radians(centers) * scale).query(np.radians(points) * scale)
+    return nearest
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class CompiledScenario:
+    """
+    Immutable array form of a scenario, shared by every environment using it
+
+    Attributes:
+        zone_populations: (num_zones,) initial population per zone
+        zone_centers: (num_zones, 2) [lat, lon] of each zone center
+        shelter_capacity: (num_shelters,) capacity per shelter
+        shelter_occupancy: (num_shelters,) occupancy at reset
+        shelter_locations: (num_shelters, 2) [lat, lon] of each shelter
+        resource_positions: (num_resources, 2) resource locations scaled to
+            [0, 1] over the scenario's bounding box, as observed by the agent
+        zone_positions: (num_zones, 2) zone centers on the same scale
+        map_km: (2,) size of the bounding box in km along each axis
+        zone_shelter_km: (num_zones, num_shelters) great-circle distances
+        road_graph: Roads between the zones nearest to each road's ends, or
+            None if the scenario has no usable roads
+        router: Shelter routing at the initial road status; environments
+            copy it on reset and update their copy as roads degrade
+    """
+
+    def __init__(
+        self,
+        scenario_id: Optional[str],
+        version: Optional[int],
+        zone_populations: np.ndarray,
+        zone_centers: np.ndarray,
+        shelter_capacity: np.ndarray,
+        shelter_occupancy: np.ndarray,
+        shelter_locations: np.ndarray,
+        resource_positions: np.ndarray,
+        zone_positions: np.ndarray,
+        map_km: np.ndarray,
+        zone_shelter_km: np.ndarray,
+        road_graph: Optional[RoadNetwork]
+    ):
+        self.scenario_id = scenario_id
+        self.version = version
+        self.zone_populations = _frozen(zone_populations)
+        self.zone_centers = _frozen(zone_centers)
+        self.shelter_capacity = _frozen(shelter_capacity)
+        self.shelter_occupancy = _frozen(shelter_occupancy)
+        self.shelter_locations = _frozen(shelter_locations)
+        self.resource_positions = _frozen(resource_positions)
+        self.zone_positions = _frozen(zone_positions)
+        self.map_km = _frozen(map_km)
+        self.zone_shelter_km = _frozen(zone_shelter_km)
+        self.road_graph = road_graph
+        self.router = ShelterRouter(road_graph, self.zone_shelter_km)
+
+    @property
+    def num_zones(self) -> int:
+        return len(self.zone_populations)
+
+    @property
+    def num_shelters(self) -> int:
+        return len(self.shelter_capacity)
+
+    @property
+    def num_resources(self) -> int:
+        return len(self.resource_positions)
+
+    @property
+    def num_roads(self) -> int:
+        return self.road_graph.num_edges if self.road_graph is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.zone_populations, self.zone_centers, self.shelter_capacity,
+                  self.shelter_occupancy, self.shelter_locations, self.resource_positions,
+                  self.zone_positions, self.map_km, self.zone_shelter_km)
+        total = sum(array.nbytes for array in arrays)
+        if self.road_graph is not None:
+            graph = self.road_graph
+            total += sum(array.nbytes for array in (graph.edges, graph.length_km, graph.initial_status,
+                                                    graph.indptr, graph.indices, graph.edge_ids))
+        return total
+
+
+def compile_scenario(scenario: Mapping[str, Any]) -> CompiledScenario:
+    """
+    Compile a scenario given in the backend's ScenarioConfig JSON shape
+
+    Only id, version, zones, shelters, roads and resources are read. Each road
+    connects the zones nearest to its two endpoints; roads whose endpoints
+    fall in the same zone are dropped.
+    """
+    zones = scenario.get("zones") or []
+    shelters = scenario.get("shelters") or []
+    roads = scenario.get("roads") or []
+    resources = scenario.get("resources") or []
+    if not zones or not shelters or not resources:
+        raise ValueError("A scenario needs at least one zone, shelter and resource to be compiled")
+
+    zone_centers = _locations(zones, "center")
+    shelter_locations = _locations(shelters, "location")
+    resource_locations = _locations(resources, "location")
+
+    zone_populations = np.array([zone["population"] for zone in zones], dtype=np.float32)
+    shelter_capacity = np.array([shelter["capacity"] for shelter in shelters], dtype=np.float32)
+    shelter_occupancy = np.array([shelter.get("current_occupancy", 0) for shelter in shelters], dtype=np.float32)
+
+    # Resource and zone positions relative to the bounding box of everything placed
+    points = np.concatenate([zone_centers, shelter_locations, resource_locations])
+    low = points.min(axis=0)
+    span = np.maximum(points.max(axis=0) - low, 1e-9)
+    resource_positions = ((resource_locations - low) / span).astype(np.float32)
+    zone_positions = ((zone_centers - low) / span).astype(np.float32)
+    map_km = (np.radians(span) * EARTH_RADIUS_KM * np.array([1.0, np.cos(np.radians(points[:, 0].mean()))])).astype(np.float32)
+
+    zone_shelter_km = _pairwise_km(zone_centers, shelter_locations).astype(np.float32)
+
+    road_graph = None
+    if roads:
+        road_ends = np.concatenate([_locations(roads, "start"), _locations(roads, "end")])
+        nearest = _nearest(zone_centers, road_ends).reshape(2, len(roads)).T
+        keep = nearest[:, 0] != nearest[:, 1]
+        if keep.any():
+            road_graph = RoadNetwork(
+                len(zones),
+                nearest[keep],
+                length_km=np.array([road["length_km"] for road in roads])[keep],
+                initial_status=np.array([road.get("status", 1.0) for road in roads])[keep]
+            )
+
+    return CompiledScenario(
+        scenario.get("id"),
+        scenario.get("version"),
+        zone_populations,
+        zone_centers,
+        shelter_capacity,
+        shelter_occupancy,
+        shelter_locations,
+        resource_positions,
+        zone_positions,
+        map_km,
+        zone_shelter_km,
+        road_graph
+    )
+
+
+class ScenarioCache:
+    """
+    Compiled scenarios keyed by (scenario id, version), least recently used
+    evicted first
+
+    Caching a new version of a scenario drops its older versions, since
+    sessions created from now on only ask for the latest one.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[Hashable, Hashable], CompiledScenario]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[Hashable, Hashable]) -> bool:
+        return key in self._entries
+
+    def get(self, scenario_id: Hashable, version: Hashable) -> CompiledScenario:
+        """Get a compiled scenario, raising KeyError if it is not cached"""
+        key = (scenario_id, version)
+        compiled = self._entries[key]
+        self._entries.move_to_end(key)
+        return compiled
+
+    def put(self, scenario_id: Hashable, version: Hashable, compiled: CompiledScenario):
+        for key in [key for key in self._entries if key[0] == scenario_id and key[1] != version]:
+            del self._entries[key]
+        self._entries[(scenario_id, version)] = compiled
+        self._entries.move_to_end((scenario_id, version))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def compile(self, scenario: Mapping[str, Any]) -> Tuple[CompiledScenario, bool]:
+        """
+        Compiled form of a scenario, compiling it only if this id and version
+        are not cached yet
+
+        Returns:
+            (compiled scenario, whether it was compiled by this call)
+        """
+        scenario_id, version = scenario.get("id"), scenario.get("version")
+        try:
+            return self.get(scenario_id, version), False
+        except KeyError:
+            pass
+        compiled = compile_scenario(scenario)
+        self.put(scenario_id, version, compiled)
+        return compiled, True
+
+    def remove(self, scenario_id: Hashable):
+        for key in [key for key in self._entries if key[0] == scenario_id]:
+            del self._entries[key]
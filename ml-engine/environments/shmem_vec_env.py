@@ -0,0 +1,169 @@
+"""
+Shared-memory subprocess vectorized environment
+Like SB3's SubprocVecEnv, each environment runs in its own process, but
+observations are written by the workers straight into one shared
+(num_envs, *obs_shape) array instead of being pickled over the pipes.
+"""
+
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import (
+    CloudpickleWrapper, VecEnv, VecEnvObs, VecEnvStepReturn
+)
+from stable_baselines3.common.vec_env.patch_gym import _patch_env
+
+
+def _attach_shared_memory(name: str) -> SharedMemory:
+    """Attach to the parent's block; only the parent unlinks it"""
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block, but workers share the
+        # parent's resource tracker so this only duplicates its entry
+        return SharedMemory(name=name)
+
+
+def _worker(
+    remote: mp.connection.Connection,
+    parent_remote: mp.connection.Connection,
+    env_fn_wrapper: CloudpickleWrapper,
+    index: int
+) -> None:
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    env = _patch_env(env_fn_wrapper.var())
+    shm = None
+    obs_row = None
+    reset_info: Optional[Dict[str, Any]] = {}
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                observation, reward, terminated, truncated, info = env.step(data)
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                if done:
+                    # The terminal observation is rare enough to go over the pipe
+                    info["terminal_observation"] = observation
+                    observation, reset_info = env.reset()
+                obs_row[...] = observation
+                remote.send((reward, done, info, reset_info))
+            elif cmd == "reset":
+                maybe_options = {"options": data[1]} if data[1] else {}
+                observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                obs_row[...] = observation
+                remote.send(reset_info)
+            elif cmd == "attach":
+                shm_name, shape, dtype = data
+                shm = _attach_shared_memory(shm_name)
+                obs_row = np.ndarray(shape, dtype=dtype, buffer=shm.buf)[index]
+                remote.send(None)
+            elif cmd == "render":
+                remote.send(env.render())
+            elif cmd == "close":
+                env.close()
+                obs_row = None
+                if shm is not None:
+                    shm.close()
+                remote.close()
+                break
+            elif cmd == "get_spaces":
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "has_attr":
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == "set_attr":
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == "is_wrapped":
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class ShmemVecEnv(SubprocVecEnv):
+    """
+    Multiprocess vectorized environment with observations in shared memory
+
+    Only Box observation spaces are supported. Attribute access, env_method
+    and rendering behave exactly as in SubprocVecEnv.
+
+    Args:
+        env_fns: Environments to run in subprocesses
+        start_method: Multiprocessing start method, defaults to 'forkserver'
+            where available and 'spawn' otherwise
+    """
+
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], start_method: Optional[str] = None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            args = (work_remote, remote, CloudpickleWrapper(env_fn), index)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        if not isinstance(observation_space, spaces.Box):
+            raise ValueError("ShmemVecEnv only supports Box observation spaces")
+
+        # One shared observation block, a row per environment
+        shape = (n_envs,) + observation_space.shape
+        dtype = np.dtype(observation_space.dtype)
+        self._shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+        self._obs = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        for remote in self.remotes:
+            remote.send(("attach", (self._shm.name, shape, dtype.str)))
+        for remote in self.remotes:
+            remote.recv()
+
+        VecEnv.__init__(self, n_envs, observation_space, action_space)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        results = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        rews, dones, infos, self.reset_infos = zip(*results)
+        return self._obs.copy(), np.stack(rews), np.stack(dones), infos
+
+    def reset(self) -> VecEnvObs:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs.copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        self._obs = None
+        self._shm.close()
+        self._shm.unlink()
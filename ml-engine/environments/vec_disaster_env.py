@@ -0,0 +1,335 @@
+"""
+Batched Disaster Response Environment
+Steps many independent disaster scenarios at once. All scenario state is kept
+as struct-of-arrays with a leading (num_envs, ...) axis so that every step is a
+handful of NumPy calls regardless of how many scenarios are simulated.
+"""
+
+from gymnasium import spaces
+import numpy as np
+from typing import Any, Dict, List, Optional
+from stable_baselines3.common.vec_env.base_vec_env import (
+    VecEnv, VecEnvIndices, VecEnvObs, VecEnvStepReturn
+)
+
+from environments.disaster_env import ActionType, observation_slices
+from environments.kernels import accumulate_casualties, evacuate
+from environments.road_network import RoadNetwork
+
+
+class VecDisasterEnv(VecEnv):
+    """
+    Vectorized Disaster Response Environment
+
+    Drop-in replacement for ``make_vec_env(DisasterEnv, n_envs=N)``: observations,
+    actions, rewards and episode dynamics match ``DisasterEnv`` scenario by
+    scenario, but the N scenarios are advanced together instead of through N
+    Python environment instances.
+
+    Finished scenarios are reset automatically inside ``step_wait``; as with the
+    other SB3 vectorized environments, the last observation of the finished
+    episode is returned in ``infos[i]["terminal_observation"]``.
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 256,
+        grid_size: int = 10,
+        num_zones: int = 25,
+        num_shelters: int = 5,
+        num_resources: int = 10,
+        max_timesteps: int = 100,
+        disaster_intensity: float = 0.5,
+        seed: Optional[int] = None,
+        road_model: str = "dense",
+        road_graph: Optional[RoadNetwork] = None
+    ):
+        self.grid_size = grid_size
+        self.num_zones = num_zones
+        self.num_shelters = num_shelters
+        self.num_resources = num_resources
+        self.max_timesteps = max_timesteps
+        self.disaster_intensity = disaster_intensity
+        self.render_mode = None
+
+        if road_model not in ("dense", "sparse"):
+            raise ValueError(f"Unknown road model: {road_model}")
+        self.road_model = road_model
+        if road_model == "sparse":
+            self.road_graph = road_graph if road_graph is not None else RoadNetwork.grid(num_zones)
+            self.num_road_features = self.road_graph.num_edges
+            road_shape = (num_envs, self.num_road_features)
+        else:
+            self.road_graph = None
+            self.num_road_features = num_zones * num_zones
+            road_shape = (num_envs, num_zones, num_zones)
+
+        self.state_dim = self._calculate_state_dim()
+
+        action_space = spaces.MultiDiscrete([
+            5,  # action type
+            self.num_resources,  # which resource
+            self.num_zones  # target zone
+        ])
+        observation_space = spaces.Box(
+            low=0,
+            high=1,
+            shape=(self.state_dim,),
+            dtype=np.float32
+        )
+
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.np_random = np.random.default_rng(seed)
+        self._rows = np.arange(num_envs)
+        self._actions: Optional[np.ndarray] = None
+
+        # Scenario state, one row per environment
+        n = num_envs
+        self.current_step = np.zeros(n, dtype=np.int64)
+        self.zone_populations = np.zeros((n, num_zones), dtype=np.float32)
+        self.zone_evacuated = np.zeros((n, num_zones), dtype=np.float32)
+        self.zone_casualties = np.zeros((n, num_zones), dtype=np.float32)
+        self.zone_risk = np.zeros((n, num_zones), dtype=np.float32)
+        self.shelter_capacity = np.zeros((n, num_shelters), dtype=np.float32)
+        self.shelter_occupancy = np.zeros((n, num_shelters), dtype=np.float32)
+        self.resource_positions = np.zeros((n, num_resources, 2), dtype=np.float32)
+        self.resource_available = np.ones((n, num_resources), dtype=np.float32)
+        if road_model == "sparse":
+            self.road_status = np.ones(road_shape, dtype=np.float32)
+        else:
+            self.road_network = np.ones(road_shape, dtype=np.float32)
+
+        # Metrics
+        self.total_casualties = np.zeros(n, dtype=np.float64)
+        self.total_evacuated = np.zeros(n, dtype=np.float64)
+        self.resources_used = np.zeros(n, dtype=np.int64)
+
+        # Scratch buffer for the per-step road degradation draw
+        self._road_noise = np.empty(road_shape, dtype=np.float32)
+
+        # Preallocated observations, laid out exactly like DisasterEnv
+        slices = observation_slices(num_zones, num_shelters, num_resources, self.num_road_features)
+        self._obs = np.zeros((n, self.state_dim), dtype=np.float32)
+        self._obs_zone_populations = self._obs[:, slices['zone_populations']]
+        self._obs_zone_evacuated = self._obs[:, slices['zone_evacuated']]
+        self._obs_zone_casualties = self._obs[:, slices['zone_casualties']]
+        self._obs_shelter_capacity = self._obs[:, slices['shelter_capacity']]
+        self._obs_shelter_occupancy = self._obs[:, slices['shelter_occupancy']]
+        self._obs_resource_positions = self._obs[:, slices['resource_positions']].reshape(n, num_resources, 2)
+        self._obs_resource_available = self._obs[:, slices['resource_available']]
+        self._obs_road_network = self._obs[:, slices['road_network']].reshape(road_shape)
+        self._obs_timestep = self._obs[:, slices['timestep']][:, 0]
+
+    def _calculate_state_dim(self) -> int:
+        """Calculate the total dimension of the state vector"""
+        dim = 0
+        dim += self.num_zones * 3  # population, evacuated, casualties per zone
+        dim += self.num_shelters * 2  # capacity, occupancy per shelter
+        dim += self.num_resources * 3  # location (x,y), availability
+        dim += self.num_road_features  # road status (matrix or per road)
+        dim += 1  # current timestep
+        return dim
+
+    def reset(self) -> VecEnvObs:
+        """Reset every scenario in the batch"""
+        if self._seeds[0] is not None:
+            self.np_random = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self._write_observation()
+        self.reset_infos = self._get_infos()
+        return self._obs.copy()
+
+    def _reset_envs(self, mask: np.ndarray):
+        """Draw fresh initial conditions for the scenarios selected by mask"""
+        k = int(mask.sum())
+        if k == 0:
+            return
+
+        self.current_step[mask] = 0
+
+        self.zone_populations[mask] = self.np_random.integers(100, 1000, size=(k, self.num_zones))
+        self.zone_evacuated[mask] = 0
+        self.zone_casualties[mask] = 0
+        self.zone_risk[mask] = self.np_random.random((k, self.num_zones)) * self.disaster_intensity
+
+        self.shelter_capacity[mask] = self.np_random.integers(200, 500, size=(k, self.num_shelters))
+        self.shelter_occupancy[mask] = 0
+
+        self.resource_positions[mask] = self.np_random.random((k, self.num_resources, 2))
+        self.resource_available[mask] = 1
+
+        if self.road_model == "sparse":
+            self.road_status[mask] = self.road_graph.initial_status
+        else:
+            self.road_network[mask] = 1
+
+        self.total_casualties[mask] = 0
+        self.total_evacuated[mask] = 0
+        self.resources_used[mask] = 0
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self._actions = np.asarray(actions).reshape(self.num_envs, 3)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        """Advance every scenario by one timestep"""
+        action_type = self._actions[:, 0]
+        resource_id = self._actions[:, 1]
+        target_zone = self._actions[:, 2]
+
+        action_success = self._execute_actions(action_type, resource_id, target_zone)
+
+        self._update_disaster()
+
+        new_casualties = self._calculate_casualties()
+        self.total_casualties += new_casualties
+
+        rewards = self._calculate_rewards(new_casualties, action_success)
+
+        self.current_step += 1
+        dones = self.current_step >= self.max_timesteps
+
+        self._write_observation()
+        infos = self._get_infos()
+        for info, success in zip(infos, action_success.tolist()):
+            info['action_success'] = success
+
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = self._obs[i].copy()
+            self._reset_envs(dones)
+            self._write_observation()
+
+        return self._obs.copy(), rewards.astype(np.float32), dones, infos
+
+    def _execute_actions(
+        self,
+        action_type: np.ndarray,
+        resource_id: np.ndarray,
+        target_zone: np.ndarray
+    ) -> np.ndarray:
+        """Execute one action per scenario, returning a success mask"""
+        rows = self._rows
+        available = self.resource_available[rows, resource_id] > 0
+
+        # Evacuate up to 50 people into the first shelter with free capacity
+        evacuees = evacuate(
+            self.zone_populations,
+            self.zone_evacuated,
+            self.shelter_capacity,
+            self.shelter_occupancy,
+            target_zone,
+            mask=available & (action_type == ActionType.EVACUATE_ZONE)
+        )
+        evacuated = evacuees > 0
+        self.total_evacuated += evacuees
+
+        # Dispatching a vehicle reduces the target zone's risk by 10%
+        dispatched = available & (
+            (action_type == ActionType.SEND_AMBULANCE)
+            | (action_type == ActionType.SEND_MEDICAL_TEAM)
+            | (action_type == ActionType.SEND_SUPPLY_TRUCK)
+        )
+        self.zone_risk[rows, target_zone] *= np.where(dispatched, np.float32(0.9), np.float32(1))
+
+        action_success = evacuated | dispatched
+        self.resources_used += action_success
+        return action_success
+
+    def _update_disaster(self):
+        """Update disaster progression (increase risk over time)"""
+        np.multiply(self.zone_risk, np.float32(1.02), out=self.zone_risk)
+        np.clip(self.zone_risk, 0, 1, out=self.zone_risk)
+
+        # Road network degradation
+        roads = self.road_status if self.road_model == "sparse" else self.road_network
+        self.np_random.random(out=self._road_noise, dtype=np.float32)
+        self._road_noise *= np.float32(0.01)
+        roads -= self._road_noise
+        np.clip(roads, 0, 1, out=roads)
+
+    def _calculate_casualties(self) -> np.ndarray:
+        """Calculate casualties for this timestep, per scenario"""
+        return accumulate_casualties(
+            self.zone_populations,
+            self.zone_evacuated,
+            self.zone_risk,
+            self.zone_casualties
+        )
+
+    def _calculate_rewards(self, casualties: np.ndarray, action_success: np.ndarray) -> np.ndarray:
+        """Calculate rewards for this timestep, per scenario"""
+        evacuation_rate = self.total_evacuated / self.zone_populations.sum(axis=1)
+
+        rewards = -casualties * 100
+        rewards += evacuation_rate * 50
+        rewards -= self.resources_used * 0.1
+        rewards -= np.where(action_success, 0, 5)
+        rewards += np.where((evacuation_rate > 0.8) & (self.total_casualties < 10), 100, 0)
+        return rewards
+
+    def _write_observation(self):
+        """Write the normalized state of every scenario into the observation buffer"""
+        np.divide(self.zone_populations, 1000.0, out=self._obs_zone_populations)
+        np.divide(self.zone_evacuated, 1000.0, out=self._obs_zone_evacuated)
+        np.divide(self.zone_casualties, 100.0, out=self._obs_zone_casualties)
+        np.divide(self.shelter_capacity, 500.0, out=self._obs_shelter_capacity)
+        np.divide(self.shelter_occupancy, 500.0, out=self._obs_shelter_occupancy)
+        self._obs_resource_positions[:] = self.resource_positions
+        self._obs_resource_available[:] = self.resource_available
+        self._obs_road_network[:] = self.road_status if self.road_model == "sparse" else self.road_network
+        np.divide(self.current_step, self.max_timesteps, out=self._obs_timestep, casting='unsafe')
+
+    def _get_infos(self) -> List[Dict[str, Any]]:
+        """Get additional information about the current state of each scenario"""
+        populations = self.zone_populations.sum(axis=1)
+        columns = zip(
+            self.current_step.tolist(),
+            self.total_casualties.tolist(),
+            self.total_evacuated.tolist(),
+            (self.total_evacuated / populations).tolist(),
+            self.resources_used.tolist(),
+            self.zone_risk.mean(axis=1).tolist()
+        )
+        return [
+            {
+                'timestep': timestep,
+                'total_casualties': casualties,
+                'total_evacuated': evacuated,
+                'evacuation_rate': rate,
+                'resources_used': used,
+                'average_risk': risk
+            }
+            for timestep, casualties, evacuated, rate, used, risk in columns
+        ]
+
+    def close(self) -> None:
+        """Clean up resources"""
+        pass
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices = None) -> List[Any]:
+        """Return an attribute per scenario (the row of batched state arrays)"""
+        value = getattr(self, attr_name)
+        indices = self._get_indices(indices)
+        if isinstance(value, np.ndarray) and value.ndim > 0 and value.shape[0] == self.num_envs:
+            return [value[i] for i in indices]
+        return [value for _ in indices]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices = None) -> None:
+        """Set an attribute for the selected scenarios"""
+        current = getattr(self, attr_name, None)
+        if isinstance(current, np.ndarray) and current.ndim > 0 and current.shape[0] == self.num_envs:
+            current[list(self._get_indices(indices))] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices: VecEnvIndices = None, **method_kwargs) -> List[Any]:
+        """Scenarios share a single object, so the method is called once and its result broadcast"""
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices: VecEnvIndices = None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
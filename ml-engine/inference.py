@@ -0,0 +1,222 @@
+"""
+Inference helpers for the ML Engine API Server
+Runs policy inference on a bounded worker pool off the event loop and
+coalesces concurrent single-observation requests into batched policy calls.
+"""
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class InferenceOverloaded(Exception):
+    """Raised when inference work is rejected because the queues are full"""
+
+
+# Policy loaded once per worker process by the process pool initializer
+_worker_model = None
+
+
+def _load_worker_model(model_path: str):
+    global _worker_model
+    from stable_baselines3 import PPO
+    _worker_model = PPO.load(model_path, device="cpu")
+
+
+def _predict(model, observations: np.ndarray, deterministic: bool) -> np.ndarray:
+    actions, _ = model.predict(observations, deterministic=deterministic)
+    return actions
+
+
+def _predict_in_worker(observations: np.ndarray, deterministic: bool) -> np.ndarray:
+    return _predict(_worker_model, observations, deterministic)
+
+
+class InferencePool:
+    """
+    Bounded worker pool for policy inference
+
+    Policy forward passes are CPU-bound, so running them inside async
+    handlers would stall the event loop (and with it health checks and every
+    other request). The pool runs them on worker threads or processes instead
+    and rejects new work with InferenceOverloaded once max_pending calls are
+    in flight.
+
+    Args:
+        model: Loaded policy, used by the thread executor
+        model_path: Policy file, loaded once per worker by the process executor
+        executor: "thread" or "process"
+        max_workers: Number of worker threads/processes
+        max_pending: Most calls allowed in flight (running or waiting for a worker)
+    """
+
+    def __init__(
+        self,
+        model,
+        model_path: str,
+        executor: str = "thread",
+        max_workers: int = 1,
+        max_pending: int = 64
+    ):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor: {executor}")
+
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pending = 0
+
+        self._executor: Executor
+        if executor == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_load_worker_model,
+                initargs=(model_path,)
+            )
+            self._predict = _predict_in_worker
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+            self._predict = partial(_predict, model)
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.max_pending
+
+    async def predict(self, observations: np.ndarray, deterministic: bool = True) -> np.ndarray:
+        """Predict actions for a (batch, obs_dim) array on a worker"""
+        if self.saturated:
+            raise InferenceOverloaded("Inference workers are saturated")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._predict, observations, deterministic)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceBatcher:
+    """
+    Micro-batching queue for policy inference
+
+    Requests are queued by ``predict``; a background task takes the first
+    waiting request, keeps collecting until either ``max_batch_size``
+    requests are queued or ``max_wait_ms`` has elapsed, runs one batched
+    forward pass and resolves each caller's future with its own row.
+
+    Args:
+        predict_fn: Async callable mapping a (batch, obs_dim) float32 array to
+            (batch, action_dim) actions
+        max_batch_size: Largest batch handed to predict_fn
+        max_wait_ms: Longest time the first request of a batch waits for company
+        max_queue: Most requests allowed to wait; further requests are
+            rejected with InferenceOverloaded
+        max_concurrent_batches: Most batches in flight at once; while all are
+            busy, new requests keep accumulating into the next batch
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], Awaitable[np.ndarray]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 1024,
+        max_concurrent_batches: int = 1
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_batches))
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the batching task, failing any requests still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def predict(self, observation: np.ndarray) -> np.ndarray:
+        """Queue one observation and wait for its action"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((np.asarray(observation, dtype=np.float32), future))
+        except asyncio.QueueFull:
+            raise InferenceOverloaded("Inference queue is full")
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        """Wait for one request, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Drain anything that is already waiting without further delay
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            batch = await self._collect()
+
+            # Observations of different sizes (other scenarios) cannot share a forward pass
+            groups: Dict[Tuple[int, ...], List[Tuple[np.ndarray, asyncio.Future]]] = {}
+            for observation, future in batch:
+                if not future.cancelled():
+                    groups.setdefault(observation.shape, []).append((observation, future))
+
+            task = asyncio.get_running_loop().create_task(self._dispatch(list(groups.values())))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, groups: List[List[Tuple[np.ndarray, asyncio.Future]]]):
+        """Run the forward passes of one batch, then free its slot"""
+        try:
+            for requests in groups:
+                await self._dispatch_group(requests)
+        finally:
+            self._slots.release()
+
+    async def _dispatch_group(self, requests: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Run one forward pass for same-shaped requests and fan the rows back out"""
+        try:
+            actions = await self.predict_fn(np.stack([observation for observation, _ in requests]))
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), action in zip(requests, actions):
+            if not future.done():
+                future.set_result(action)
@@ -0,0 +1,76 @@
+"""
+Counterfactual policy rollouts for the ML Engine API Server
+Replays a simulation's seed with the AI policy in control to measure what it
+would have achieved. The deterministic policy and any stochastic samples run
+in lockstep on parallel environment copies, with one batched policy call per
+timestep for all of them; the copies are forks of one seeded reset.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from environments.disaster_env import DisasterEnv
+
+# Maps (batch, obs_dim) observations and a deterministic flag to (batch, 3) actions
+PredictFn = Callable[[np.ndarray, bool], Awaitable[np.ndarray]]
+
+
+async def run_rollouts(
+    env_config: Dict[str, Any],
+    seed: Optional[int],
+    predict_fn: Optional[PredictFn],
+    samples: int = 0
+) -> List[Dict[str, float]]:
+    """
+    Play full episodes from the seeded initial state with the policy
+
+    Args:
+        env_config: DisasterEnv parameters of the simulation
+        seed: Seed the simulation was reset with
+        predict_fn: Batched policy call, or None for a random policy
+        samples: Number of additional rollouts with stochastic actions
+
+    Returns:
+        One outcome per rollout (deterministic policy first): total_casualties,
+        total_evacuated, total_reward, steps (timesteps simulated) and
+        decisions (policy actions; fewer than steps in fast-forward mode)
+    """
+    env = DisasterEnv(**env_config)
+    observation, _ = env.reset(seed=seed)
+    envs = [env] + env.fork(samples)
+    observations = np.repeat(observation[None], len(envs), axis=0)
+    rewards = np.zeros(len(envs))
+    decisions = np.zeros(len(envs), dtype=np.int64)
+    active = np.ones(len(envs), dtype=bool)
+
+    while active.any():
+        if predict_fn is None:
+            actions = np.stack([env.action_space.sample() for env in envs])
+        else:
+            actions = np.empty((len(envs), 3), dtype=np.int64)
+            if active[0]:
+                actions[:1] = await predict_fn(observations[:1], True)
+            if samples and active[1:].any():
+                actions[1:] = await predict_fn(observations[1:], False)
+
+        for i in np.flatnonzero(active):
+            observation, reward, terminated, truncated, _ = envs[i].step(actions[i])
+            observations[i] = observation
+            rewards[i] += reward
+            decisions[i] += 1
+            active[i] = not (terminated or truncated)
+
+    outcomes = [
+        {
+            "total_casualties": float(env.total_casualties),
+            "total_evacuated": float(env.total_evacuated),
+            "total_reward": float(rewards[i]),
+            "steps": int(env.current_step),
+            "decisions": int(decisions[i])
+        }
+        for i, env in enumerate(envs)
+    ]
+    for env in envs:
+        env.close()
+    return outcomes
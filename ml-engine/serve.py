@@ -3,14 +3,21 @@ ML Engine API Server
 Serves trained RL models and provides inference endpoints
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, List, Dict, Literal, Optional
 import numpy as np
 from stable_baselines3 import PPO
+import json
 import os
 
 from environments.disaster_env import DisasterEnv
+from environments.scenario_compiler import ScenarioCache
+from rollouts import run_rollouts
+from sessions import SessionStore
+from inference import InferenceBatcher, InferenceOverloaded, InferencePool
+from transport import read_observation, read_trajectory, request_body_docs
 
 app = FastAPI(
     title="Disaster Response ML Engine",
@@ -20,19 +27,164 @@ app = FastAPI(
 
 # Global model instance
 model = None
-current_env_states = {}  # Store active simulation states
+inference_pool: Optional[InferencePool] = None  # Runs inference off the event loop
+batcher: Optional[InferenceBatcher] = None  # Coalesces concurrent predictions
+sessions = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+)  # Live environment per simulation
+compiled_scenarios = ScenarioCache(
+    max_entries=int(os.getenv("SCENARIO_CACHE_SIZE", "64"))
+)  # Scenario layouts compiled to arrays, by (id, version)
 
 class StateInput(BaseModel):
     """Input state for inference"""
     observation: List[float]
     simulation_id: Optional[str] = None
 
+class TrajectoryInput(BaseModel):
+    """Observed states and the actions taken in them"""
+    observations: List[List[float]]
+    actions: List[List[int]]
+
 class ActionOutput(BaseModel):
     """Output action from model"""
     action: List[int]
     confidence: float
     explanation: str
 
+class EnvironmentConfig(BaseModel):
+    """DisasterEnv parameters for a session"""
+    grid_size: int = 10
+    num_zones: int = Field(25, ge=1)
+    num_shelters: int = Field(5, ge=1)
+    num_resources: int = Field(10, ge=1)
+    max_timesteps: int = Field(100, ge=1)
+    disaster_intensity: float = 0.5
+    road_model: Literal["dense", "sparse"] = "dense"  # "sparse" changes the observation size; trained policies expect dense
+    dispatch_model: Literal["instant", "travel"] = "instant"  # "travel": resources are busy until they return
+    timestep_minutes: float = 15.0
+
+class LocationSpec(BaseModel):
+    lat: float
+    lon: float
+
+class ZoneSpec(BaseModel):
+    id: str
+    center: LocationSpec
+    radius_km: float = 1.0
+    population: int
+
+class ShelterSpec(BaseModel):
+    id: str
+    location: LocationSpec
+    capacity: int
+    current_occupancy: int = 0
+
+class RoadSpec(BaseModel):
+    id: str
+    start: LocationSpec
+    end: LocationSpec
+    status: float = Field(1.0, ge=0, le=1)
+    length_km: float
+
+class ResourceSpec(BaseModel):
+    id: str
+    type: str
+    location: LocationSpec
+
+class ScenarioSpec(BaseModel):
+    """Spatial layout of a backend scenario, in the ScenarioConfig JSON shape"""
+    version: int = 1
+    zones: List[ZoneSpec]
+    shelters: List[ShelterSpec]
+    roads: List[RoadSpec] = []
+    resources: List[ResourceSpec]
+
+class ScenarioInfo(BaseModel):
+    """A compiled scenario"""
+    id: str
+    version: int
+    num_zones: int
+    num_shelters: int
+    num_resources: int
+    num_roads: int
+    nbytes: int
+    compiled: bool  # False if this version was already cached
+
+class ScenarioRef(BaseModel):
+    """Compiled scenario to build an environment from"""
+    id: str
+    version: int
+
+class SessionConfig(BaseModel):
+    """Configuration for creating a simulation session"""
+    simulation_id: str
+    seed: Optional[int] = None
+    environment: EnvironmentConfig = EnvironmentConfig()
+    scenario: Optional[ScenarioRef] = None  # Overrides the environment's layout
+    replay_actions: List[List[int]] = []  # Rebuild an evicted session
+
+class SessionStepInput(BaseModel):
+    """Action to apply to a session"""
+    action: List[int]
+
+class SessionState(BaseModel):
+    """Current state of a session"""
+    timestep: int
+    zone_populations: List[float]
+    zone_evacuated: List[float]
+    zone_casualties: List[float]
+    shelter_occupancy: List[float]
+    total_casualties: float
+    total_evacuated: float
+    observation: List[float]
+
+class SessionStepOutput(BaseModel):
+    """Result of applying an action to a session"""
+    state: SessionState
+    reward: float
+    action_success: bool
+    terminated: bool
+
+class SessionStepsInput(BaseModel):
+    """Several steps to run on a session in one call"""
+    actions: List[List[int]] = []  # Applied in order
+    policy_steps: int = Field(0, ge=0)  # Then this many steps chosen by the policy
+    deterministic: bool = True
+
+class SessionStepRecord(SessionStepOutput):
+    """Result of one step of a multi-step run"""
+    action: List[int]
+
+class SessionStepsOutput(BaseModel):
+    """Results of a multi-step run, stopping early if the episode ends"""
+    steps: List[SessionStepRecord]
+    truncated: bool = False  # Stopped before all requested steps ran, for `reason`
+    reason: Optional[str] = None
+
+class RolloutConfig(BaseModel):
+    """Counterfactual rollout of the policy from a simulation's seed"""
+    seed: Optional[int] = None
+    environment: EnvironmentConfig = EnvironmentConfig()
+    scenario: Optional[ScenarioRef] = None
+    samples: int = Field(0, ge=0)  # Extra rollouts with stochastic policy actions
+    fast_forward: bool = False  # Only query the policy at events (approximate dynamics)
+
+class RolloutOutcome(BaseModel):
+    """Outcome of one policy rollout"""
+    total_casualties: float
+    total_evacuated: float
+    total_reward: float
+    steps: int  # Timesteps simulated
+    decisions: int  # Policy actions taken (fewer than steps with fast_forward)
+
+class RolloutOutput(BaseModel):
+    """Outcomes of the deterministic policy and of the stochastic samples"""
+    policy: RolloutOutcome
+    samples: List[RolloutOutcome]
+    model_loaded: bool
+
 class ModelInfo(BaseModel):
     """Model information"""
     model_loaded: bool
@@ -42,7 +194,7 @@ class ModelInfo(BaseModel):
 @app.on_event("startup")
 async def load_model():
     """Load the trained model on startup"""
-    global model
+    global model, inference_pool, batcher
     
     model_path = os.getenv("MODEL_PATH", "./models/disaster_agent_final.zip")
     
@@ -56,6 +208,31 @@ async def load_model():
     else:
         print(f"Model not found at {model_path}. Using random policy.")
         model = None
+    
+    if model is not None:
+        inference_pool = InferencePool(
+            model,
+            model_path,
+            executor=os.getenv("INFERENCE_EXECUTOR", "thread"),
+            max_workers=int(os.getenv("INFERENCE_WORKERS", "1")),
+            max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+        )
+        batcher = InferenceBatcher(
+            inference_pool.predict,
+            max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("INFERENCE_MAX_WAIT_MS", "5")),
+            max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "1024")),
+            max_concurrent_batches=inference_pool.max_workers
+        )
+        batcher.start()
+
+@app.on_event("shutdown")
+async def stop_inference():
+    """Stop the inference batcher and worker pool"""
+    if batcher is not None:
+        await batcher.stop()
+    if inference_pool is not None:
+        inference_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -78,18 +255,20 @@ async def get_model_info():
         model_type="PPO"
     )
 
-@app.post("/predict", response_model=ActionOutput)
-async def predict_action(state_input: StateInput):
+@app.post("/predict", response_model=ActionOutput, openapi_extra=request_body_docs(StateInput))
+async def predict_action(request: Request):
     """
     Predict the best action given the current state
     
     Args:
-        state_input: Current observation state
+        request: Current observation state, as StateInput JSON or raw float32
     
     Returns:
         Predicted action and confidence
     """
     
+    obs, _ = await read_observation(request, StateInput, _policy_obs_dim())
+    
     if model is None:
         # Return random action if no model loaded
         action = [
@@ -104,11 +283,8 @@ async def predict_action(state_input: StateInput):
         )
     
     try:
-        # Convert observation to numpy array
-        obs = np.array(state_input.observation, dtype=np.float32)
-        
-        # Get prediction
-        action, _states = model.predict(obs, deterministic=True)
+        # Get prediction (batched with concurrent requests)
+        action = await batcher.predict(obs)
         
         # Convert to list
         action = action.tolist()
@@ -130,20 +306,50 @@ async def predict_action(state_input: StateInput):
             explanation=explanation
         )
         
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Inference busy: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
-@app.post("/evaluate")
-async def evaluate_strategy(
-    observations: List[List[float]],
-    actions: List[List[int]]
-):
+ACTION_COMPONENTS = ["action_type", "resource_id", "target_zone"]
+
+# Steps per policy call when streaming long trajectories
+EVALUATE_CHUNK_SIZE = int(os.getenv("EVALUATE_CHUNK_SIZE", "256"))
+
+# Most stochastic samples per counterfactual rollout request
+ROLLOUT_MAX_SAMPLES = int(os.getenv("ROLLOUT_MAX_SAMPLES", "16"))
+
+def _count_matches(human_actions: np.ndarray, ai_actions: np.ndarray) -> np.ndarray:
+    """Per-step, per-component agreement for the overlapping steps"""
+    steps = min(len(human_actions), len(ai_actions))
+    return human_actions[:steps] == ai_actions[:steps]
+
+def _agreement_summary(component_matches: np.ndarray, exact_matches: int, total_steps: int) -> dict:
+    """Turn match counts into agreement rates"""
+    if total_steps == 0:
+        return {
+            "agreement_rate": 0,
+            "component_agreement": {name: 0 for name in ACTION_COMPONENTS},
+            "exact_match_rate": 0
+        }
+    return {
+        "agreement_rate": float(component_matches[0]) / total_steps,  # Action types
+        "component_agreement": {
+            name: float(count) / total_steps for name, count in zip(ACTION_COMPONENTS, component_matches)
+        },
+        "exact_match_rate": exact_matches / total_steps
+    }
+
+@app.post("/evaluate", openapi_extra=request_body_docs(TrajectoryInput))
+async def evaluate_strategy(request: Request):
     """
     Evaluate a sequence of human actions vs AI recommendations
     
+    All observations are predicted in a single batched policy call.
+    
     Args:
-        observations: List of observation states
-        actions: List of actions taken
+        request: Observation states and actions taken, as TrajectoryInput
+            JSON or the binary trajectory layout
     
     Returns:
         Comparison metrics
@@ -152,46 +358,92 @@ async def evaluate_strategy(
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    # Compare human actions vs AI recommendations
-    ai_actions = []
-    agreements = 0
-    
-    for obs in observations:
-        obs_array = np.array(obs, dtype=np.float32)
-        ai_action, _ = model.predict(obs_array, deterministic=True)
-        ai_actions.append(ai_action.tolist())
+    observations, human_actions = await read_trajectory(request, TrajectoryInput, _policy_obs_dim())
     
-    # Calculate agreement rate
-    for human_action, ai_action in zip(actions, ai_actions):
-        if human_action[0] == ai_action[0]:  # Compare action types
-            agreements += 1
+    # Predict the AI action for every observation at once
+    try:
+        if len(observations):
+            ai_actions = await inference_pool.predict(observations)
+        else:
+            ai_actions = np.zeros((0, len(ACTION_COMPONENTS)), dtype=np.int64)
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Inference busy: {str(e)}")
     
-    agreement_rate = agreements / len(actions) if actions else 0
+    # Compare every component of every step at once
+    matches = _count_matches(human_actions, ai_actions)
+    summary = _agreement_summary(matches.sum(axis=0), int(matches.all(axis=1).sum()), len(human_actions))
     
     return {
-        "agreement_rate": agreement_rate,
-        "ai_actions": ai_actions,
-        "total_steps": len(actions)
+        **summary,
+        "ai_actions": ai_actions.tolist(),
+        "total_steps": len(human_actions)
     }
 
-@app.post("/explain")
-async def explain_decision(state_input: StateInput):
+@app.post("/evaluate/stream", openapi_extra=request_body_docs(TrajectoryInput))
+async def evaluate_strategy_stream(request: Request):
+    """
+    Streaming variant of /evaluate for very long trajectories
+    
+    Predicts EVALUATE_CHUNK_SIZE steps per policy call and streams
+    newline-delimited JSON: one "chunk" line per batch with its AI actions
+    and per-step component matches, then a final "summary" line with the
+    same metrics as /evaluate.
+    """
+    
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    observation_array, human_actions = await read_trajectory(request, TrajectoryInput, _policy_obs_dim())
+    
+    async def generate():
+        component_matches = np.zeros(len(ACTION_COMPONENTS), dtype=np.int64)
+        exact_matches = 0
+        
+        for start in range(0, len(observation_array), EVALUATE_CHUNK_SIZE):
+            try:
+                ai_actions = await inference_pool.predict(observation_array[start:start + EVALUATE_CHUNK_SIZE])
+            except InferenceOverloaded as e:
+                yield json.dumps({"type": "error", "detail": f"Inference busy: {str(e)}"}) + "\n"
+                return
+            
+            matches = _count_matches(human_actions[start:start + len(ai_actions)], ai_actions)
+            component_matches += matches.sum(axis=0)
+            exact_matches += int(matches.all(axis=1).sum())
+            
+            yield json.dumps({
+                "type": "chunk",
+                "start": start,
+                "ai_actions": ai_actions.tolist(),
+                "matches": matches.astype(np.int8).tolist()
+            }) + "\n"
+        
+        yield json.dumps({
+            "type": "summary",
+            **_agreement_summary(component_matches, exact_matches, len(human_actions)),
+            "total_steps": len(human_actions)
+        }) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.post("/explain", openapi_extra=request_body_docs(StateInput))
+async def explain_decision(request: Request):
     """
     Provide detailed explanation for the AI's decision
     
     Args:
-        state_input: Current observation state
+        request: Current observation state, as StateInput JSON or raw float32
     
     Returns:
         Detailed explanation with reasoning
     """
     
+    obs, _ = await read_observation(request, StateInput, _policy_obs_dim())
+    
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
-        obs = np.array(state_input.observation, dtype=np.float32)
-        action, _ = model.predict(obs, deterministic=True)
+        action = await batcher.predict(obs)
         action = action.tolist()
         
         # Parse observation to provide context
@@ -223,9 +475,194 @@ async def explain_decision(state_input: StateInput):
         
         return explanation
         
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Inference busy: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Explanation error: {str(e)}")
 
+@app.post("/rollouts", response_model=RolloutOutput)
+async def rollout_policy(config: RolloutConfig):
+    """
+    Play the episode a simulation was seeded with using the AI policy
+    
+    Used for human-vs-AI comparison: the result is what the policy (and,
+    optionally, samples of its stochastic version) would have achieved
+    from the same initial state and disaster.
+    """
+    if config.samples > ROLLOUT_MAX_SAMPLES:
+        raise HTTPException(status_code=422, detail=f"At most {ROLLOUT_MAX_SAMPLES} samples are allowed")
+    
+    env_config = {**_environment_kwargs(config.environment, config.scenario), "fast_forward": config.fast_forward}
+    if model is not None:
+        _check_policy(DisasterEnv(**env_config).observation_space)
+    
+    try:
+        outcomes = await run_rollouts(
+            env_config,
+            config.seed,
+            inference_pool.predict if model is not None else None,
+            config.samples
+        )
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=f"Inference busy: {str(e)}")
+    
+    return RolloutOutput(policy=outcomes[0], samples=outcomes[1:], model_loaded=model is not None)
+
+def _environment_kwargs(environment: EnvironmentConfig, scenario: Optional[ScenarioRef]) -> Dict[str, Any]:
+    """DisasterEnv parameters, with the compiled scenario if one is referenced"""
+    kwargs = environment.model_dump()
+    if scenario is not None:
+        try:
+            kwargs["scenario"] = compiled_scenarios.get(scenario.id, scenario.version)
+        except KeyError:
+            raise HTTPException(status_code=409, detail="Scenario not compiled")
+    return kwargs
+
+@app.put("/scenarios/{scenario_id}", response_model=ScenarioInfo)
+async def compile_scenario(scenario_id: str, spec: ScenarioSpec):
+    """
+    Compile a scenario's layout for sessions and rollouts to reference
+    
+    Compilation (zone-to-shelter distances, road graph) happens once per
+    scenario version; uploading a version that is already cached is a no-op.
+    """
+    try:
+        compiled, is_new = compiled_scenarios.compile({"id": scenario_id, **spec.model_dump()})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return ScenarioInfo(
+        id=scenario_id,
+        version=spec.version,
+        num_zones=compiled.num_zones,
+        num_shelters=compiled.num_shelters,
+        num_resources=compiled.num_resources,
+        num_roads=compiled.num_roads,
+        nbytes=compiled.nbytes,
+        compiled=is_new
+    )
+
+@app.delete("/scenarios/{scenario_id}")
+async def delete_scenario(scenario_id: str):
+    """Drop every compiled version of a scenario"""
+    compiled_scenarios.remove(scenario_id)
+    return {"message": "Scenario deleted"}
+
+def _get_session(simulation_id: str):
+    try:
+        return sessions.get(simulation_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+def _validate_action(session, action: List[int]):
+    if len(action) != 3 or not session.env.action_space.contains(np.asarray(action, dtype=np.int64)):
+        raise HTTPException(status_code=422, detail=f"Invalid action: {action}")
+
+@app.post("/sessions", response_model=SessionState)
+async def create_session(config: SessionConfig):
+    """
+    Create a live environment for a simulation
+    
+    The environment is reset with the given seed; replay_actions are applied
+    in order to rebuild a session that was evicted. A referenced scenario
+    must have been compiled with PUT /scenarios/{id} first (409 otherwise).
+    """
+    env_config = _environment_kwargs(config.environment, config.scenario)
+    session = sessions.create(config.simulation_id, env_config, config.seed)
+    
+    for action in config.replay_actions:
+        _validate_action(session, action)
+        session.step(action)
+    
+    return session.state()
+
+@app.get("/sessions/{simulation_id}", response_model=SessionState)
+async def get_session_state(simulation_id: str):
+    """Get the current state of a session"""
+    return _get_session(simulation_id).state()
+
+@app.post("/sessions/{simulation_id}/step", response_model=SessionStepOutput)
+async def step_session(simulation_id: str, step_input: SessionStepInput):
+    """Apply one action to a session and advance it by one timestep"""
+    session = _get_session(simulation_id)
+    _validate_action(session, step_input.action)
+    
+    async with session.lock:
+        result = session.step(step_input.action)
+        return SessionStepOutput(state=session.state(), **result)
+
+def _policy_obs_dim() -> Optional[int]:
+    """Observation size the loaded policy takes (None if no model is loaded)"""
+    return model.observation_space.shape[0] if model is not None else None
+
+def _check_policy(observation_space):
+    """Reject environments whose observations the loaded policy cannot take"""
+    if model is not None and observation_space.shape != model.observation_space.shape:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Observation shape {observation_space.shape} does not match "
+                   f"the policy's {model.observation_space.shape}"
+        )
+
+async def _policy_action(session, deterministic: bool) -> List[int]:
+    """Action chosen by the loaded policy (random if no model is loaded)"""
+    _check_policy(session.env.observation_space)
+    if model is None:
+        return session.env.action_space.sample().tolist()
+    if deterministic:
+        action = await batcher.predict(session.observation)
+    else:
+        action = (await inference_pool.predict(session.observation[None], deterministic=False))[0]
+    return np.asarray(action).tolist()
+
+@app.post("/sessions/{simulation_id}/steps", response_model=SessionStepsOutput)
+async def run_session_steps(simulation_id: str, steps_input: SessionStepsInput):
+    """
+    Run several steps on a session in one call: the given actions, then
+    policy_steps actions chosen by the policy from the live observation
+    """
+    session = _get_session(simulation_id)
+    for action in steps_input.actions:
+        _validate_action(session, action)
+    if steps_input.policy_steps:
+        _check_policy(session.env.observation_space)
+    
+    records = []
+    reason = None
+    async with session.lock:
+        try:
+            for index in range(len(steps_input.actions) + steps_input.policy_steps):
+                if index < len(steps_input.actions):
+                    action = steps_input.actions[index]
+                else:
+                    action = await _policy_action(session, steps_input.deterministic)
+                
+                result = session.step(action)
+                records.append(SessionStepRecord(state=session.state(), action=action, **result))
+                if result["terminated"]:
+                    break
+        except InferenceOverloaded as e:
+            if not records:
+                raise HTTPException(status_code=503, detail=f"Inference busy: {str(e)}")
+            # The steps already taken stand; report why the run stopped
+            reason = f"Inference busy: {str(e)}"
+    
+    return SessionStepsOutput(steps=records, truncated=reason is not None, reason=reason)
+
+@app.post("/sessions/{simulation_id}/reset", response_model=SessionState)
+async def reset_session(simulation_id: str):
+    """Reset a session to its initial (seeded) state"""
+    session = _get_session(simulation_id)
+    async with session.lock:
+        session.reset()
+        return session.state()
+
+@app.delete("/sessions/{simulation_id}")
+async def delete_session(simulation_id: str):
+    """Discard a session"""
+    sessions.remove(simulation_id)
+    return {"message": "Session deleted"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,111 @@
+"""
+Live simulation sessions for the ML Engine API Server
+Holds one DisasterEnv per simulation so that clients only send actions and
+the authoritative state never leaves the server.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from environments.disaster_env import DisasterEnv
+
+
+class Session:
+    """A live environment and the seed it was reset with"""
+
+    def __init__(self, simulation_id: str, env: DisasterEnv, seed: Optional[int]):
+        self.simulation_id = simulation_id
+        self.env = env
+        self.seed = seed
+        self.observation: Optional[np.ndarray] = None
+        self.last_used = time.monotonic()
+        # Held by multi-step runs that await inference between steps
+        self.lock = asyncio.Lock()
+
+    def reset(self) -> np.ndarray:
+        self.observation, _ = self.env.reset(seed=self.seed)
+        return self.observation
+
+    def step(self, action: List[int]) -> Dict[str, Any]:
+        observation, reward, terminated, truncated, info = self.env.step(np.asarray(action, dtype=np.int64))
+        self.observation = observation
+        return {
+            "reward": float(reward),
+            "action_success": bool(info["action_success"]),
+            "terminated": bool(terminated or truncated)
+        }
+
+    def state(self) -> Dict[str, Any]:
+        """Snapshot in the shape of the backend's SimulationState"""
+        env = self.env
+        return {
+            "timestep": env.current_step,
+            "zone_populations": env.zone_populations.tolist(),
+            "zone_evacuated": env.zone_evacuated.tolist(),
+            "zone_casualties": env.zone_casualties.tolist(),
+            "shelter_occupancy": env.shelter_occupancy.tolist(),
+            "total_casualties": float(env.total_casualties),
+            "total_evacuated": float(env.total_evacuated),
+            "observation": self.observation.tolist()
+        }
+
+
+class SessionStore:
+    """
+    Sessions keyed by simulation id, bounded in number and idle time
+
+    Sessions idle for longer than ttl_seconds are dropped, and once
+    max_sessions is reached the least recently used one is evicted. Both
+    are cheap to rebuild: resetting with the same seed and replaying the
+    recorded actions reproduces the state exactly.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800.0):
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, simulation_id: str) -> bool:
+        return simulation_id in self._sessions
+
+    def create(self, simulation_id: str, env_config: Dict[str, Any], seed: Optional[int]) -> Session:
+        """Create (or replace) the session of a simulation and reset it"""
+        self.evict_expired()
+        self._sessions.pop(simulation_id, None)
+        while len(self._sessions) >= self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            evicted.env.close()
+
+        session = Session(simulation_id, DisasterEnv(**env_config), seed)
+        session.reset()
+        self._sessions[simulation_id] = session
+        return session
+
+    def get(self, simulation_id: str) -> Session:
+        """Get a live session, raising KeyError if it does not exist or was evicted"""
+        self.evict_expired()
+        session = self._sessions[simulation_id]
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(simulation_id)
+        return session
+
+    def remove(self, simulation_id: str):
+        session = self._sessions.pop(simulation_id, None)
+        if session is not None:
+            session.env.close()
+
+    def evict_expired(self):
+        """Drop sessions idle for longer than the TTL (oldest first)"""
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            simulation_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= deadline:
+                break
+            self.remove(simulation_id)
@@ -0,0 +1,160 @@
+"""Tests for the array kernels against the per-zone loops they replaced"""
+
+import numpy as np
+import pytest
+
+from environments.disaster_env import ActionType, DisasterEnv
+from environments.kernels import accumulate_casualties, evacuate
+from environments.vec_disaster_env import VecDisasterEnv
+
+
+def loop_evacuate(zone_populations, zone_evacuated, shelter_capacity, shelter_occupancy, target_zone):
+    """Original EVACUATE_ZONE: up to 50 people into the first shelter with capacity"""
+    evacuees = min(zone_populations[target_zone] - zone_evacuated[target_zone], 50)
+    if evacuees > 0:
+        for i in range(len(shelter_capacity)):
+            available_capacity = shelter_capacity[i] - shelter_occupancy[i]
+            if available_capacity > 0:
+                actual_evacuees = min(evacuees, available_capacity)
+                zone_evacuated[target_zone] += actual_evacuees
+                shelter_occupancy[i] += actual_evacuees
+                return actual_evacuees
+    return 0.0
+
+
+def loop_casualties(zone_populations, zone_evacuated, zone_risk, zone_casualties):
+    """Original per-zone casualty accumulation"""
+    casualties = 0
+    for i in range(len(zone_populations)):
+        unprotected = zone_populations[i] - zone_evacuated[i]
+        zone_casualties[i] += unprotected * zone_risk[i] * 0.01
+        casualties += unprotected * zone_risk[i] * 0.01
+    return casualties
+
+
+def random_state(rng, num_zones=25, num_shelters=5, batch=()):
+    """
+    Random zone and shelter arrays; some zones are (nearly) fully evacuated
+    and some shelters full, so every branch of the allocation is taken
+    """
+    populations = rng.integers(0, 1000, size=batch + (num_zones,)).astype(np.float32)
+    evacuated = (populations * rng.choice([0, 0.5, 0.97, 1], size=populations.shape)).astype(np.float32)
+    capacity = rng.integers(200, 500, size=batch + (num_shelters,)).astype(np.float32)
+    occupancy = (capacity * rng.choice([0, 0.9, 0.99, 1], size=capacity.shape)).astype(np.float32)
+    risk = rng.random(populations.shape).astype(np.float32)
+    casualties = (rng.random(populations.shape) * 10).astype(np.float32)
+    return {
+        "zone_populations": populations,
+        "zone_evacuated": evacuated,
+        "shelter_capacity": capacity,
+        "shelter_occupancy": occupancy,
+        "zone_risk": risk,
+        "zone_casualties": casualties
+    }
+
+
+def load_state(target, state):
+    for name, value in state.items():
+        getattr(target, name)[...] = value
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_evacuate_matches_loop(seed):
+    rng = np.random.default_rng(seed)
+    state = random_state(rng)
+    expected = {name: value.copy() for name, value in state.items()}
+    target_zone = int(rng.integers(25))
+
+    moved = evacuate(state["zone_populations"], state["zone_evacuated"], state["shelter_capacity"],
+                     state["shelter_occupancy"], target_zone)
+    expected_moved = loop_evacuate(expected["zone_populations"], expected["zone_evacuated"],
+                                   expected["shelter_capacity"], expected["shelter_occupancy"], target_zone)
+
+    assert moved == pytest.approx(expected_moved)
+    for name in ("zone_evacuated", "shelter_occupancy"):
+        np.testing.assert_allclose(state[name], expected[name], rtol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_accumulate_casualties_matches_loop(seed):
+    state = random_state(np.random.default_rng(seed))
+    expected = {name: value.copy() for name, value in state.items()}
+
+    total = accumulate_casualties(state["zone_populations"], state["zone_evacuated"],
+                                  state["zone_risk"], state["zone_casualties"])
+    expected_total = loop_casualties(expected["zone_populations"], expected["zone_evacuated"],
+                                     expected["zone_risk"], expected["zone_casualties"])
+
+    assert total == pytest.approx(expected_total, rel=1e-5)
+    np.testing.assert_allclose(state["zone_casualties"], expected["zone_casualties"], rtol=1e-5)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_disaster_env_matches_loops(seed):
+    rng = np.random.default_rng(seed)
+    env = DisasterEnv()
+    env.reset(seed=seed)
+    state = random_state(rng)
+    load_state(env, state)
+    expected = {name: value.copy() for name, value in state.items()}
+
+    for _ in range(20):
+        resource, zone = int(rng.integers(env.num_resources)), int(rng.integers(env.num_zones))
+        success = env._execute_action(ActionType.EVACUATE_ZONE, resource, zone)
+        moved = loop_evacuate(expected["zone_populations"], expected["zone_evacuated"],
+                              expected["shelter_capacity"], expected["shelter_occupancy"], zone)
+        assert success == (moved > 0)
+    casualties = env._calculate_casualties()
+    expected_casualties = loop_casualties(expected["zone_populations"], expected["zone_evacuated"],
+                                          expected["zone_risk"], expected["zone_casualties"])
+
+    assert casualties == pytest.approx(expected_casualties, rel=1e-5)
+    for name in ("zone_evacuated", "shelter_occupancy", "zone_casualties"):
+        np.testing.assert_allclose(getattr(env, name), expected[name], rtol=1e-5)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vec_disaster_env_matches_loops(seed):
+    rng = np.random.default_rng(seed)
+    env = VecDisasterEnv(num_envs=16, seed=seed)
+    env.reset()
+    state = random_state(rng, batch=(env.num_envs,))
+    load_state(env, state)
+    expected = {name: value.copy() for name, value in state.items()}
+
+    for _ in range(20):
+        action_type = rng.choice([ActionType.EVACUATE_ZONE, ActionType.SEND_AMBULANCE], size=env.num_envs)
+        resource = rng.integers(env.num_resources, size=env.num_envs)
+        zone = rng.integers(env.num_zones, size=env.num_envs)
+        env.resource_available[:] = 1
+        success = env._execute_actions(action_type, resource, zone)
+        for i in np.flatnonzero(action_type == ActionType.EVACUATE_ZONE):
+            moved = loop_evacuate(expected["zone_populations"][i], expected["zone_evacuated"][i],
+                                  expected["shelter_capacity"][i], expected["shelter_occupancy"][i], zone[i])
+            assert success[i] == (moved > 0)
+        sent = action_type == ActionType.SEND_AMBULANCE
+        expected["zone_risk"][np.flatnonzero(sent), zone[sent]] *= np.float32(0.9)
+    casualties = env._calculate_casualties()
+    expected_casualties = [
+        loop_casualties(expected["zone_populations"][i], expected["zone_evacuated"][i],
+                        expected["zone_risk"][i], expected["zone_casualties"][i])
+        for i in range(env.num_envs)
+    ]
+
+    np.testing.assert_allclose(casualties, expected_casualties, rtol=1e-5)
+    for name in ("zone_evacuated", "shelter_occupancy", "zone_casualties"):
+        np.testing.assert_allclose(getattr(env, name), expected[name], rtol=1e-5)
+
+
+def test_vec_disaster_env_infos_match_disaster_env():
+    env = DisasterEnv()
+    env.reset(seed=0)
+    _, _, _, _, info = env.step(np.array([ActionType.SEND_AMBULANCE, 0, 0]))
+
+    vec_env = VecDisasterEnv(num_envs=2, seed=0)
+    vec_env.reset()
+    _, _, _, infos = vec_env.step(np.array([[ActionType.SEND_AMBULANCE, 0, 0], [ActionType.EVACUATE_ZONE, 0, 0]]))
+
+    assert set(infos[0]) == set(info)
+    assert infos[0]['action_success'] is True
+    assert infos[1]['action_success'] == bool(vec_env.resources_used[1] == 1)
@@ -0,0 +1,94 @@
+"""Tests for compiled scenarios and the environments built from them"""
+
+import os
+
+import numpy as np
+import pytest
+
+from environments.disaster_env import DisasterEnv
+from environments.scenario_compiler import compile_scenario
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "disaster_agent_final.zip")
+
+
+def _location(rng):
+    return {"lat": 40 + rng.random() * 0.2, "lon": -74 + rng.random() * 0.2}
+
+
+def make_scenario(num_zones=25, num_shelters=5, num_resources=10, seed=0):
+    """Scenario with zones on a row and a road between each pair of neighbours"""
+    rng = np.random.default_rng(seed)
+    centers = [{"lat": 40.0, "lon": -74.0 + 0.01 * i} for i in range(num_zones)]
+    return {
+        "id": "scenario",
+        "version": 1,
+        "zones": [{"id": f"z{i}", "center": c, "population": 500} for i, c in enumerate(centers)],
+        "shelters": [{"id": f"s{i}", "location": _location(rng), "capacity": 300} for i in range(num_shelters)],
+        "roads": [
+            {"id": f"r{i}", "start": centers[i], "end": centers[i + 1], "length_km": 1.0}
+            for i in range(num_zones - 1)
+        ],
+        "resources": [{"id": f"x{i}", "location": _location(rng)} for i in range(num_resources)]
+    }
+
+
+def test_compiled_env_keeps_the_default_observation_layout():
+    compiled = compile_scenario(make_scenario())
+    assert compiled.num_roads == 24
+
+    env = DisasterEnv(scenario=compiled)
+    assert env.road_model == "dense"
+    assert env.observation_space.shape == DisasterEnv().observation_space.shape
+
+
+def test_compiled_env_matches_trained_policy():
+    if not os.path.exists(MODEL_PATH):
+        pytest.skip("No trained model")
+    from stable_baselines3 import PPO
+
+    model = PPO.load(MODEL_PATH)
+    env = DisasterEnv(scenario=compile_scenario(make_scenario()))
+    assert env.observation_space.shape == model.observation_space.shape
+
+    observation, _ = env.reset(seed=0)
+    action, _ = model.predict(observation, deterministic=True)
+    env.step(action)
+
+
+def test_sparse_roads_are_opt_in():
+    compiled = compile_scenario(make_scenario())
+    env = DisasterEnv(scenario=compiled, road_model="sparse")
+    assert env.road_graph is compiled.road_graph
+    assert env.num_road_features == compiled.num_roads
+
+
+@pytest.mark.parametrize("road_model", ["dense", "sparse"])
+def test_routing_follows_degraded_roads(road_model):
+    env = DisasterEnv(scenario=compile_scenario(make_scenario()), road_model=road_model)
+    env.reset(seed=1)
+    for _ in range(30):
+        env.step(np.array([0, 0, 0]))
+
+    status = env._scenario_road_status()
+    assert status.shape == (24,)
+    assert (status < 1).all()
+    assert env.router.update(status) == 0  # Already up to date
+
+
+@pytest.mark.parametrize("road_model", ["dense", "sparse"])
+def test_destroyed_roads_stay_closed(road_model):
+    scenario = make_scenario()
+    for road in scenario["roads"]:
+        road["status"] = 0.0
+    scenario["roads"][0]["status"] = 0.5
+    env = DisasterEnv(scenario=compile_scenario(scenario), road_model=road_model)
+    env.reset(seed=0)
+
+    status = env._scenario_road_status()
+    assert status[0] == pytest.approx(0.5)
+    assert (status[1:] == 0).all()
+
+    # Without roads, only the zones shelters hang off can reach a shelter
+    env.router.update(status)
+    reachable = np.isfinite(env.router.travel_minutes).any(axis=1)
+    assert reachable.sum() < env.num_zones
@@ -9,10 +9,21 @@ from stable_baselines3 import PPO
 from stable_baselines3.common.env_util import make_vec_env
 from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
 from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
 import torch
 
 # Import our custom environment
 from environments.disaster_env import DisasterEnv
+from environments.vec_disaster_env import VecDisasterEnv
+from environments.shmem_vec_env import ShmemVecEnv
+
+# Vectorization backends for rollout collection
+VEC_ENV_BACKENDS = {
+    "dummy": DummyVecEnv,  # in-process, one env after another
+    "subproc": SubprocVecEnv,  # one process per env, observations pickled over pipes
+    "shmem": ShmemVecEnv,  # one process per env, observations in shared memory
+    "batched": VecDisasterEnv,  # in-process, all envs stepped with array operations
+}
 
 def create_env():
     """Create and return the disaster environment"""
@@ -25,10 +36,36 @@ def create_env():
         disaster_intensity=0.5
     )
 
+def create_vec_env(n_envs: int = 4, vec_env: str = "dummy"):
+    """
+    Create the vectorized training environment
+    
+    Args:
+        n_envs: Number of parallel environments
+        vec_env: Vectorization backend, one of VEC_ENV_BACKENDS
+    """
+    if vec_env not in VEC_ENV_BACKENDS:
+        raise ValueError(f"Unknown vectorization backend: {vec_env}")
+    
+    if vec_env == "batched":
+        return VecMonitor(VecDisasterEnv(
+            num_envs=n_envs,
+            grid_size=10,
+            num_zones=25,
+            num_shelters=5,
+            num_resources=10,
+            max_timesteps=100,
+            disaster_intensity=0.5
+        ))
+    
+    return make_vec_env(create_env, n_envs=n_envs, vec_env_cls=VEC_ENV_BACKENDS[vec_env])
+
 def train_agent(
     total_timesteps: int = 500_000,
     save_dir: str = "./models",
-    tensorboard_log: str = "./logs"
+    tensorboard_log: str = "./logs",
+    n_envs: int = 4,
+    vec_env: str = "dummy"
 ):
     """
     Train the RL agent
@@ -37,6 +74,8 @@ def train_agent(
         total_timesteps: Total number of timesteps to train
         save_dir: Directory to save models
         tensorboard_log: Directory for tensorboard logs
+        n_envs: Number of parallel environments for rollout collection
+        vec_env: Vectorization backend ("dummy", "subproc", "shmem" or "batched")
     """
     
     # Create directories
@@ -44,7 +83,8 @@ def train_agent(
     os.makedirs(tensorboard_log, exist_ok=True)
     
     # Create vectorized environment (parallel training)
-    env = make_vec_env(create_env, n_envs=4)
+    env = create_vec_env(n_envs=n_envs, vec_env=vec_env)
+    print(f"Rollouts: {n_envs} envs ({vec_env})")
     
     # Create evaluation environment
     eval_env = Monitor(create_env())
@@ -102,6 +142,7 @@ def train_agent(
     # Save final model
     final_model_path = f"{save_dir}/disaster_agent_final"
     model.save(final_model_path)
+    env.close()
     print(f"\nTraining complete! Final model saved to: {final_model_path}")
     
     return model
@@ -157,6 +198,12 @@ if __name__ == "__main__":
                        help="Mode: train or test")
     parser.add_argument("--timesteps", type=int, default=500_000,
                        help="Total timesteps for training")
+    parser.add_argument("--n-envs", type=int, default=4,
+                       help="Number of parallel environments for training")
+    parser.add_argument("--vec-env", type=str, choices=list(VEC_ENV_BACKENDS), default="dummy",
+                       help="Vectorization backend: dummy (in-process), subproc (one process per env), "
+                            "shmem (subprocesses with shared-memory observations), "
+                            "batched (array-stepped VecDisasterEnv)")
     parser.add_argument("--model", type=str, default="./models/disaster_agent_final",
                        help="Path to model for testing")
     parser.add_argument("--episodes", type=int, default=10,
@@ -165,6 +212,6 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     if args.mode == "train":
-        train_agent(total_timesteps=args.timesteps)
+        train_agent(total_timesteps=args.timesteps, n_envs=args.n_envs, vec_env=args.vec_env)
     else:
         test_agent(model_path=args.model, num_episodes=args.episodes)
@@ -0,0 +1,155 @@
+"""
+Binary observation transport
+Besides JSON, the inference endpoints accept observations as raw little-endian
+float32 (Content-Type: application/octet-stream), decoded with np.frombuffer
+instead of validating and boxing every float.
+
+Layouts:
+    /predict, /explain: obs_dim float32 values
+    /evaluate: steps * obs_dim float32 observations followed by steps * 3
+        int32 actions, with the number of steps in the X-Steps header
+"""
+
+from typing import Optional, Sequence, Tuple, Type
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+SIMULATION_ID_HEADER = "X-Simulation-Id"
+STEPS_HEADER = "X-Steps"
+ACTION_DIM = 3
+
+FLOAT32 = np.dtype("<f4")
+INT32 = np.dtype("<i4")
+
+
+def is_binary(request: Request) -> bool:
+    """Check whether the request body uses the binary layout"""
+    return request.headers.get("content-type", "").split(";")[0].strip() == BINARY_CONTENT_TYPE
+
+
+def decode_observation(body: bytes) -> np.ndarray:
+    """Decode one raw float32 observation"""
+    if not body or len(body) % FLOAT32.itemsize:
+        raise ValueError("Observation must be a non-empty sequence of float32 values")
+    return np.frombuffer(body, dtype=FLOAT32)
+
+
+def decode_trajectory(body: bytes, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode (steps, obs_dim) observations and (steps, 3) actions"""
+    if steps < 0 or len(body) % FLOAT32.itemsize:
+        raise ValueError("Invalid trajectory payload")
+    if steps == 0:
+        return np.zeros((0, 0), dtype=FLOAT32), np.zeros((0, ACTION_DIM), dtype=INT32)
+
+    words = len(body) // FLOAT32.itemsize
+    if words % steps or words // steps <= ACTION_DIM:
+        raise ValueError("Trajectory payload does not match the number of steps")
+    obs_dim = words // steps - ACTION_DIM
+
+    observations = np.frombuffer(body, dtype=FLOAT32, count=steps * obs_dim).reshape(steps, obs_dim)
+    actions = np.frombuffer(
+        body, dtype=INT32, offset=steps * obs_dim * FLOAT32.itemsize
+    ).reshape(steps, ACTION_DIM)
+    return observations, actions
+
+
+def trajectory_arrays(
+    observations: Sequence[Sequence[float]],
+    actions: Sequence[Sequence[int]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert JSON observation and action lists to (steps, obs_dim) and (steps, 3) arrays"""
+    if len(observations) != len(actions):
+        raise ValueError("Trajectory needs one action per observation")
+    if not observations:
+        return np.zeros((0, 0), dtype=FLOAT32), np.zeros((0, ACTION_DIM), dtype=np.int64)
+    if len({len(observation) for observation in observations}) != 1:
+        raise ValueError("Observations must all have the same length")
+    if any(len(action) != ACTION_DIM for action in actions):
+        raise ValueError(f"Actions must have {ACTION_DIM} components")
+    return np.asarray(observations, dtype=np.float32), np.asarray(actions, dtype=np.int64)
+
+
+def _parse_json(model_cls: Type[BaseModel], body: bytes) -> BaseModel:
+    try:
+        return model_cls.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+async def read_observation(
+    request: Request,
+    model_cls: Type[BaseModel],
+    obs_dim: Optional[int] = None
+) -> Tuple[np.ndarray, str]:
+    """
+    Read an observation from either a JSON body (validated with model_cls)
+    or a binary body, rejecting it with 400 unless it has obs_dim values
+    (when given)
+
+    Returns:
+        (float32 observation, simulation id or None)
+    """
+    body = await request.body()
+    if is_binary(request):
+        try:
+            observation, simulation_id = decode_observation(body), request.headers.get(SIMULATION_ID_HEADER)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        state_input = _parse_json(model_cls, body)
+        observation, simulation_id = np.asarray(state_input.observation, dtype=np.float32), state_input.simulation_id
+
+    if obs_dim is not None and observation.shape != (obs_dim,):
+        raise HTTPException(status_code=400, detail=f"Observation must have {obs_dim} values, got {observation.size}")
+    return observation, simulation_id
+
+
+async def read_trajectory(
+    request: Request,
+    model_cls: Type[BaseModel],
+    obs_dim: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read observations and actions from either a JSON body (validated with
+    model_cls) or a binary body, rejecting them with 400 if malformed or,
+    when obs_dim is given, of another width
+
+    Returns:
+        ((steps, obs_dim) float32 observations, (steps, 3) actions)
+    """
+    body = await request.body()
+    try:
+        if is_binary(request):
+            steps = request.headers.get(STEPS_HEADER, "")
+            if not steps.strip().isdigit():
+                raise ValueError(f"{STEPS_HEADER} header with the number of steps is required")
+            observations, actions = decode_trajectory(body, int(steps))
+        else:
+            trajectory = _parse_json(model_cls, body)
+            observations, actions = trajectory_arrays(trajectory.observations, trajectory.actions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if obs_dim is not None and len(observations) and observations.shape[1] != obs_dim:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Observations must have {obs_dim} values, got {observations.shape[1]}"
+        )
+    return observations, actions
+
+
+def request_body_docs(model_cls: Type[BaseModel]) -> dict:
+    """OpenAPI request body listing both the JSON and the binary content types"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": model_cls.model_json_schema()},
+                BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }